@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+"""
+SupabaseAuthentication.authenticate() throughput.
+
+Authenticates the same request (same access token, like the autosave
+PATCHes) in a loop, for HS256 tokens and for ES256 tokens verified with a
+JWKS key set (local file), with:
+- no cache: every call verifies the token and looks the user up
+- token cache: verified payloads cached (SUPABASE_TOKEN_CACHE_SIZE)
+- token + user cache: users cached too (AUTH_USER_CACHE_TTL), no query
+
+Runs on a throwaway test database, no Supabase project needed.
+
+Usage:
+    python benchmarks/authenticate_throughput.py --iterations 5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Setup Django environment
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cvbuilder_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+import jwt  # noqa: E402
+from cryptography.hazmat.primitives.asymmetric import ec  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.test import APIRequestFactory  # noqa: E402
+
+from cvbuilder_backend.authentication import SupabaseAuthentication  # noqa: E402
+from users.models import User  # noqa: E402
+from users.supabase_auth import JWKSKeySet, VerifiedTokenCache, supabase_auth  # noqa: E402
+from users.user_cache import authenticated_users  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iterations', type=int, default=2000, help='authenticate() calls per run')
+    return parser.parse_args()
+
+
+def make_tokens(jwks_path):
+    payload = {
+        'sub': 'bench-user',
+        'email': 'bench@example.com',
+        'aud': 'authenticated',
+        'exp': int(time.time()) + 3600,
+        'user_metadata': {'first_name': 'Jean', 'last_name': 'Dupont'},
+    }
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    jwk = jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+    jwks_path.write_text(json.dumps({'keys': [{**jwk, 'kid': 'bench', 'alg': 'ES256', 'use': 'sig'}]}))
+    return {
+        'HS256': jwt.encode(payload, supabase_auth.jwt_secret, algorithm='HS256'),
+        'ES256': jwt.encode(payload, private_key, algorithm='ES256', headers={'kid': 'bench'}),
+    }
+
+
+def run(token, iterations, token_cache_size, user_cache_ttl):
+    supabase_auth.token_cache = VerifiedTokenCache(max_size=token_cache_size)
+    authenticated_users.ttl = user_cache_ttl
+    authenticated_users.clear()
+
+    authentication = SupabaseAuthentication()
+    request = APIRequestFactory().patch('/api/resumes/1', HTTP_AUTHORIZATION=f'Bearer {token}')
+    # Warm up (user creation, key set loading)
+    authentication.authenticate(request)
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        authentication.authenticate(request)
+    return time.perf_counter() - started
+
+
+def main():
+    args = parse_args()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=False)
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            jwks_path = Path(directory) / 'jwks.json'
+            tokens = make_tokens(jwks_path)
+            supabase_auth.jwks = JWKSKeySet(str(jwks_path))
+            User.objects.create(email='bench@example.com', first_name='Jean', last_name='Dupont')
+
+            print(f"{'token':6} {'configuration':20} {'auth/s':>10} {'us/auth':>9}")
+            for algorithm, token in tokens.items():
+                for name, token_cache_size, user_cache_ttl in [
+                    ('no cache', 0, 0),
+                    ('token cache', 4096, 0),
+                    ('token + user cache', 4096, 30),
+                ]:
+                    elapsed = run(token, args.iterations, token_cache_size, user_cache_ttl)
+                    print(
+                        f"{algorithm:6} {name:20} {args.iterations / elapsed:10,.0f} "
+                        f"{elapsed / args.iterations * 1e6:9.1f}"
+                    )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python
+"""
+Autosave cost: full PATCH /resumes/{id} vs PATCH /resumes/{id}/delta.
+
+Simulates the editor autosaving one edited experience description of a long
+CV and reports, for each endpoint:
+- request body size
+- size of the UPDATE statements sent to the database (SQL + parameters),
+  a proxy for the columns rewritten
+- median response time
+
+Runs on a throwaway test database.
+
+Usage:
+    python benchmarks/autosave_payload.py --experiences 20 --repeats 20
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+# Setup Django environment
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cvbuilder_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from resumes.models import Resume  # noqa: E402
+from resumes.serializers import ResumeUpdateSerializer  # noqa: E402
+from users.models import User  # noqa: E402
+
+DESCRIPTION = (
+    'Conception et développement de services backend en Python/Django, '
+    'mise en place de pipelines CI/CD, encadrement d\'une équipe de 5 développeurs. '
+) * 4
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--experiences', type=int, default=20, help='Experience items of the CV')
+    parser.add_argument('--repeats', type=int, default=20, help='Autosaves per endpoint')
+    return parser.parse_args()
+
+
+def create_resume(user, experiences):
+    return Resume.objects.create(
+        user=user,
+        full_name='Jean Dupont',
+        title='Développeur Full Stack',
+        summary=DESCRIPTION,
+        experience_data=[
+            {'position': f'Developer {i}', 'company': f'Company {i}', 'location': 'Paris',
+             'start_date': '2015-01', 'end_date': '2017-12', 'description': DESCRIPTION}
+            for i in range(experiences)
+        ],
+        education_data=[
+            {'degree': 'Master Informatique', 'institution': 'Université Paris', 'description': DESCRIPTION}
+            for _ in range(experiences // 2)
+        ],
+        skills_data=[{'name': f'Skill {i}', 'level': 'Expert'} for i in range(experiences * 2)],
+        projects_data=[{'name': f'Project {i}', 'description': DESCRIPTION} for i in range(experiences // 2)],
+    )
+
+
+def update_size(queries):
+    return sum(
+        len(query['sql'].encode('utf-8'))
+        for query in queries.captured_queries
+        if query['sql'].startswith('UPDATE')
+    )
+
+
+def measure(client, path, bodies, content_type='application/json'):
+    timings, body_sizes, update_sizes = [], [], []
+    for body in bodies:
+        payload = json.dumps(body)
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.patch(path, payload, content_type=content_type)
+            timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, (path, response.status_code, response.content[:200])
+        body_sizes.append(len(payload.encode('utf-8')))
+        update_sizes.append(update_size(queries))
+    return statistics.median(body_sizes), statistics.median(update_sizes), statistics.median(timings)
+
+
+def main():
+    args = parse_args()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=False)
+    try:
+        user = User.objects.create_user(email='bench@example.com', password='bench-password')
+        client = APIClient()
+        client.force_authenticate(user)
+        resume = create_resume(user, args.experiences)
+
+        # Full autosave: the editor sends every field back
+        full_bodies = []
+        for i in range(args.repeats):
+            data = dict(ResumeUpdateSerializer(resume).data)
+            data['experience_data'] = [dict(item) for item in data['experience_data']]
+            data['experience_data'][i % args.experiences]['description'] = f'{DESCRIPTION} ({i})'
+            full_bodies.append(data)
+
+        delta_bodies = [
+            [{'op': 'replace', 'path': f'/experience_data/{i % args.experiences}/description',
+              'value': f'{DESCRIPTION} (delta {i})'}]
+            for i in range(args.repeats)
+        ]
+
+        print(f"CV with {args.experiences} experiences, one description edited per autosave")
+        print(f"{'endpoint':8} {'body bytes':>11} {'UPDATE bytes':>13} {'ms':>8}")
+        for name, path, bodies, content_type in [
+            ('full', f'/api/resumes/{resume.id}', full_bodies, 'application/json'),
+            ('delta', f'/api/resumes/{resume.id}/delta', delta_bodies, 'application/json-patch+json'),
+        ]:
+            body, update, timing = measure(client, path, bodies, content_type)
+            print(f"{name:8} {body:11,.0f} {update:13,.0f} {timing * 1000:8.1f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
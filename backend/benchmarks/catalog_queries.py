@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Template catalog endpoints: queries, bytes read from the database and
+response time.
+
+Creates N active templates on a throwaway test database (the 51 bundled
+templates of resumes/templates, repeated up to N) and requests each catalog
+endpoint in-process. Every endpoint is measured with an empty response cache
+(miss: database + serialization) and with a warm one (hit).
+
+Bytes read are the summed sizes of every value returned by the captured
+queries, re-executed after the measurement. The "full rows" line is what
+loading the templates with all their columns (template_html/template_css
+included) reads, for comparison.
+
+Usage:
+    python benchmarks/catalog_queries.py
+    python benchmarks/catalog_queries.py --templates 51 5000 --repeats 5
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Setup Django environment
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cvbuilder_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test.utils import CaptureQueriesContext, override_settings, setup_test_environment  # noqa: E402
+from rest_framework.test import APIClient  # noqa: E402
+
+from resumes.models import Template, TemplateCategory  # noqa: E402
+
+TEMPLATES_DIR = Path(settings.BASE_DIR) / 'resumes' / 'templates'
+
+ENDPOINTS = [
+    ('list', '/api/templates'),
+    ('free', '/api/templates/free'),
+    ('premium', '/api/templates/premium'),
+    ('categories', '/api/templates/categories'),
+    ('catalog', '/api/templates/catalog'),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--templates', type=int, nargs='+', default=[51, 5000], help='Catalog sizes')
+    parser.add_argument('--repeats', type=int, default=5, help='Requests per measurement')
+    return parser.parse_args()
+
+
+def create_fixtures(count):
+    """Create `count` templates from the bundled sources, with 1-3 categories each"""
+    Template.objects.all().delete()
+    TemplateCategory.objects.all().delete()
+
+    sources = sorted(TEMPLATES_DIR.glob('*.html'))
+    categories = [
+        TemplateCategory.objects.create(slug=slug, name=name, order=order)
+        for order, (slug, name) in enumerate(TemplateCategory.CATEGORY_CHOICES)
+    ]
+    templates = Template.objects.bulk_create([
+        Template(
+            name=f'{sources[i % len(sources)].stem.replace("_", " ").title()} {i}',
+            description='Modern and clean resume template',
+            template_html=sources[i % len(sources)].read_text(encoding='utf-8'),
+            template_css='',
+            is_premium=i % 3 == 0,
+        )
+        for i in range(count)
+    ], batch_size=500)
+
+    through = Template.categories.through
+    through.objects.bulk_create([
+        through(template_id=template.id, templatecategory_id=categories[(i + offset) % len(categories)].id)
+        for i, template in enumerate(templates)
+        for offset in range(1 + i % 3)
+    ], batch_size=1000)
+
+
+def bytes_read(queries):
+    """Summed size of the values returned by the captured queries"""
+    total = 0
+    with connection.cursor() as cursor:
+        for query in queries:
+            cursor.execute(query['sql'])
+            for row in cursor.fetchall():
+                for value in row:
+                    if value is None:
+                        continue
+                    if isinstance(value, (bytes, memoryview)):
+                        total += len(value)
+                    else:
+                        total += len(str(value).encode('utf-8'))
+    return total
+
+
+def full_rows_bytes():
+    """Bytes read by loading every active template with all its columns"""
+    with CaptureQueriesContext(connection) as queries:
+        list(Template.objects.filter(is_active=True))
+    return bytes_read(queries.captured_queries)
+
+
+def measure(client, path, repeats, warm):
+    timings = []
+    for _ in range(repeats):
+        if not warm:
+            cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            response = client.get(path)
+            timings.append(time.perf_counter() - started)
+        assert response.status_code == 200, (path, response.status_code)
+    return statistics.median(timings), queries.captured_queries, len(response.content)
+
+
+def main():
+    args = parse_args()
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=False)
+    try:
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            client = APIClient()
+            for count in args.templates:
+                create_fixtures(count)
+                print(f"\n{count} templates (full rows: {full_rows_bytes() / 1024:,.0f} KiB read)")
+                print(f"{'endpoint':11} {'queries':>7} {'db KiB':>9} {'resp KiB':>9} {'miss ms':>9} {'hit ms':>8}")
+                for name, path in ENDPOINTS:
+                    miss, queries, size = measure(client, path, args.repeats, warm=False)
+                    hit, _, _ = measure(client, path, args.repeats, warm=True)
+                    print(
+                        f"{name:11} {len(queries):7d} {bytes_read(queries) / 1024:9.1f} "
+                        f"{size / 1024:9.1f} {miss * 1000:9.1f} {hit * 1000:8.2f}"
+                    )
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+"""
+Concurrent PDF export throughput: WSGI (sync view) vs ASGI (async view).
+
+Fires N export requests at one worker and reports the throughput of:
+- wsgi: ResumeViewSet.export_pdf called by a sync worker with --threads
+  threads (gunicorn gthread style), each request holding its thread
+  while Chromium renders
+- asgi: resumes.async_views.export_pdf, all requests awaited on one event loop
+
+The views are called in-process on a throwaway test database, so no server is
+needed. By default renders go to the real Playwright browser pool; use
+--simulated-render-ms to replace Chromium by a fixed async delay (no browser
+needed, isolates the view/worker overhead).
+
+Usage:
+    python benchmarks/export_concurrency.py --requests 48 --concurrency 16
+    python benchmarks/export_concurrency.py --simulated-render-ms 200 --pages-per-browser 8
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Setup Django environment
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cvbuilder_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.conf import settings  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.test import AsyncRequestFactory, RequestFactory  # noqa: E402
+from django.test.utils import setup_test_environment  # noqa: E402
+from rest_framework.test import force_authenticate  # noqa: E402
+
+from resumes import async_views, browser_pool, render_admission, render_coalescing  # noqa: E402
+from resumes.models import Resume, Template  # noqa: E402
+from resumes.views import ResumeViewSet  # noqa: E402
+from users.models import User  # noqa: E402
+
+TEMPLATE_HTML = """
+<div class="cv">
+  <h1>{{full_name}}</h1><h2>{{title}}</h2>
+  <p>{{nl2br summary}}</p>
+  {{#each experience_data}}<h3>{{position}} - {{company}}</h3><p>{{description}}</p>{{/each}}
+</div>
+"""
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=48, help='Exports per run')
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight (ASGI)')
+    parser.add_argument('--threads', type=int, default=1, help='Threads of the WSGI worker')
+    parser.add_argument('--pool-size', type=int, default=settings.PDF_BROWSER_POOL_SIZE)
+    parser.add_argument('--pages-per-browser', type=int, default=4)
+    parser.add_argument('--simulated-render-ms', type=float, default=None,
+                        help='Replace Chromium by an async sleep of this duration')
+    return parser.parse_args()
+
+
+def create_fixtures(count):
+    user = User.objects.create_user(email='bench@example.com', password='bench-password')
+    template = Template.objects.create(name='Benchmark', template_html=TEMPLATE_HTML, template_css='')
+    resumes = [
+        Resume.objects.create(
+            user=user,
+            template=template,
+            full_name=f'Jean Dupont {i}',
+            title='Développeur Full Stack',
+            summary='Développeur passionné.\nExpert Python.',
+            experience_data=[
+                {'position': 'Lead Developer', 'company': 'TechCorp', 'description': 'Direction technique'}
+            ],
+        )
+        for i in range(count)
+    ]
+    return user, resumes
+
+
+class SimulatedPage:
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def set_content(self, html, wait_until=None):
+        await asyncio.sleep(self.delay)
+
+    async def pdf(self, **options):
+        return b'%PDF-1.4 simulated'
+
+    async def close(self):
+        pass
+
+
+class SimulatedBrowser:
+    """Chromium stand-in: a page render is a fixed async delay"""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    def is_connected(self):
+        return True
+
+    async def new_page(self):
+        return SimulatedPage(self.delay)
+
+    async def close(self):
+        pass
+
+
+class SimulatedBrowserPool(browser_pool.BrowserPool):
+    def __init__(self, render_delay, **kwargs):
+        super().__init__(**kwargs)
+        self.render_delay = render_delay
+
+    async def _launch(self, slot):
+        slot.browser = slot.context = SimulatedBrowser(self.render_delay)
+        slot.renders = 0
+        slot.launched_at = time.monotonic()
+
+
+def install_pool(args):
+    kwargs = {
+        'size': args.pool_size,
+        'max_renders': settings.PDF_BROWSER_MAX_RENDERS,
+        'idle_timeout': 0,
+        'pages_per_browser': args.pages_per_browser,
+    }
+    if args.simulated_render_ms is not None:
+        pool = SimulatedBrowserPool(render_delay=args.simulated_render_ms / 1000, **kwargs)
+    else:
+        pool = browser_pool.BrowserPool(**kwargs)
+
+    browser_pool._pool = pool
+    browser_pool._pool_pid = os.getpid()
+    # Admit every benchmark request: measure throughput, not rejections
+    render_admission._admission = render_admission.RenderAdmission(
+        max_concurrency=args.pool_size * args.pages_per_browser,
+        max_queue=args.requests,
+        max_queue_wait=600,
+    )
+    render_admission._admission_pid = os.getpid()
+    render_coalescing._coalescer = render_coalescing.RenderCoalescer(lock=None)
+    render_coalescing._coalescer_pid = os.getpid()
+    # Warm up: start the loop and the browsers outside of the measurement
+    pool.run(pool.render_pdf, '<p>warm up</p>', {})
+    return pool
+
+
+def run_wsgi(user, resumes, args):
+    factory = RequestFactory()
+    view = ResumeViewSet.as_view({'post': 'export_pdf'})
+
+    def export(i):
+        resume = resumes[i % len(resumes)]
+        request = factory.post(f'/api/resumes/{resume.id}/export_pdf')
+        force_authenticate(request, user=user)
+        try:
+            return view(request, pk=str(resume.id)).status_code
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.threads) as executor:
+        statuses = list(executor.map(export, range(args.requests)))
+    return time.perf_counter() - started, statuses
+
+
+def run_asgi(user, resumes, args):
+    factory = AsyncRequestFactory()
+
+    async def export(i, semaphore):
+        resume = resumes[i % len(resumes)]
+        request = factory.post(f'/api/resumes/{resume.id}/export_pdf')
+        force_authenticate(request, user=user)
+        async with semaphore:
+            response = await async_views.export_pdf(request, pk=resume.id)
+        return response.status_code
+
+    async def main():
+        semaphore = asyncio.Semaphore(args.concurrency)
+        return await asyncio.gather(*(export(i, semaphore) for i in range(args.requests)))
+
+    started = time.perf_counter()
+    statuses = asyncio.run(main())
+    return time.perf_counter() - started, statuses
+
+
+def report(name, elapsed, statuses, args):
+    failures = sum(1 for code in statuses if code != 200)
+    print(
+        f"{name:5} {args.requests} exports in {elapsed:6.2f}s  "
+        f"{args.requests / elapsed:7.1f} exports/s  "
+        f"{elapsed / args.requests * 1000:7.1f} ms/export  failures={failures}"
+    )
+
+
+def main():
+    args = parse_args()
+    # Measure rendering, not the PDF output cache
+    settings.PDF_CACHE_ENABLED = False
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=False)
+    try:
+        # One resume per request: identical renders would be coalesced
+        user, resumes = create_fixtures(args.requests)
+        pool = install_pool(args)
+
+        mode = f'simulated {args.simulated_render_ms:.0f} ms' if args.simulated_render_ms is not None else 'chromium'
+        print(f"Render: {mode}, pool: {args.pool_size} browsers x {args.pages_per_browser} pages, "
+              f"wsgi threads: {args.threads}, asgi concurrency: {args.concurrency}")
+
+        report('wsgi', *run_wsgi(user, resumes, args), args)
+        report('asgi', *run_asgi(user, resumes, args), args)
+        admission = render_admission.get_render_admission().stats()
+        print(f"admission: max queue depth {admission['max_queue_depth']}, "
+              f"wait p50 {admission['wait_seconds_p50']:.3f}s p95 {admission['wait_seconds_p95']:.3f}s")
+        pool.shutdown()
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+"""
+Process startup time: `python -X importtime manage.py check`.
+
+Runs the command --runs times and reports the median wall time, the median
+total import time and the slowest top-level imports (cumulative). With
+--record, the result is appended as one JSON line to a history file (with
+the current commit and date) so startup regressions can be tracked over
+time.
+
+Usage:
+    python benchmarks/startup_time.py
+    python benchmarks/startup_time.py --runs 10 --record benchmarks/startup_history.jsonl
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5, help='Measured runs (median is reported)')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports to list')
+    parser.add_argument('--record', metavar='FILE', help='Append the result to this JSON lines file')
+    return parser.parse_args()
+
+
+def parse_importtime(stderr):
+    """
+    Return {module: cumulative microseconds} of the top-level imports.
+
+    importtime lines look like: "import time:  self [us] |  cumulative | name",
+    nested imports are indented by two spaces per level.
+    """
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2][1:]
+        if not name.startswith(' '):
+            modules[name] = modules.get(name, 0) + int(fields[1])
+    return modules
+
+
+def run_once():
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', 'manage.py', 'check'],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - started
+    if result.returncode != 0:
+        sys.exit(f"manage.py check failed:\n{result.stdout}{result.stderr}")
+    return wall, parse_importtime(result.stderr)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    args = parse_args()
+    run_once()  # Warm up the filesystem and bytecode caches
+
+    walls, totals, runs = [], [], []
+    for _ in range(args.runs):
+        wall, modules = run_once()
+        walls.append(wall)
+        totals.append(sum(modules.values()) / 1e6)
+        runs.append(modules)
+
+    names = set().union(*runs)
+    slowest = sorted(
+        ((statistics.median(run.get(name, 0) for run in runs) / 1e3, name) for name in names),
+        reverse=True
+    )[:args.top]
+
+    result = {
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'python': sys.version.split()[0],
+        'runs': args.runs,
+        'wall_seconds': round(statistics.median(walls), 3),
+        'import_seconds': round(statistics.median(totals), 3),
+        'slowest_imports_ms': {name: round(ms, 1) for ms, name in slowest},
+    }
+
+    print(f"manage.py check: {result['wall_seconds']:.3f}s wall, "
+          f"{result['import_seconds']:.3f}s importing (median of {args.runs})")
+    for ms, name in slowest:
+        print(f"  {ms:8.1f} ms  {name}")
+
+    if args.record:
+        with open(args.record, 'a') as history:
+            history.write(json.dumps(result) + '\n')
+        print(f"Recorded in {args.record}")
+
+
+if __name__ == '__main__':
+    main()
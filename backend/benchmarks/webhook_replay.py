@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+"""
+Stripe webhook load test: replay an event stream against the webhook view.
+
+Events are read from a captured stream (--events-file, JSON lines, one
+Stripe event per line, e.g. `stripe listen --print-json > events.jsonl`) or
+generated: checkout completions and subscription lifecycles for --users
+users. Each event is signed with the webhook secret and posted to
+/api/payments/webhook, redeliveries (--redeliveries, share of the events
+sent twice, like Stripe retries) included. Reports:
+- acknowledgement latency of the view (p50/p95/p99) and throughput
+- drain throughput of the worker (drain_webhook_events)
+- for comparison, the latency of processing each event in the request,
+  as the view did before
+
+Runs on a throwaway test database, the Celery task is not enqueued.
+
+Usage:
+    python benchmarks/webhook_replay.py --users 200
+    python benchmarks/webhook_replay.py --events-file events.jsonl
+"""
+
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import random
+import sys
+import time
+import uuid
+from unittest import mock
+
+# Setup Django environment
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cvbuilder_backend.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.test.utils import override_settings, setup_test_environment  # noqa: E402
+
+from payments.models import Payment, WebhookEvent  # noqa: E402
+from payments.webhooks import drain_webhook_events, process_webhook_event, record_webhook_event  # noqa: E402
+from resumes.models import Resume  # noqa: E402
+from users.models import User  # noqa: E402
+
+WEBHOOK_SECRET = 'whsec_benchmark'
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events-file', help='Captured Stripe events (JSON lines)')
+    parser.add_argument('--users', type=int, default=100, help='Users of the generated stream')
+    parser.add_argument('--redeliveries', type=float, default=0.1, help='Share of events delivered twice')
+    parser.add_argument('--seed', type=int, default=1)
+    return parser.parse_args()
+
+
+def generate_events(users):
+    """A checkout and a subscription lifecycle per user, with its database fixtures"""
+    events = []
+    created = int(time.time()) - 3600
+    for index in range(users):
+        user = User.objects.create_user(email=f'user{index}@example.com', password='benchmark')
+        resume = Resume.objects.create(user=user, full_name=f'User {index}')
+        session_id = f'cs_{uuid.uuid4().hex}'
+        Payment.objects.create(stripe_checkout_session_id=session_id, amount=2.40, payment_type='single')
+
+        subscription = {
+            'id': f'sub_{uuid.uuid4().hex}',
+            'customer': f'cus_{index}',
+            'status': 'active',
+            'metadata': {'user_id': str(user.id)},
+            'items': {'data': [{'price': {'id': 'price_monthly'}}]},
+            'current_period_start': created,
+            'current_period_end': created + 30 * 86400,
+        }
+        for event_type, obj in [
+            ('checkout.session.completed', {
+                'id': session_id,
+                'payment_intent': f'pi_{index}',
+                'metadata': {'payment_type': 'single', 'resume_id': str(resume.id), 'user_id': str(user.id)},
+            }),
+            ('customer.subscription.created', subscription),
+            ('invoice.payment_succeeded', {'id': f'in_{index}', 'subscription': subscription['id']}),
+            ('customer.subscription.updated', {**subscription, 'cancel_at_period_end': True}),
+        ]:
+            created += 1
+            events.append({
+                'id': f'evt_{uuid.uuid4().hex}',
+                'object': 'event',
+                'type': event_type,
+                'created': created,
+                'data': {'object': obj},
+            })
+    return events
+
+
+def load_events(path):
+    with open(path) as stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+def deliveries(events, redeliveries, rng):
+    """Delivery order: mostly in order, with redeliveries and some reordering"""
+    stream = list(events) + rng.sample(events, int(len(events) * redeliveries))
+    for index in range(len(stream) - 1):
+        if rng.random() < 0.05:
+            stream[index], stream[index + 1] = stream[index + 1], stream[index]
+    return stream
+
+
+def signed_post(client, event):
+    payload = json.dumps(event)
+    timestamp = int(time.time())
+    signature = hmac.new(
+        WEBHOOK_SECRET.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256
+    ).hexdigest()
+    return client.generic(
+        'POST', '/api/payments/webhook', payload,
+        content_type='application/json',
+        HTTP_STRIPE_SIGNATURE=f't={timestamp},v1={signature}',
+    )
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return {p: timings[min(len(timings) - 1, int(len(timings) * p / 100))] * 1000 for p in (50, 95, 99)}
+
+
+def replay(stream):
+    client = Client()
+    timings = []
+    started = time.perf_counter()
+    for event in stream:
+        request_started = time.perf_counter()
+        response = signed_post(client, event)
+        timings.append(time.perf_counter() - request_started)
+        assert response.status_code == 200, response.status_code
+    return timings, time.perf_counter() - started
+
+
+def report(name, timings, elapsed):
+    p = percentiles(timings)
+    print(f"{name:22} {len(timings) / elapsed:9,.0f} req/s   "
+          f"p50 {p[50]:6.2f} ms   p95 {p[95]:6.2f} ms   p99 {p[99]:6.2f} ms")
+
+
+def main():
+    args = parse_args()
+    rng = random.Random(args.seed)
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, keepdb=False)
+    try:
+        with override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET), \
+                mock.patch('payments.views.process_webhook_events'):
+            events = load_events(args.events_file) if args.events_file else generate_events(args.users)
+            stream = deliveries(events, args.redeliveries, rng)
+            print(f"{len(events)} events, {len(stream)} deliveries")
+
+            timings, elapsed = replay(stream)
+            report('ack (queued)', timings, elapsed)
+            stored = WebhookEvent.objects.count()
+
+            started = time.perf_counter()
+            processed = failed = dead_lettered = 0
+            while True:
+                result = drain_webhook_events()
+                processed += result.processed
+                failed += result.failed
+                dead_lettered += result.dead_lettered
+                if not result.processed and not result.dead_lettered:
+                    break
+            drain_elapsed = time.perf_counter() - started
+            print(f"{'drain':22} {processed / drain_elapsed:9,.0f} events/s   "
+                  f"{stored} stored, {processed} processed, {failed} failed, {dead_lettered} dead-lettered")
+
+            # Baseline: the handlers run in the request
+            WebhookEvent.objects.all().delete()
+
+            def process_inline(event):
+                webhook_event, created = record_webhook_event(event)
+                if created:
+                    process_webhook_event(webhook_event)
+                return webhook_event, created
+
+            with mock.patch('payments.views.record_webhook_event', side_effect=process_inline):
+                timings, elapsed = replay(stream)
+            report('processed in request', timings, elapsed)
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
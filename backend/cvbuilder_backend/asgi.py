@@ -3,6 +3,15 @@ ASGI config for cvbuilder_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+This is how the application is served (Dockerfile, docker-compose.yml):
+
+    uvicorn cvbuilder_backend.asgi:application --workers 2
+
+Under ASGI, export_pdf and render_html are served by the native async views
+of resumes/async_views.py (ASYNC_RENDER_VIEWS), and the payment status
+long-poll holds no thread while it waits. manage.py runserver (WSGI) runs
+the sync views only, each long-poll holding a thread.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -12,5 +21,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cvbuilder_backend.settings')
+os.environ.setdefault('ASYNC_RENDER_VIEWS', 'True')
 
 application = get_asgi_application()
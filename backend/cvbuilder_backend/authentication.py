@@ -5,6 +5,7 @@ from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from django.contrib.auth import get_user_model
 from users.supabase_auth import supabase_auth
+from users.user_cache import authenticated_users, sync_user_profile, user_profile
 
 User = get_user_model()
 
@@ -18,6 +19,10 @@ class SupabaseAuthentication(BaseAuthentication):
     2. Validates the token with Supabase
     3. Syncs the Supabase user with local Django user
     4. Returns the Django user for request.user
+
+    Resolved users are cached per process for a few seconds (see
+    users/user_cache.py): a request whose token carries the same profile as
+    the cached user makes no query.
     """
 
     def authenticate(self, request):
@@ -55,6 +60,9 @@ class SupabaseAuthentication(BaseAuthentication):
         """
         Get or create a Django user from Supabase user data.
 
+        The user row is only written when it is created or when the Supabase
+        names differ from the stored ones.
+
         Args:
             supabase_user_data: User data from Supabase
 
@@ -62,30 +70,30 @@ class SupabaseAuthentication(BaseAuthentication):
             Django User instance
         """
         supabase_id = supabase_user_data['id']
-        email = supabase_user_data['email']
-        user_metadata = supabase_user_data.get('user_metadata', {})
+        profile = user_profile(supabase_user_data)
+        email, first_name, last_name = profile
+
+        user = authenticated_users.get(supabase_id, profile)
+        if user is not None:
+            return user
 
         try:
             # Try to find user by email
             user = User.objects.get(email=email)
 
             # Update user metadata if needed
-            if user_metadata:
-                if user_metadata.get('first_name'):
-                    user.first_name = user_metadata['first_name']
-                if user_metadata.get('last_name'):
-                    user.last_name = user_metadata['last_name']
-                user.save()
+            sync_user_profile(user, first_name, last_name)
 
         except User.DoesNotExist:
             # Create new user
             user = User.objects.create(
                 email=email,
-                first_name=user_metadata.get('first_name', ''),
-                last_name=user_metadata.get('last_name', ''),
+                first_name=first_name,
+                last_name=last_name,
                 is_active=True,
             )
 
+        authenticated_users.set(supabase_id, profile, user)
         return user
 
     def authenticate_header(self, request):
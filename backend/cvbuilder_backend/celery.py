@@ -0,0 +1,20 @@
+"""
+Celery application for cvbuilder_backend.
+
+Workers are started with `celery -A cvbuilder_backend worker -l info`,
+periodic tasks (CELERY_BEAT_SCHEDULE) with `celery -A cvbuilder_backend beat -l info`.
+Tasks are discovered from the `tasks.py` module of each installed app.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'cvbuilder_backend.settings')
+
+app = Celery('cvbuilder_backend')
+
+# Read every CELERY_* setting from Django settings
+app.config_from_object('django.conf:settings', namespace='CELERY')
+
+app.autodiscover_tasks()
@@ -168,6 +168,18 @@ SUPABASE_URL = os.getenv('SUPABASE_URL')
 SUPABASE_ANON_KEY = os.getenv('SUPABASE_ANON_KEY')
 SUPABASE_SERVICE_KEY = os.getenv('SUPABASE_SERVICE_KEY')
 SUPABASE_JWT_SECRET = os.getenv('SUPABASE_JWT_SECRET')
+# Signing keys of asymmetric (RS256/ES256) access tokens, URL or local file path
+SUPABASE_JWKS_URL = os.getenv(
+    'SUPABASE_JWKS_URL',
+    f'{SUPABASE_URL}/auth/v1/.well-known/jwks.json' if SUPABASE_URL else ''
+)
+SUPABASE_JWKS_REFRESH_INTERVAL = int(os.getenv('SUPABASE_JWKS_REFRESH_INTERVAL', '600'))
+# Verified access tokens kept per process until they expire (0 disables the cache)
+SUPABASE_TOKEN_CACHE_SIZE = int(os.getenv('SUPABASE_TOKEN_CACHE_SIZE', '4096'))
+
+# Seconds an authenticated user is cached per process (0 disables the cache)
+AUTH_USER_CACHE_TTL = int(os.getenv('AUTH_USER_CACHE_TTL', '30'))
+AUTH_USER_CACHE_SIZE = int(os.getenv('AUTH_USER_CACHE_SIZE', '1024'))
 
 # Frontend URL
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
@@ -259,13 +271,122 @@ else:
     MEDIA_URL = '/media/'
     MEDIA_ROOT = BASE_DIR / 'media'
 
+REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+
+# Django cache (template catalog responses, entitlements, authenticated users).
+# Redis when REDIS_URL is set (docker-compose, production), local memory
+# otherwise; CACHE_BACKEND overrides both
+CACHE_BACKEND = os.getenv(
+    'CACHE_BACKEND',
+    'django.core.cache.backends.redis.RedisCache' if os.getenv('REDIS_URL')
+    else 'django.core.cache.backends.locmem.LocMemCache'
+)
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': REDIS_URL if 'redis' in CACHE_BACKEND else 'cvbuilder',
+        'KEY_PREFIX': 'cvbuilder',
+        'OPTIONS': {
+            'socket_connect_timeout': 1,
+            'socket_timeout': 2,
+        } if 'redis' in CACHE_BACKEND else {},
+    }
+}
+# Lifetime of a cached catalog response, entries are also invalidated on change
+CATALOG_CACHE_TIMEOUT = int(os.getenv('CATALOG_CACHE_TIMEOUT', '3600'))
+# Lifetime of the cached premium status of a user (resumes/entitlements.py),
+# entries are also dropped by the payment webhooks
+ENTITLEMENT_CACHE_TIMEOUT = int(os.getenv('ENTITLEMENT_CACHE_TIMEOUT', '300'))
+
 # Celery Settings
-CELERY_BROKER_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
-CELERY_RESULT_BACKEND = os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = 'UTC'
+# Run tasks inline instead of sending them to the broker (local dev without a worker)
+CELERY_TASK_ALWAYS_EAGER = os.getenv('CELERY_TASK_ALWAYS_EAGER', 'False') == 'True'
+# Seconds between two sweeps of the ended premium subscriptions (users/premium_expiry.py)
+SUBSCRIPTION_EXPIRY_SWEEP_INTERVAL = int(os.getenv('SUBSCRIPTION_EXPIRY_SWEEP_INTERVAL', '900'))
+# Periodic tasks, run by `celery -A cvbuilder_backend beat`
+CELERY_BEAT_SCHEDULE = {
+    'expire-premium-subscriptions': {
+        'task': 'users.tasks.expire_premium_subscriptions',
+        'schedule': SUBSCRIPTION_EXPIRY_SWEEP_INTERVAL,
+    },
+}
+
+# PDF Generation (Playwright browser pool, one pool per worker process)
+PDF_BROWSER_POOL_SIZE = int(os.getenv('PDF_BROWSER_POOL_SIZE', '2'))
+# Recycle a browser after this many renders
+PDF_BROWSER_MAX_RENDERS = int(os.getenv('PDF_BROWSER_MAX_RENDERS', '100'))
+# Close browsers that have been idle for this many seconds (0 = never)
+PDF_BROWSER_IDLE_TIMEOUT = int(os.getenv('PDF_BROWSER_IDLE_TIMEOUT', '300'))
+# Recycle a browser when its processes use more than this much RSS (MB)
+PDF_BROWSER_MAX_MEMORY_MB = int(os.getenv('PDF_BROWSER_MAX_MEMORY_MB', '512'))
+# Pages each browser renders concurrently (raise it under ASGI)
+PDF_BROWSER_PAGES_PER_BROWSER = int(os.getenv('PDF_BROWSER_PAGES_PER_BROWSER', '1'))
+
+# PDF render admission control (per worker process)
+# Renders in flight (0 = pool size * pages per browser)
+PDF_RENDER_MAX_CONCURRENCY = int(os.getenv('PDF_RENDER_MAX_CONCURRENCY', '0'))
+# Requests allowed to wait for a render, the next ones get a 429
+PDF_RENDER_MAX_QUEUE = int(os.getenv('PDF_RENDER_MAX_QUEUE', '20'))
+# Seconds a request may wait for a render before getting a 503
+PDF_RENDER_MAX_QUEUE_WAIT = float(os.getenv('PDF_RENDER_MAX_QUEUE_WAIT', '10'))
+
+# Coalescing of identical concurrent renders across processes
+# (resumes.render_coalescing.RedisRenderLock or resumes.render_coalescing.LocalRenderLock,
+# empty = in-process only)
+PDF_RENDER_LOCK_BACKEND = os.getenv('PDF_RENDER_LOCK_BACKEND', 'resumes.render_coalescing.RedisRenderLock')
+# Lifetime of a render lock and of the shared PDF (seconds)
+PDF_RENDER_LOCK_TTL = int(os.getenv('PDF_RENDER_LOCK_TTL', '60'))
+# Seconds to wait for a render running in another process before rendering
+PDF_RENDER_LOCK_WAIT = int(os.getenv('PDF_RENDER_LOCK_WAIT', '30'))
+
+# Serve export_pdf and render_html with native async views (set by asgi.py)
+ASYNC_RENDER_VIEWS = os.getenv('ASYNC_RENDER_VIEWS', 'False') == 'True'
+
+# Maximum number of compiled Handlebars templates kept in memory per process
+COMPILED_TEMPLATE_CACHE_SIZE = int(os.getenv('COMPILED_TEMPLATE_CACHE_SIZE', '128'))
+
+# Maximum number of resume render contexts kept in memory per process
+RESUME_CONTEXT_CACHE_SIZE = int(os.getenv('RESUME_CONTEXT_CACHE_SIZE', '256'))
+
+# Content-addressed cache of generated PDFs
+PDF_CACHE_ENABLED = os.getenv('PDF_CACHE_ENABLED', 'True') == 'True'
+# StoragePDFCache uses the default storage (local media or GCS),
+# FileSystemPDFCache uses the local PDF_CACHE_DIR directory
+PDF_CACHE_BACKEND = os.getenv('PDF_CACHE_BACKEND', 'resumes.pdf_cache.StoragePDFCache')
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR', str(BASE_DIR / 'pdf_cache'))
+# Size of the cached PDFs each process keeps before evicting the least recently used
+PDF_CACHE_MAX_BYTES = int(os.getenv('PDF_CACHE_MAX_BYTES', str(500 * 1024 * 1024)))
+
+# PDF export jobs (export_pdf_async) and their files are deleted this many
+# seconds after their creation, by a periodic task
+PDF_EXPORT_JOB_RETENTION = int(os.getenv('PDF_EXPORT_JOB_RETENTION', str(24 * 3600)))
+PDF_EXPORT_JOB_CLEANUP_INTERVAL = int(os.getenv('PDF_EXPORT_JOB_CLEANUP_INTERVAL', '3600'))
+CELERY_BEAT_SCHEDULE['delete-expired-pdf-export-jobs'] = {
+    'task': 'resumes.tasks.delete_expired_pdf_export_jobs',
+    'schedule': PDF_EXPORT_JOB_CLEANUP_INTERVAL,
+}
+
+# Assets inlined before rendering (see resumes/asset_inliner.py)
+# Longest side of the photo embedded in PDFs, in pixels
+PDF_PHOTO_MAX_PX = int(os.getenv('PDF_PHOTO_MAX_PX', '600'))
+# Uploaded photo renditions (see resumes/photo_pipeline.py), the print
+# rendition uses PDF_PHOTO_MAX_PX
+PHOTO_PREVIEW_MAX_PX = int(os.getenv('PHOTO_PREVIEW_MAX_PX', '320'))
+PHOTO_PLACEHOLDER_PX = int(os.getenv('PHOTO_PLACEHOLDER_PX', '16'))
+# Uploads with more pixels are rejected before being decoded
+PHOTO_MAX_PIXELS = int(os.getenv('PHOTO_MAX_PIXELS', '40000000'))
+# Local copies of the web fonts used by templates (manage.py cache_pdf_fonts)
+PDF_FONT_CACHE_DIR = os.getenv('PDF_FONT_CACHE_DIR', str(BASE_DIR / 'font_cache'))
+# Abort every outbound request of the render browsers
+PDF_BLOCK_NETWORK = os.getenv('PDF_BLOCK_NETWORK', 'True') == 'True'
+# Load state awaited before printing ('load', 'domcontentloaded' or 'networkidle')
+PDF_WAIT_UNTIL = os.getenv('PDF_WAIT_UNTIL', 'load')
 
 # Authentication Backends
 AUTHENTICATION_BACKENDS = [
@@ -277,6 +398,31 @@ STRIPE_PUBLIC_KEY = os.environ.get('STRIPE_PUBLIC_KEY', '')
 STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY', '')
 STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
 
+# Webhook events are processed by a Celery worker (payments/webhooks.py)
+# Attempts before an event is dead-lettered
+STRIPE_WEBHOOK_MAX_ATTEMPTS = int(os.getenv('STRIPE_WEBHOOK_MAX_ATTEMPTS', '8'))
+# Delay before the first retry in seconds, doubled at each attempt up to the max
+STRIPE_WEBHOOK_RETRY_DELAY = int(os.getenv('STRIPE_WEBHOOK_RETRY_DELAY', '30'))
+STRIPE_WEBHOOK_MAX_RETRY_DELAY = int(os.getenv('STRIPE_WEBHOOK_MAX_RETRY_DELAY', '3600'))
+# Events read per drain
+STRIPE_WEBHOOK_BATCH_SIZE = int(os.getenv('STRIPE_WEBHOOK_BATCH_SIZE', '100'))
+# Seconds between two periodic drains, which pick up events whose task was lost
+STRIPE_WEBHOOK_DRAIN_INTERVAL = int(os.getenv('STRIPE_WEBHOOK_DRAIN_INTERVAL', '60'))
+CELERY_BEAT_SCHEDULE['drain-webhook-events'] = {
+    'task': 'payments.tasks.process_webhook_events',
+    'schedule': STRIPE_WEBHOOK_DRAIN_INTERVAL,
+}
+
+# Payment status long-poll (payments/async_views.py)
+# Notifications published by the webhook worker
+# (payments.payment_events.RedisPaymentNotifier or payments.payment_events.LocalPaymentNotifier,
+# empty = waiting requests poll the database)
+PAYMENT_NOTIFIER_BACKEND = os.getenv('PAYMENT_NOTIFIER_BACKEND', 'payments.payment_events.RedisPaymentNotifier')
+# Maximum time a request waits for the payment status (seconds)
+PAYMENT_STATUS_WAIT_TIMEOUT = int(os.getenv('PAYMENT_STATUS_WAIT_TIMEOUT', '25'))
+# Database polling interval when no notifier is available (seconds)
+PAYMENT_STATUS_POLL_INTERVAL = float(os.getenv('PAYMENT_STATUS_POLL_INTERVAL', '1'))
+
 # Stripe Price IDs (must be created in Stripe Dashboard)
 # Single CV purchase (one-time payment of 2.40€)
 STRIPE_SINGLE_CV_PRICE_ID = os.environ.get('STRIPE_SINGLE_CV_PRICE_ID', '')
@@ -22,11 +22,25 @@ class SubscriptionAdmin(admin.ModelAdmin):
 
 @admin.register(WebhookEvent)
 class WebhookEventAdmin(admin.ModelAdmin):
-    list_display = ['event_id', 'event_type', 'processed', 'created_at']
-    list_filter = ['processed', 'event_type', 'created_at']
-    search_fields = ['event_id', 'event_type']
-    readonly_fields = ['created_at', 'event_id', 'event_type', 'payload']
+    list_display = ['event_id', 'event_type', 'processed', 'attempts', 'dead_lettered_at', 'created_at']
+    list_filter = ['processed', ('dead_lettered_at', admin.EmptyFieldListFilter), 'event_type', 'created_at']
+    search_fields = ['event_id', 'event_type', 'object_id']
+    readonly_fields = [
+        'created_at', 'event_id', 'event_type', 'payload', 'object_id', 'stripe_created_at',
+        'processed_at', 'attempts', 'next_attempt_at', 'dead_lettered_at',
+    ]
     date_hierarchy = 'created_at'
+    actions = ['requeue_events']
+
+    @admin.action(description='Remettre en file les événements sélectionnés')
+    def requeue_events(self, request, queryset):
+        from .tasks import process_webhook_events
+
+        count = queryset.filter(processed=False).update(
+            dead_lettered_at=None, attempts=0, next_attempt_at=None
+        )
+        process_webhook_events.delay()
+        self.message_user(request, f'{count} événement(s) remis en file')
 
     def has_add_permission(self, request):
         return False  # Les webhooks sont créés automatiquement
@@ -0,0 +1,102 @@
+"""
+Long-poll payment status endpoint.
+
+GET /api/payments/check-status/wait?session_id=...&resume_id=...&timeout=25
+
+Returns the CheckPaymentStatusView payload as soon as the payment of the
+checkout session is no longer pending, or with the pending status once the
+timeout passes (at most PAYMENT_STATUS_WAIT_TIMEOUT seconds): the success
+page makes one request per checkout instead of polling every second.
+
+It is a native async view: under ASGI a waiting request holds no thread.
+The webhook worker publishes the new status (payments/payment_events.py);
+without a notifier the view polls the database.
+"""
+
+import asyncio
+import logging
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse
+from rest_framework import status
+
+from .models import Payment
+from .payment_events import payment_status_subscription
+from .views import payment_status_payload
+
+logger = logging.getLogger(__name__)
+
+
+def _get_payment(session_id):
+    return Payment.objects.filter(stripe_checkout_session_id=session_id).afirst()
+
+
+async def wait_payment_status(request):
+    """
+    Wait for the payment of a checkout session to leave the pending status.
+    """
+    if request.method != 'GET':
+        return JsonResponse(
+            {'detail': f'Method "{request.method}" not allowed.'},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+
+    session_id = request.GET.get('session_id')
+    resume_id = request.GET.get('resume_id')
+    if not session_id:
+        return JsonResponse({
+            'error': 'session_id is required'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    max_wait = getattr(settings, 'PAYMENT_STATUS_WAIT_TIMEOUT', 25)
+    try:
+        timeout = min(float(request.GET.get('timeout', max_wait)), max_wait)
+    except ValueError:
+        return JsonResponse({
+            'error': 'timeout must be a number of seconds'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    poll_interval = getattr(settings, 'PAYMENT_STATUS_POLL_INTERVAL', 1)
+
+    try:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+
+        # Subscribe before reading the payment: a status published in
+        # between is not missed
+        async with payment_status_subscription(session_id) as subscription:
+            payment = await _get_payment(session_id)
+            if payment is None:
+                return JsonResponse({
+                    'status': 'not_found',
+                    'message': 'Payment not found'
+                }, status=status.HTTP_404_NOT_FOUND)
+
+            notified = False
+            while payment.status == 'pending':
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                if subscription is not None:
+                    # Once a notification left the payment pending (a
+                    # non-final status, or published before the commit), the
+                    # database is also read every poll interval
+                    wait = min(poll_interval, remaining) if notified else remaining
+                    try:
+                        if await subscription.wait(wait) is not None:
+                            notified = True
+                    except Exception as e:
+                        logger.warning(f"Payment notifier failed, polling checkout session {session_id}: {str(e)}")
+                        subscription = None
+                else:
+                    await asyncio.sleep(min(poll_interval, remaining))
+                payment = await _get_payment(session_id)
+
+        payload = await sync_to_async(payment_status_payload)(payment, resume_id)
+        return JsonResponse(payload, status=status.HTTP_200_OK)
+
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Failed to check payment status',
+            'detail': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -0,0 +1,55 @@
+"""
+Management command to process the pending Stripe webhook events.
+
+Events are normally processed by the Celery worker right after they are
+received (payments/webhooks.py). Use this command to drain the queue
+without a worker, after an outage of the broker for instance, or with
+--requeue-dead to retry the dead-lettered events.
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from payments.models import WebhookEvent
+from payments.webhooks import drain_webhook_events, pending_webhook_events
+
+
+class Command(BaseCommand):
+    help = 'Process the pending Stripe webhook events'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requeue-dead',
+            action='store_true',
+            help='Retry the dead-lettered events too',
+        )
+        parser.add_argument(
+            '--retry-now',
+            action='store_true',
+            help='Do not wait for the scheduled retry of failed events',
+        )
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            requeued = WebhookEvent.objects.filter(
+                processed=False, dead_lettered_at__isnull=False
+            ).update(dead_lettered_at=None, attempts=0, next_attempt_at=None)
+            self.stdout.write(f'{requeued} dead-lettered event(s) requeued')
+
+        if options['retry_now']:
+            pending_webhook_events().filter(~Q(next_attempt_at=None)).update(next_attempt_at=None)
+
+        processed = failed = dead_lettered = 0
+        while True:
+            result = drain_webhook_events()
+            processed += result.processed
+            failed += result.failed
+            dead_lettered += result.dead_lettered
+            # Stop when a drain made no progress: the rest waits for a retry
+            if not result.processed and not result.dead_lettered:
+                break
+
+        remaining = pending_webhook_events().count()
+        self.stdout.write(self.style.SUCCESS(
+            f'{processed} processed, {failed} failed, {dead_lettered} dead-lettered, '
+            f'{remaining} pending'
+        ))
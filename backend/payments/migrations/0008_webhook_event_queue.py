@@ -0,0 +1,63 @@
+# Generated by Django 4.2.16 on 2026-10-18 03:16
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def dead_letter_failed_events(apps, schema_editor):
+    """
+    Events that failed before the worker existed were never retried: they are
+    dead-lettered rather than replayed on deploy (requeue them from the admin)
+    """
+    WebhookEvent = apps.get_model("payments", "WebhookEvent")
+    WebhookEvent.objects.filter(processed=False).update(
+        dead_lettered_at=timezone.now(), attempts=1
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("payments", "0007_recreate_foreign_keys"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="webhookevent",
+            name="attempts",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="dead_lettered_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="next_attempt_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="object_id",
+            field=models.CharField(blank=True, db_index=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="processed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="webhookevent",
+            name="stripe_created_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="webhookevent",
+            index=models.Index(
+                fields=["processed", "dead_lettered_at", "stripe_created_at"],
+                name="webhook_eve_process_c7460d_idx",
+            ),
+        ),
+        migrations.RunPython(dead_letter_failed_events, migrations.RunPython.noop),
+    ]
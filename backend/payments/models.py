@@ -120,14 +120,28 @@ class Subscription(models.Model):
 
 
 class WebhookEvent(models.Model):
-    """Track Stripe webhook events for debugging and auditing"""
+    """
+    Stripe webhook event, queued by the webhook view and processed by a
+    worker (see payments/webhooks.py)
+    """
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
     event_id = models.CharField(max_length=255, unique=True)
     event_type = models.CharField(max_length=100)
     payload = models.JSONField()
+    # Stripe object the event is about (subscription of invoice events):
+    # events of the same object are processed in order
+    object_id = models.CharField(max_length=255, blank=True, db_index=True)
+    # Event creation time at Stripe, processing order
+    stripe_created_at = models.DateTimeField(blank=True, null=True)
+
     processed = models.BooleanField(default=False)
+    processed_at = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(blank=True, null=True)
+    # Set when the event failed too many times, it is no longer retried
+    dead_lettered_at = models.DateTimeField(blank=True, null=True)
     error_message = models.TextField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -135,6 +149,9 @@ class WebhookEvent(models.Model):
     class Meta:
         db_table = 'webhook_events'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['processed', 'dead_lettered_at', 'stripe_created_at']),
+        ]
 
     def __str__(self):
         return f"Webhook {self.event_type} - {self.event_id}"
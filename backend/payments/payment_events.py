@@ -0,0 +1,181 @@
+"""
+Payment status notifications for the long-poll status endpoint.
+
+After checkout, the frontend waits for the webhook to mark the payment as
+succeeded. Instead of polling check-status every second, it calls
+check-status/wait (payments/async_views.py), which holds the request until
+the webhook worker publishes the new status of the checkout session or the
+timeout passes.
+
+Notifier backends (PAYMENT_NOTIFIER_BACKEND):
+- RedisPaymentNotifier: Redis pub/sub (REDIS_URL), the webhook worker and
+  the web processes can be different machines
+- LocalPaymentNotifier: in-memory stand-in with the same interface, for
+  tests and single-process deployments (eager Celery)
+
+Notifications are an optimization: if the backend is unreachable, waiting
+requests poll the database every PAYMENT_STATUS_POLL_INTERVAL seconds.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def payment_channel(session_id: str) -> str:
+    """Channel of a checkout session"""
+    return f'payment-status:{session_id}'
+
+
+class LocalSubscription:
+    def __init__(self, queue):
+        self._queue = queue
+
+    async def wait(self, timeout: float) -> Optional[str]:
+        """Wait for the next message, None on timeout"""
+        try:
+            return await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalPaymentNotifier:
+    """In-memory pub/sub (one process only), publish() may be called from any thread"""
+
+    def __init__(self):
+        self._waiters = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, channel: str, message: str) -> None:
+        with self._lock:
+            waiters = list(self._waiters.get(channel, ()))
+        for loop, queue in waiters:
+            loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        loop = asyncio.get_running_loop()
+        waiter = (loop, asyncio.Queue())
+        with self._lock:
+            self._waiters[channel].add(waiter)
+        try:
+            yield LocalSubscription(waiter[1])
+        finally:
+            with self._lock:
+                self._waiters[channel].discard(waiter)
+                if not self._waiters[channel]:
+                    del self._waiters[channel]
+
+
+class RedisSubscription:
+    def __init__(self, pubsub):
+        self._pubsub = pubsub
+
+    async def wait(self, timeout: float) -> Optional[str]:
+        """Wait for a message, None on timeout"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return None
+            message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+            if message is not None and message['type'] == 'message':
+                return message['data'].decode()
+
+
+class RedisPaymentNotifier:
+    """Pub/sub shared by every process through Redis"""
+
+    def __init__(self, url: Optional[str] = None):
+        import redis
+
+        self.url = url or settings.REDIS_URL
+        self.client = redis.Redis.from_url(self.url, socket_connect_timeout=1, socket_timeout=2)
+
+    def publish(self, channel: str, message: str) -> None:
+        self.client.publish(channel, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel: str):
+        import redis.asyncio
+
+        # One connection per waiting request, messages are read without a socket timeout
+        client = redis.asyncio.Redis.from_url(self.url, socket_connect_timeout=1)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            yield RedisSubscription(pubsub)
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_notifier = None
+_notifier_pid: Optional[int] = None
+_notifier_lock = threading.Lock()
+
+
+def get_payment_notifier():
+    """Return the payment notifier of the current process, None if disabled or unavailable"""
+    global _notifier, _notifier_pid
+
+    pid = os.getpid()
+    if _notifier_pid == pid:
+        return _notifier
+
+    with _notifier_lock:
+        if _notifier_pid != pid:
+            backend = getattr(settings, 'PAYMENT_NOTIFIER_BACKEND', None)
+            _notifier = None
+            if backend:
+                try:
+                    _notifier = import_string(backend)()
+                except Exception as e:
+                    logger.warning(f"Payment notifier unavailable, status waits poll the database: {str(e)}")
+            _notifier_pid = pid
+    return _notifier
+
+
+def notify_payment_status(session_id: str, payment_status: str) -> None:
+    """Wake up the requests waiting for a checkout session (call after commit)"""
+    notifier = get_payment_notifier()
+    if notifier is None:
+        return
+    try:
+        notifier.publish(payment_channel(session_id), payment_status)
+    except Exception as e:
+        logger.warning(f"Failed to publish the status of checkout session {session_id}: {str(e)}")
+
+
+@asynccontextmanager
+async def payment_status_subscription(session_id: str):
+    """
+    Subscribe to the status notifications of a checkout session.
+
+    Yields a subscription (`await subscription.wait(timeout)`), or None when
+    no notifier is available: the caller then polls.
+    """
+    notifier = get_payment_notifier()
+    subscription = None
+    if notifier is not None:
+        try:
+            context = notifier.subscribe(payment_channel(session_id))
+            subscription = await context.__aenter__()
+        except Exception as e:
+            logger.warning(f"Failed to subscribe to checkout session {session_id}: {str(e)}")
+            subscription = None
+    try:
+        yield subscription
+    finally:
+        if subscription is not None:
+            await context.__aexit__(None, None, None)
@@ -0,0 +1,32 @@
+"""
+Celery tasks for the payments app.
+"""
+
+import logging
+
+from celery import shared_task
+
+from .webhooks import drain_webhook_events
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(ignore_result=True)
+def process_webhook_events():
+    """
+    Process the pending Stripe webhook events (see payments/webhooks.py).
+
+    Enqueued by the webhook view for every new event and run periodically
+    by Celery beat. When the batch was full, the task runs again right away;
+    when events failed, it schedules itself again for the earliest retry.
+    """
+    result = drain_webhook_events()
+    if result.processed or result.failed or result.dead_lettered:
+        logger.info(
+            f"Webhook events: {result.processed} processed, {result.failed} failed, "
+            f"{result.dead_lettered} dead-lettered"
+        )
+    if result.batch_full and (result.processed or result.dead_lettered):
+        process_webhook_events.delay()
+    elif result.next_retry_in is not None:
+        process_webhook_events.apply_async(countdown=result.next_retry_in)
@@ -1,3 +1,383 @@
-from django.test import TestCase
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from resumes.entitlements import resolve_entitlements, user_cache_key
+from resumes.models import Resume, Template
+from .async_views import _get_payment
+from .models import Payment, Subscription, WebhookEvent
+from .payment_events import LocalPaymentNotifier, payment_channel
+from .tasks import process_webhook_events
+from .webhooks import HANDLERS, drain_webhook_events
+
+User = get_user_model()
+
+WEBHOOK_SECRET = 'whsec_test'
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# The suite runs against a local-memory cache, whatever CACHE_BACKEND and
+# REDIS_URL the environment sets
+_cache_override = override_settings(CACHES=LOCMEM_CACHES)
+
+
+def setUpModule():
+    _cache_override.enable()
+
+
+def tearDownModule():
+    _cache_override.disable()
+
+
+def stripe_event(event_type, obj, created=None, event_id=None):
+    return {
+        'id': event_id or f'evt_{uuid.uuid4().hex}',
+        'object': 'event',
+        'type': event_type,
+        'created': created or int(time.time()),
+        'data': {'object': obj},
+    }
+
+
+def signature_header(payload, secret=WEBHOOK_SECRET):
+    """Stripe-Signature header of a payload (v1 scheme)"""
+    timestamp = int(time.time())
+    signature = hmac.new(
+        secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256
+    ).hexdigest()
+    return f't={timestamp},v1={signature}'
+
+
+def subscription_object(subscription_id, status='active', user=None, period_end=None):
+    now = int(time.time())
+    return {
+        'id': subscription_id,
+        'object': 'subscription',
+        'customer': 'cus_123',
+        'status': status,
+        'metadata': {'user_id': str(user.id)} if user else {},
+        'items': {'data': [{'price': {'id': 'price_monthly'}}]},
+        'current_period_start': now,
+        'current_period_end': period_end or now + 30 * 86400,
+    }
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET)
+class StripeWebhookViewTests(TestCase):
+    """The webhook view stores events once and acknowledges them"""
+
+    def setUp(self):
+        self.client = APIClient()
+        patcher = mock.patch('payments.views.process_webhook_events')
+        self.task = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, event, secret=WEBHOOK_SECRET):
+        payload = json.dumps(event)
+        return self.client.generic(
+            'POST', '/api/payments/webhook', payload,
+            content_type='application/json',
+            HTTP_STRIPE_SIGNATURE=signature_header(payload, secret),
+        )
+
+    def test_event_is_stored_and_processed_later(self):
+        payment = Payment.objects.create(
+            stripe_checkout_session_id='cs_123', amount=2.40, payment_type='single'
+        )
+        event = stripe_event('checkout.session.completed', {'id': 'cs_123', 'metadata': {}})
+
+        response = self.post(event)
+
+        self.assertEqual(response.status_code, 200)
+        webhook_event = WebhookEvent.objects.get(event_id=event['id'])
+        self.assertFalse(webhook_event.processed)
+        self.assertEqual(webhook_event.object_id, 'cs_123')
+        self.task.delay.assert_called_once_with()
+        payment.refresh_from_db()
+        self.assertEqual(payment.status, 'pending')
+
+    def test_redelivered_event_is_acknowledged_once(self):
+        event = stripe_event('invoice.payment_failed', {'id': 'in_123', 'subscription': 'sub_123'})
+
+        self.assertEqual(self.post(event).status_code, 200)
+        self.assertEqual(self.post(event).status_code, 200)
+        self.assertEqual(WebhookEvent.objects.filter(event_id=event['id']).count(), 1)
+
+        drain_webhook_events()
+        self.task.reset_mock()
+        self.assertEqual(self.post(event).status_code, 200)
+        self.task.delay.assert_not_called()
+
+    def test_invalid_signature_is_rejected(self):
+        event = stripe_event('invoice.payment_failed', {'id': 'in_123'})
+
+        response = self.post(event, secret='whsec_other')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_event_is_stored_when_the_broker_is_down(self):
+        self.task.delay.side_effect = ConnectionError('broker down')
+        event = stripe_event('invoice.payment_failed', {'id': 'in_123'})
+
+        response = self.post(event)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(WebhookEvent.objects.filter(event_id=event['id']).exists())
+
+
+@override_settings(STRIPE_WEBHOOK_MAX_ATTEMPTS=3, STRIPE_WEBHOOK_RETRY_DELAY=30)
+class WebhookDrainTests(TestCase):
+    """The worker processes pending events in order, with retries and dead-lettering"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='jean@example.com', password='secret123')
+
+    def receive(self, event_type, obj, created=None):
+        event = stripe_event(event_type, obj, created)
+        return WebhookEvent.objects.create(
+            event_id=event['id'],
+            event_type=event_type,
+            payload=event,
+            object_id=obj['id'],
+            stripe_created_at=timezone.now() + timedelta(seconds=created or 0),
+        )
+
+    def test_checkout_completed(self):
+        resume = Resume.objects.create(user=self.user)
+        payment = Payment.objects.create(
+            stripe_checkout_session_id='cs_123', amount=2.40, payment_type='single'
+        )
+        self.receive('checkout.session.completed', {
+            'id': 'cs_123',
+            'payment_intent': 'pi_123',
+            'metadata': {'payment_type': 'single', 'resume_id': str(resume.id), 'user_id': str(self.user.id)},
+        })
+
+        result = drain_webhook_events()
+
+        self.assertEqual(result.processed, 1)
+        payment.refresh_from_db()
+        self.assertEqual((payment.status, payment.user), ('succeeded', self.user))
+        resume.refresh_from_db()
+        self.assertTrue(resume.is_paid)
+        self.assertTrue(WebhookEvent.objects.get().processed)
+
+    def test_events_are_processed_in_stripe_order(self):
+        # The update was delivered first but happened after the creation
+        self.receive('customer.subscription.updated', subscription_object('sub_123', 'past_due'), created=20)
+        self.receive('customer.subscription.created', subscription_object('sub_123', user=self.user), created=10)
+
+        self.assertEqual(drain_webhook_events().processed, 2)
+
+        subscription = Subscription.objects.get(stripe_subscription_id='sub_123')
+        self.assertEqual(subscription.status, 'past_due')
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_premium)
+
+    @override_settings(STRIPE_WEBHOOK_BATCH_SIZE=2)
+    def test_task_runs_again_while_batches_are_full(self):
+        for index in range(3):
+            self.receive('invoice.payment_failed', {'id': f'in_{index}', 'subscription': f'sub_{index}'}, index)
+
+        with mock.patch.object(process_webhook_events, 'delay') as delay:
+            process_webhook_events()
+            self.assertEqual(delay.call_count, 1)
+            process_webhook_events()
+            self.assertEqual(delay.call_count, 1)
+
+        self.assertFalse(WebhookEvent.objects.filter(processed=False).exists())
+
+    def test_drain_runs_periodically(self):
+        tasks = [entry['task'] for entry in settings.CELERY_BEAT_SCHEDULE.values()]
+        self.assertIn('payments.tasks.process_webhook_events', tasks)
+
+    def test_premium_changes_invalidate_cached_entitlements(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        template = Template.objects.create(name='Premium', template_html='<p></p>', is_premium=True)
+        resume = Resume.objects.create(user=self.user, template=template)
+        self.receive('customer.subscription.created', subscription_object('sub_123', user=self.user), 10)
+        with self.captureOnCommitCallbacks(execute=True):
+            drain_webhook_events()
+        self.assertTrue(resolve_entitlements(Resume.objects.get(pk=resume.pk)).can_export)
+
+        self.receive('customer.subscription.deleted', subscription_object('sub_123'), 20)
+        with self.captureOnCommitCallbacks(execute=True):
+            drain_webhook_events()
+
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertFalse(resolve_entitlements(Resume.objects.get(pk=resume.pk)).can_export)
+
+    def test_failed_event_is_retried_and_blocks_its_object(self):
+        failing = mock.Mock(side_effect=RuntimeError('database is busy'))
+        with mock.patch.dict(HANDLERS, {'customer.subscription.created': failing}):
+            created = self.receive('customer.subscription.created', subscription_object('sub_1', user=self.user), 10)
+            later = self.receive('customer.subscription.deleted', subscription_object('sub_1'), 20)
+            other = self.receive('invoice.payment_failed', {'id': 'in_2', 'subscription': 'sub_2'}, 30)
+
+            result = drain_webhook_events()
+
+        self.assertEqual((result.processed, result.failed), (1, 1))
+        self.assertEqual(result.next_retry_in, 30)
+        created.refresh_from_db()
+        self.assertEqual(created.attempts, 1)
+        self.assertEqual(created.error_message, 'database is busy')
+        self.assertGreater(created.next_attempt_at, timezone.now())
+        later.refresh_from_db()
+        self.assertFalse(later.processed)
+        other.refresh_from_db()
+        self.assertTrue(other.processed)
+
+        # Not due yet
+        self.assertEqual(drain_webhook_events().processed, 0)
+
+        WebhookEvent.objects.filter(pk=created.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(drain_webhook_events().processed, 2)
+        self.assertTrue(Subscription.objects.filter(stripe_subscription_id='sub_1', status='canceled').exists())
+
+    def test_failed_handler_writes_are_rolled_back(self):
+        def handler(event):
+            Payment.objects.create(stripe_checkout_session_id='cs_partial', amount=1, payment_type='single')
+            raise RuntimeError('boom')
+
+        with mock.patch.dict(HANDLERS, {'checkout.session.completed': handler}):
+            self.receive('checkout.session.completed', {'id': 'cs_123'})
+            drain_webhook_events()
+
+        self.assertFalse(Payment.objects.filter(stripe_checkout_session_id='cs_partial').exists())
+
+    def test_event_is_dead_lettered_after_max_attempts(self):
+        failing = mock.Mock(side_effect=RuntimeError('boom'))
+        with mock.patch.dict(HANDLERS, {'invoice.payment_failed': failing}):
+            event = self.receive('invoice.payment_failed', {'id': 'in_1', 'subscription': 'sub_1'})
+            later = self.receive('invoice.payment_succeeded', {'id': 'in_2', 'subscription': 'sub_1'}, 10)
+            for _ in range(3):
+                WebhookEvent.objects.filter(pk=event.pk).update(next_attempt_at=None)
+                result = drain_webhook_events()
+
+        self.assertEqual(result.dead_lettered, 1)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, 3)
+        self.assertIsNotNone(event.dead_lettered_at)
+        self.assertFalse(event.processed)
+        # Later events of the object are no longer held back
+        later.refresh_from_db()
+        self.assertTrue(later.processed)
+        self.assertEqual(drain_webhook_events().processed, 0)
+
+
+@override_settings(PAYMENT_STATUS_WAIT_TIMEOUT=5, PAYMENT_STATUS_POLL_INTERVAL=0.05)
+class WaitPaymentStatusTests(TestCase):
+    """check-status/wait answers as soon as the payment is no longer pending"""
+
+    url = '/api/payments/check-status/wait'
+
+    def setUp(self):
+        self.notifier = LocalPaymentNotifier()
+        patcher = mock.patch('payments.payment_events.get_payment_notifier', return_value=self.notifier)
+        self.get_notifier = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.payment = Payment.objects.create(
+            stripe_checkout_session_id='cs_123', amount=2.40, payment_type='single'
+        )
+
+    async def complete_payment(self, delay, publish=True):
+        await asyncio.sleep(delay)
+        await Payment.objects.filter(pk=self.payment.pk).aupdate(status='succeeded')
+        if publish:
+            self.notifier.publish(payment_channel('cs_123'), 'succeeded')
+
+    async def test_succeeded_payment_is_returned_immediately(self):
+        await Payment.objects.filter(pk=self.payment.pk).aupdate(status='succeeded')
+
+        response = await self.async_client.get(self.url, {'session_id': 'cs_123'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'succeeded')
+
+    async def test_waiting_request_is_woken_by_the_notification(self):
+        started = time.monotonic()
+        completion = asyncio.ensure_future(self.complete_payment(0.1))
+
+        response = await self.async_client.get(self.url, {'session_id': 'cs_123'})
+        await completion
+
+        self.assertEqual(response.json()['status'], 'succeeded')
+        self.assertLess(time.monotonic() - started, 2)
+
+    async def test_early_notification_does_not_spin(self):
+        # The status is published before the payment row is committed
+        async def publish_then_complete():
+            await asyncio.sleep(0.05)
+            self.notifier.publish(payment_channel('cs_123'), 'succeeded')
+            await self.complete_payment(0.3, publish=False)
+
+        completion = asyncio.ensure_future(publish_then_complete())
+        with mock.patch('payments.async_views._get_payment', side_effect=_get_payment) as get_payment:
+            response = await self.async_client.get(self.url, {'session_id': 'cs_123'})
+        await completion
+
+        self.assertEqual(response.json()['status'], 'succeeded')
+        # Initial read, the notification, then about one read per poll interval
+        self.assertLess(get_payment.call_count, 15)
+
+    async def test_local_subscription_receives_every_message(self):
+        async with self.notifier.subscribe('channel') as subscription:
+            self.notifier.publish('channel', 'pending')
+            self.notifier.publish('channel', 'succeeded')
+
+            self.assertEqual(await subscription.wait(1), 'pending')
+            self.assertEqual(await subscription.wait(1), 'succeeded')
+            self.assertIsNone(await subscription.wait(0.01))
+
+    async def test_pending_status_is_returned_after_the_timeout(self):
+        response = await self.async_client.get(self.url, {'session_id': 'cs_123', 'timeout': '0.1'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'pending')
+
+    async def test_database_is_polled_without_a_notifier(self):
+        self.get_notifier.return_value = None
+        completion = asyncio.ensure_future(self.complete_payment(0.1, publish=False))
+
+        response = await self.async_client.get(self.url, {'session_id': 'cs_123'})
+        await completion
+
+        self.assertEqual(response.json()['status'], 'succeeded')
+
+    def test_checkout_completion_publishes_the_status(self):
+        WebhookEvent.objects.create(
+            event_id='evt_1',
+            event_type='checkout.session.completed',
+            payload=stripe_event('checkout.session.completed', {'id': 'cs_123', 'metadata': {}}),
+            object_id='cs_123',
+        )
+
+        with mock.patch.object(self.notifier, 'publish') as publish, \
+                self.captureOnCommitCallbacks(execute=True):
+            drain_webhook_events()
+
+        publish.assert_called_once_with(payment_channel('cs_123'), 'succeeded')
+
+    async def test_invalid_requests(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.async_client.get(self.url, {'session_id': 'cs_123', 'timeout': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+        response = await self.async_client.get(self.url, {'session_id': 'cs_unknown'})
+        self.assertEqual(response.status_code, 404)
@@ -1,4 +1,5 @@
 from django.urls import path
+from .async_views import wait_payment_status
 from .views import (
     CreateCheckoutSessionView,
     StripeWebhookView,
@@ -22,6 +23,8 @@ urlpatterns = [
     # Payment Status Check
     path('check-status/', CheckPaymentStatusView.as_view(), name='check_payment_status'),
     path('check-status', CheckPaymentStatusView.as_view(), name='check_payment_status_no_slash'),
+    path('check-status/wait/', wait_payment_status, name='wait_payment_status'),
+    path('check-status/wait', wait_payment_status, name='wait_payment_status_no_slash'),
 
     # Payment & Subscription Management
     path('payments/', PaymentListView.as_view(), name='payment_list'),
@@ -6,13 +6,18 @@ from django.http import HttpResponse
 from rest_framework import status, permissions, generics
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import Payment, Subscription, WebhookEvent
+from .models import Payment, Subscription
 from .serializers import (
     PaymentSerializer,
     SubscriptionSerializer,
     CreateCheckoutSessionSerializer
 )
+from .tasks import process_webhook_events
+from .webhooks import record_webhook_event
 from resumes.models import Resume
+import logging
+
+logger = logging.getLogger(__name__)
 
 # Configure Stripe
 stripe.api_key = settings.STRIPE_SECRET_KEY
@@ -146,15 +151,12 @@ class CreateCheckoutSessionView(APIView):
 @method_decorator(csrf_exempt, name='dispatch')
 class StripeWebhookView(APIView):
     """
-    Stripe webhook handler.
-
-    Handles:
-    - checkout.session.completed
-    - customer.subscription.created
-    - customer.subscription.updated
-    - customer.subscription.deleted
-    - invoice.payment_succeeded
-    - invoice.payment_failed
+    Stripe webhook endpoint.
+
+    Verifies the signature, stores the event once (redeliveries are
+    acknowledged without being processed again) and acknowledges it right
+    away. Events are processed by a worker, see payments/webhooks.py for the
+    handled event types, ordering, retries and dead-lettering.
     """
     permission_classes = [permissions.AllowAny]
 
@@ -174,232 +176,19 @@ class StripeWebhookView(APIView):
             # Invalid signature
             return HttpResponse(status=400)
 
-        # Log webhook event
-        webhook_event = WebhookEvent.objects.create(
-            event_id=event['id'],
-            event_type=event['type'],
-            payload=event
-        )
-
-        try:
-            # Handle the event
-            if event['type'] == 'checkout.session.completed':
-                self._handle_checkout_completed(event)
-
-            elif event['type'] == 'customer.subscription.created':
-                self._handle_subscription_created(event)
-
-            elif event['type'] == 'customer.subscription.updated':
-                self._handle_subscription_updated(event)
-
-            elif event['type'] == 'customer.subscription.deleted':
-                self._handle_subscription_deleted(event)
-
-            elif event['type'] == 'invoice.payment_succeeded':
-                self._handle_invoice_payment_succeeded(event)
-
-            elif event['type'] == 'invoice.payment_failed':
-                self._handle_invoice_payment_failed(event)
-
-            # Mark webhook as processed
-            webhook_event.processed = True
-            webhook_event.save()
-
-        except Exception as e:
-            webhook_event.error_message = str(e)
-            webhook_event.save()
-            return HttpResponse(status=500)
-
-        return HttpResponse(status=200)
-
-    def _handle_checkout_completed(self, event):
-        """Handle successful checkout completion"""
-        session = event['data']['object']
-        session_id = session['id']
-        metadata = session.get('metadata', {})
-
-        # Update Payment record
-        try:
-            payment = Payment.objects.get(stripe_checkout_session_id=session_id)
-            payment.stripe_payment_intent_id = session.get('payment_intent')
-            payment.status = 'succeeded'
-
-            # Update user if authenticated
-            user_id = metadata.get('user_id')
-            if user_id:
-                from django.contrib.auth import get_user_model
-                User = get_user_model()
-                try:
-                    payment.user = User.objects.get(id=user_id)
-                except User.DoesNotExist:
-                    pass
-
-            payment.save()
-
-            # Handle payment type specific logic
-            payment_type = metadata.get('payment_type')
-
-            if payment_type == 'single':
-                # Single CV purchase - mark resume as paid
-                resume_id = metadata.get('resume_id')
-                if resume_id:
-                    try:
-                        resume = Resume.objects.get(id=resume_id)
-                        resume.is_paid = True
-                        resume.payment_type = 'single'
-                        resume.save()
-                    except Resume.DoesNotExist:
-                        pass
-
-            elif payment_type == 'lifetime':
-                # Lifetime premium - activate premium for user
-                if user_id:
-                    try:
-                        from django.contrib.auth import get_user_model
-                        User = get_user_model()
-                        user = User.objects.get(id=user_id)
-                        user.is_premium = True
-                        user.subscription_type = 'lifetime'
-                        user.save()
-                    except User.DoesNotExist:
-                        pass
-
-        except Payment.DoesNotExist:
-            pass
-
-    def _handle_subscription_created(self, event):
-        """Handle subscription creation"""
-        subscription = event['data']['object']
-        customer_id = subscription['customer']
-        subscription_id = subscription['id']
-        metadata = subscription.get('metadata', {})
-
-        user_id = metadata.get('user_id')
-        if not user_id:
-            return
-
-        from django.contrib.auth import get_user_model
-        User = get_user_model()
-
-        try:
-            user = User.objects.get(id=user_id)
-
-            # Determine subscription type
-            price_id = subscription['items']['data'][0]['price']['id']
-            if price_id == settings.STRIPE_SUBSCRIPTION_MONTHLY_PRICE_ID:
-                subscription_type = 'monthly'
-            elif price_id == settings.STRIPE_SUBSCRIPTION_YEARLY_PRICE_ID:
-                subscription_type = 'yearly'
-            else:
-                subscription_type = 'monthly'
-
-            # Create or update Subscription
-            Subscription.objects.update_or_create(
-                user=user,
-                defaults={
-                    'stripe_subscription_id': subscription_id,
-                    'stripe_customer_id': customer_id,
-                    'stripe_price_id': price_id,
-                    'subscription_type': subscription_type,
-                    'status': subscription['status'],
-                    'current_period_start': subscription['current_period_start'],
-                    'current_period_end': subscription['current_period_end']
-                }
-            )
-
-            # Update user subscription info
-            user.stripe_customer_id = customer_id
-            user.stripe_subscription_id = subscription_id
-            user.is_premium = True
-            user.subscription_type = subscription_type
-            user.save()
-
-        except User.DoesNotExist:
-            pass
-
-    def _handle_subscription_updated(self, event):
-        """Handle subscription updates"""
-        subscription = event['data']['object']
-        subscription_id = subscription['id']
-
-        try:
-            sub = Subscription.objects.get(stripe_subscription_id=subscription_id)
-            sub.status = subscription['status']
-            sub.current_period_start = subscription['current_period_start']
-            sub.current_period_end = subscription['current_period_end']
-            sub.cancel_at_period_end = subscription.get('cancel_at_period_end', False)
-
-            if subscription.get('canceled_at'):
-                from django.utils import timezone
-                sub.canceled_at = timezone.datetime.fromtimestamp(
-                    subscription['canceled_at']
-                )
-
-            sub.save()
-
-            # Update user premium status
-            user = sub.user
-            if subscription['status'] == 'active':
-                user.is_premium = True
-            else:
-                user.is_premium = False
-            user.save()
-
-        except Subscription.DoesNotExist:
-            pass
-
-    def _handle_subscription_deleted(self, event):
-        """Handle subscription cancellation"""
-        subscription = event['data']['object']
-        subscription_id = subscription['id']
-
-        try:
-            sub = Subscription.objects.get(stripe_subscription_id=subscription_id)
-            sub.status = 'canceled'
-            from django.utils import timezone
-            sub.canceled_at = timezone.now()
-            sub.save()
-
-            # Update user premium status
-            user = sub.user
-            user.is_premium = False
-            user.save()
-
-        except Subscription.DoesNotExist:
-            pass
-
-    def _handle_invoice_payment_succeeded(self, event):
-        """Handle successful invoice payment"""
-        invoice = event['data']['object']
-        subscription_id = invoice.get('subscription')
-
-        if subscription_id:
-            try:
-                sub = Subscription.objects.get(stripe_subscription_id=subscription_id)
-                sub.status = 'active'
-                sub.save()
+        webhook_event, created = record_webhook_event(event)
 
-                # Ensure user is premium
-                user = sub.user
-                user.is_premium = True
-                user.save()
-
-            except Subscription.DoesNotExist:
-                pass
-
-    def _handle_invoice_payment_failed(self, event):
-        """Handle failed invoice payment"""
-        invoice = event['data']['object']
-        subscription_id = invoice.get('subscription')
-
-        if subscription_id:
+        # Redeliveries of an event still pending enqueue it again, in case
+        # the first enqueue was lost
+        if not webhook_event.processed and webhook_event.dead_lettered_at is None:
             try:
-                sub = Subscription.objects.get(stripe_subscription_id=subscription_id)
-                sub.status = 'past_due'
-                sub.save()
+                process_webhook_events.delay()
+            except Exception as e:
+                # The event is stored: the next drain (or the
+                # process_webhook_events command) processes it
+                logger.error(f"Failed to enqueue webhook processing for {webhook_event.event_id}: {str(e)}")
 
-            except Subscription.DoesNotExist:
-                pass
+        return HttpResponse(status=200)
 
 
 class PaymentListView(generics.ListAPIView):
@@ -474,10 +263,35 @@ class CancelSubscriptionView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
 
+def payment_status_payload(payment, resume_id=None):
+    """Response of the payment status endpoints"""
+    # If resume_id provided, check if resume is paid
+    resume_paid = False
+    if resume_id:
+        try:
+            resume = Resume.objects.get(id=resume_id)
+            resume_paid = resume.is_paid
+        except Resume.DoesNotExist:
+            pass
+
+    return {
+        'status': payment.status,
+        'payment_type': payment.payment_type,
+        'is_completed': payment.status == 'succeeded',
+        'resume_paid': resume_paid,
+        'amount': str(payment.amount),
+        'currency': payment.currency,
+        'created_at': payment.created_at.isoformat(),
+    }
+
+
 class CheckPaymentStatusView(APIView):
     """
     Check the status of a payment by session_id.
     Used to poll payment status after Stripe checkout.
+
+    check-status/wait (payments/async_views.py) returns the same payload
+    once the payment is no longer pending, without polling.
     """
     permission_classes = [permissions.AllowAny]
 
@@ -502,28 +316,7 @@ class CheckPaymentStatusView(APIView):
                     'message': 'Payment not found'
                 }, status=status.HTTP_404_NOT_FOUND)
 
-            # Check if payment is completed
-            is_completed = payment.status == 'succeeded'
-
-            # If resume_id provided, check if resume is paid
-            resume_paid = False
-            if resume_id:
-                try:
-                    from resumes.models import Resume
-                    resume = Resume.objects.get(id=resume_id)
-                    resume_paid = resume.is_paid
-                except Resume.DoesNotExist:
-                    pass
-
-            return Response({
-                'status': payment.status,
-                'payment_type': payment.payment_type,
-                'is_completed': is_completed,
-                'resume_paid': resume_paid,
-                'amount': str(payment.amount),
-                'currency': payment.currency,
-                'created_at': payment.created_at.isoformat(),
-            }, status=status.HTTP_200_OK)
+            return Response(payment_status_payload(payment, resume_id), status=status.HTTP_200_OK)
 
         except Exception as e:
             return Response({
@@ -0,0 +1,389 @@
+"""
+Stripe webhook event pipeline.
+
+The webhook view only verifies the signature, stores the event
+(record_webhook_event, idempotent on the Stripe event id: redeliveries are
+acknowledged and not processed twice) and acknowledges it. A Celery worker
+then drains the pending events (drain_webhook_events):
+
+- events are processed in Stripe creation order; a failed event blocks
+  the later events of the same Stripe object (subscription, checkout
+  session) until it succeeds, other objects are not held up
+- each event runs in a transaction with its WebhookEvent row locked: the
+  handler writes and the processed flag commit together, and concurrent
+  workers never process the same event
+- drains are triggered by the webhook view, by the retries and periodically
+  (Celery beat, STRIPE_WEBHOOK_DRAIN_INTERVAL): an event whose task was lost
+  is still processed
+- failures are retried with an exponential backoff
+  (STRIPE_WEBHOOK_RETRY_DELAY, doubling, at most STRIPE_WEBHOOK_MAX_RETRY_DELAY)
+  and dead-lettered after STRIPE_WEBHOOK_MAX_ATTEMPTS: dead_lettered_at
+  is set and the event is left for an operator (requeue from the admin)
+"""
+
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from resumes.entitlements import invalidate_user_entitlements
+from resumes.models import Resume
+from .models import Payment, Subscription, WebhookEvent
+from .payment_events import notify_payment_status
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value) -> Optional[datetime]:
+    """Stripe timestamps are Unix epochs"""
+    if value is None:
+        return None
+    return datetime.fromtimestamp(value, tz=dt_timezone.utc)
+
+
+def event_object_id(event) -> str:
+    """Stripe object an event is about, invoice events are ordered with their subscription"""
+    obj = event.get('data', {}).get('object', {})
+    if event.get('type', '').startswith('invoice.') and obj.get('subscription'):
+        return obj['subscription']
+    return obj.get('id') or ''
+
+
+def record_webhook_event(event):
+    """
+    Store a verified event, once.
+
+    Returns:
+        (WebhookEvent, created): created is False for a redelivered event
+    """
+    try:
+        return WebhookEvent.objects.get_or_create(
+            event_id=event['id'],
+            defaults={
+                'event_type': event['type'],
+                'payload': event,
+                'object_id': event_object_id(event),
+                'stripe_created_at': _timestamp(event.get('created')),
+            }
+        )
+    except IntegrityError:
+        # Concurrent delivery of the same event
+        return WebhookEvent.objects.get(event_id=event['id']), False
+
+
+def _premium_changed(user):
+    """Drop the cached entitlements of a user once the transaction commits"""
+    user_id = user.pk
+    transaction.on_commit(lambda: invalidate_user_entitlements(user_id))
+
+
+# Handlers. They raise on unexpected errors (the event is retried) and return
+# when the objects they update do not exist (nothing to retry).
+
+def handle_checkout_completed(event):
+    """Handle successful checkout completion"""
+    session = event['data']['object']
+    session_id = session['id']
+    metadata = session.get('metadata') or {}
+    User = get_user_model()
+
+    try:
+        payment = Payment.objects.get(stripe_checkout_session_id=session_id)
+    except Payment.DoesNotExist:
+        logger.warning(f"Checkout session {session_id} has no payment")
+        return
+
+    payment.stripe_payment_intent_id = session.get('payment_intent')
+    payment.status = 'succeeded'
+
+    # Update user if authenticated
+    user = None
+    user_id = metadata.get('user_id')
+    if user_id:
+        user = User.objects.filter(id=user_id).first()
+        if user is not None:
+            payment.user = user
+
+    payment.save()
+    # Wake up the success page waiting for this checkout (check-status/wait)
+    transaction.on_commit(lambda: notify_payment_status(session_id, payment.status))
+
+    # Handle payment type specific logic
+    payment_type = metadata.get('payment_type')
+
+    if payment_type == 'single':
+        # Single CV purchase - mark resume as paid
+        resume_id = metadata.get('resume_id')
+        if resume_id:
+            resume = Resume.objects.filter(id=resume_id).first()
+            if resume is not None:
+                resume.is_paid = True
+                resume.payment_type = 'single'
+                resume.save(update_fields=['is_paid', 'payment_type', 'updated_at'])
+
+    elif payment_type == 'lifetime' and user is not None:
+        # Lifetime premium - activate premium for user
+        user.is_premium = True
+        user.subscription_type = 'lifetime'
+        user.save()
+        _premium_changed(user)
+
+
+def handle_subscription_created(event):
+    """Handle subscription creation"""
+    subscription = event['data']['object']
+    metadata = subscription.get('metadata') or {}
+    user_id = metadata.get('user_id')
+    if not user_id:
+        return
+
+    User = get_user_model()
+    user = User.objects.filter(id=user_id).first()
+    if user is None:
+        return
+
+    # Determine subscription type
+    price_id = subscription['items']['data'][0]['price']['id']
+    if price_id == settings.STRIPE_SUBSCRIPTION_YEARLY_PRICE_ID:
+        subscription_type = 'yearly'
+    else:
+        subscription_type = 'monthly'
+
+    Subscription.objects.update_or_create(
+        user=user,
+        defaults={
+            'stripe_subscription_id': subscription['id'],
+            'stripe_customer_id': subscription['customer'],
+            'stripe_price_id': price_id,
+            'subscription_type': subscription_type,
+            'status': subscription['status'],
+            'current_period_start': _timestamp(subscription['current_period_start']),
+            'current_period_end': _timestamp(subscription['current_period_end']),
+        }
+    )
+
+    # Update user subscription info
+    user.stripe_customer_id = subscription['customer']
+    user.stripe_subscription_id = subscription['id']
+    user.is_premium = True
+    user.subscription_type = subscription_type
+    user.save()
+    _premium_changed(user)
+
+
+def handle_subscription_updated(event):
+    """Handle subscription updates"""
+    subscription = event['data']['object']
+    sub = Subscription.objects.select_related('user').filter(
+        stripe_subscription_id=subscription['id']
+    ).first()
+    if sub is None:
+        return
+
+    sub.status = subscription['status']
+    sub.current_period_start = _timestamp(subscription['current_period_start'])
+    sub.current_period_end = _timestamp(subscription['current_period_end'])
+    sub.cancel_at_period_end = subscription.get('cancel_at_period_end', False)
+    if subscription.get('canceled_at'):
+        sub.canceled_at = _timestamp(subscription['canceled_at'])
+    sub.save()
+
+    # Update user premium status
+    user = sub.user
+    user.is_premium = subscription['status'] == 'active'
+    user.save()
+    _premium_changed(user)
+
+
+def handle_subscription_deleted(event):
+    """Handle subscription cancellation"""
+    subscription = event['data']['object']
+    sub = Subscription.objects.select_related('user').filter(
+        stripe_subscription_id=subscription['id']
+    ).first()
+    if sub is None:
+        return
+
+    sub.status = 'canceled'
+    sub.canceled_at = _timestamp(subscription.get('canceled_at')) or timezone.now()
+    sub.save()
+
+    # Update user premium status
+    user = sub.user
+    user.is_premium = False
+    user.save()
+    _premium_changed(user)
+
+
+def handle_invoice_payment_succeeded(event):
+    """Handle successful invoice payment"""
+    subscription_id = event['data']['object'].get('subscription')
+    sub = Subscription.objects.select_related('user').filter(
+        stripe_subscription_id=subscription_id
+    ).first() if subscription_id else None
+    if sub is None:
+        return
+
+    sub.status = 'active'
+    sub.save()
+
+    # Ensure user is premium
+    user = sub.user
+    user.is_premium = True
+    user.save()
+    _premium_changed(user)
+
+
+def handle_invoice_payment_failed(event):
+    """Handle failed invoice payment"""
+    subscription_id = event['data']['object'].get('subscription')
+    sub = Subscription.objects.filter(
+        stripe_subscription_id=subscription_id
+    ).first() if subscription_id else None
+    if sub is None:
+        return
+
+    sub.status = 'past_due'
+    sub.save()
+
+
+HANDLERS = {
+    'checkout.session.completed': handle_checkout_completed,
+    'customer.subscription.created': handle_subscription_created,
+    'customer.subscription.updated': handle_subscription_updated,
+    'customer.subscription.deleted': handle_subscription_deleted,
+    'invoice.payment_succeeded': handle_invoice_payment_succeeded,
+    'invoice.payment_failed': handle_invoice_payment_failed,
+}
+
+
+def _earliest(delay: Optional[float], other: float) -> float:
+    return other if delay is None else min(delay, other)
+
+
+def retry_delay(attempts: int) -> float:
+    """Seconds before the next attempt of an event that failed `attempts` times"""
+    base = getattr(settings, 'STRIPE_WEBHOOK_RETRY_DELAY', 30)
+    maximum = getattr(settings, 'STRIPE_WEBHOOK_MAX_RETRY_DELAY', 3600)
+    return min(base * 2 ** (attempts - 1), maximum)
+
+
+@dataclass
+class DrainResult:
+    processed: int = 0
+    failed: int = 0
+    dead_lettered: int = 0
+    # Seconds until the earliest scheduled retry, None if nothing is waiting
+    next_retry_in: Optional[float] = None
+    # The batch was full: more events may be pending
+    batch_full: bool = False
+
+
+def pending_webhook_events():
+    """Events still to process (or retry), in processing order"""
+    return WebhookEvent.objects.filter(
+        processed=False, dead_lettered_at__isnull=True
+    ).order_by('stripe_created_at', 'created_at')
+
+
+def process_webhook_event(webhook_event) -> bool:
+    """
+    Process one event (already claimed by the caller) and record the outcome.
+
+    Returns True if it was processed, False if it failed.
+    """
+    handler = HANDLERS.get(webhook_event.event_type)
+    webhook_event.attempts += 1
+    try:
+        if handler is not None:
+            # Savepoint: a failing handler leaves no partial writes
+            with transaction.atomic():
+                handler(webhook_event.payload)
+    except Exception as e:
+        webhook_event.error_message = str(e)
+        max_attempts = getattr(settings, 'STRIPE_WEBHOOK_MAX_ATTEMPTS', 8)
+        if webhook_event.attempts >= max_attempts:
+            webhook_event.dead_lettered_at = timezone.now()
+            logger.error(
+                f"Webhook {webhook_event.event_id} ({webhook_event.event_type}) dead-lettered "
+                f"after {webhook_event.attempts} attempts: {str(e)}"
+            )
+        else:
+            webhook_event.next_attempt_at = timezone.now() + timedelta(
+                seconds=retry_delay(webhook_event.attempts)
+            )
+            logger.warning(
+                f"Webhook {webhook_event.event_id} ({webhook_event.event_type}) failed, "
+                f"attempt {webhook_event.attempts}: {str(e)}"
+            )
+        webhook_event.save(update_fields=[
+            'attempts', 'error_message', 'next_attempt_at', 'dead_lettered_at'
+        ])
+        return False
+
+    webhook_event.processed = True
+    webhook_event.processed_at = timezone.now()
+    webhook_event.error_message = None
+    webhook_event.next_attempt_at = None
+    webhook_event.save(update_fields=[
+        'processed', 'processed_at', 'attempts', 'error_message', 'next_attempt_at'
+    ])
+    return True
+
+
+def drain_webhook_events(batch_size: Optional[int] = None) -> DrainResult:
+    """
+    Process the pending events that are due, in order (see module docstring).
+
+    Args:
+        batch_size: Maximum number of events read (STRIPE_WEBHOOK_BATCH_SIZE)
+    """
+    if batch_size is None:
+        batch_size = getattr(settings, 'STRIPE_WEBHOOK_BATCH_SIZE', 100)
+
+    result = DrainResult()
+    now = timezone.now()
+    # Objects with an earlier event waiting for a retry (or held by another worker)
+    blocked = set()
+
+    events = list(pending_webhook_events().only('id', 'object_id', 'next_attempt_at')[:batch_size])
+    result.batch_full = len(events) == batch_size
+    for event in events:
+        if event.object_id and event.object_id in blocked:
+            continue
+        if event.next_attempt_at is not None and event.next_attempt_at > now:
+            blocked.add(event.object_id)
+            result.next_retry_in = _earliest(
+                result.next_retry_in, (event.next_attempt_at - now).total_seconds()
+            )
+            continue
+
+        with transaction.atomic():
+            webhook_event = WebhookEvent.objects.select_for_update(skip_locked=True).filter(
+                Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now),
+                pk=event.pk, processed=False, dead_lettered_at__isnull=True,
+            ).first()
+            if webhook_event is None:
+                # Processed or being processed by another worker
+                blocked.add(event.object_id)
+                continue
+
+            if process_webhook_event(webhook_event):
+                result.processed += 1
+            elif webhook_event.dead_lettered_at is not None:
+                # Given up: the later events of the object go on
+                result.dead_lettered += 1
+            else:
+                blocked.add(event.object_id)
+                result.failed += 1
+                result.next_retry_in = _earliest(
+                    result.next_retry_in, retry_delay(webhook_event.attempts)
+                )
+
+    return result
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Template, Resume, Experience, Education, Skill, TemplateCategory
+from .models import Template, Resume, Experience, Education, Skill, TemplateCategory, PDFExportJob
 
 
 @admin.register(TemplateCategory)
@@ -70,3 +70,11 @@ class SkillAdmin(admin.ModelAdmin):
     list_display = ['name', 'level', 'category', 'resume']
     list_filter = ['level', 'category']
     search_fields = ['name', 'resume__full_name']
+
+
+@admin.register(PDFExportJob)
+class PDFExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'resume', 'template', 'status', 'created_at', 'completed_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['id', 'resume__full_name', 'resume__email']
+    readonly_fields = ['created_at', 'updated_at', 'completed_at']
@@ -0,0 +1,203 @@
+"""
+Pre-render asset inlining for PDF generation.
+
+Chromium used to fetch the resume photo (GCS URL) and any web font while
+rendering, so every render had to wait for `networkidle` (at least 500 ms of
+network silence). Assets are now embedded in the document before it reaches
+the browser:
+
+- the resume photo becomes a JPEG data URI, resized for print
+  (PDF_PHOTO_MAX_PX) and kept in a per-process LRU keyed by the file name
+  (uploads are named after their content, see photo_pipeline.py, so a name
+  always maps to the same image)
+- remote stylesheets (<link rel="stylesheet">, @import) and font files
+  (url(...woff2)) are replaced by their copy in the local font cache
+  (PDF_FONT_CACHE_DIR, filled by `manage.py cache_pdf_fonts`). References
+  missing from the cache are dropped and logged, the browser falls back to
+  the next font of the font-family list.
+
+With no external resources left, the render waits for `load` only and the
+browser pool blocks any outbound request (PDF_BLOCK_NETWORK).
+"""
+
+import base64
+import hashlib
+import io
+import logging
+import mimetypes
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# <link ... href="https://..."> stylesheets
+LINK_RE = re.compile(
+    r'<link\b(?=[^>]*\brel=["\']?stylesheet)[^>]*\bhref=["\'](https?://[^"\']+)["\'][^>]*>',
+    re.IGNORECASE
+)
+# @import url("https://...");  /  @import "https://...";
+IMPORT_RE = re.compile(
+    r'@import\s+(?:url\(\s*)?["\']?(https?://[^"\')\s]+)["\']?\s*\)?[^;]*;',
+    re.IGNORECASE
+)
+# url(https://.../font.woff2) in @font-face rules
+FONT_URL_RE = re.compile(
+    r'url\(\s*["\']?(https?://[^"\')\s]+\.(?:woff2?|ttf|otf)(?:\?[^"\')\s]*)?)["\']?\s*\)',
+    re.IGNORECASE
+)
+
+FONT_MIME_TYPES = {
+    '.woff2': 'font/woff2',
+    '.woff': 'font/woff',
+    '.ttf': 'font/ttf',
+    '.otf': 'font/otf',
+}
+
+
+def font_mime_type(url: str) -> str:
+    extension = Path(url.split('?')[0]).suffix.lower()
+    return FONT_MIME_TYPES.get(extension) or mimetypes.guess_type(url)[0] or 'application/octet-stream'
+
+
+class FontCache:
+    """
+    Local copies of remote stylesheets and font files, one file per URL.
+
+    Stylesheets are stored with their font URLs already replaced by data
+    URIs, so a cached stylesheet is self-contained.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = Path(
+            directory or getattr(settings, 'PDF_FONT_CACHE_DIR', None) or settings.BASE_DIR / 'font_cache'
+        )
+
+    def path(self, url: str) -> Path:
+        return self.directory / hashlib.sha256(url.encode()).hexdigest()
+
+    def get(self, url: str) -> Optional[bytes]:
+        try:
+            return self.path(url).read_bytes()
+        except OSError:
+            return None
+
+    def set(self, url: str, content: bytes) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.path(url).write_bytes(content)
+
+    def font_data_uri(self, url: str) -> Optional[str]:
+        content = self.get(url)
+        if content is None:
+            return None
+        return f"data:{font_mime_type(url)};base64,{base64.b64encode(content).decode('ascii')}"
+
+    def stylesheet(self, url: str) -> Optional[str]:
+        content = self.get(url)
+        return content.decode('utf-8') if content is not None else None
+
+
+def find_remote_assets(source: str):
+    """Return the remote stylesheet and font URLs referenced by HTML/CSS"""
+    stylesheets = LINK_RE.findall(source) + IMPORT_RE.findall(source)
+    return stylesheets, FONT_URL_RE.findall(source)
+
+
+def inline_fonts(source: str, font_cache: Optional[FontCache] = None) -> str:
+    """
+    Replace the remote stylesheets and font files of an HTML/CSS document by
+    their locally cached copy.
+    """
+    # Fast path: the bundled templates only use system fonts
+    if 'http' not in source:
+        return source
+
+    font_cache = font_cache or FontCache()
+
+    def replace_stylesheet(match, wrap_in_style):
+        url = match.group(1)
+        css = font_cache.stylesheet(url)
+        if css is None:
+            logger.warning(f"Stylesheet not in the font cache, dropped from PDF: {url}")
+            return ''
+        return f'<style>{css}</style>' if wrap_in_style else css
+
+    def replace_font(match):
+        url = match.group(1)
+        data_uri = font_cache.font_data_uri(url)
+        if data_uri is None:
+            logger.warning(f"Font not in the font cache, dropped from PDF: {url}")
+            return 'url(data:,)'
+        return f'url("{data_uri}")'
+
+    source = LINK_RE.sub(lambda match: replace_stylesheet(match, True), source)
+    source = IMPORT_RE.sub(lambda match: replace_stylesheet(match, False), source)
+    return FONT_URL_RE.sub(replace_font, source)
+
+
+class PhotoInliner:
+    """Bounded LRU of print-sized photo data URIs, keyed by storage name"""
+
+    def __init__(self, max_px: int = 600, quality: int = 85, max_entries: int = 256):
+        self.max_px = max_px
+        self.quality = quality
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resize_for_print(self, image_file) -> bytes:
+        """Return the photo as a JPEG no larger than max_px on its longest side"""
+        from PIL import Image, ImageOps
+
+        data = image_file.read()
+        with Image.open(io.BytesIO(data)) as image:
+            if image.format == 'JPEG' and image.mode == 'RGB' and max(image.size) <= self.max_px \
+                    and not image.getexif():
+                # Already print-sized (photo_pipeline.py), no need to re-encode
+                return data
+            image = ImageOps.exif_transpose(image)
+            if image.mode != 'RGB':
+                image = image.convert('RGB')
+            image.thumbnail((self.max_px, self.max_px), Image.LANCZOS)
+            output = io.BytesIO()
+            image.save(output, format='JPEG', quality=self.quality, optimize=True)
+            return output.getvalue()
+
+    def data_uri(self, photo) -> Optional[str]:
+        """
+        Return the data URI of an ImageField file, None if it cannot be read.
+        """
+        if not photo:
+            return None
+
+        with self._lock:
+            data_uri = self._entries.get(photo.name)
+            if data_uri is not None:
+                self._entries.move_to_end(photo.name)
+                return data_uri
+
+        try:
+            with photo.storage.open(photo.name, 'rb') as image_file:
+                jpeg = self.resize_for_print(image_file)
+        except Exception as e:
+            logger.warning(f"Could not inline photo {photo.name}: {str(e)}")
+            return None
+
+        data_uri = f"data:image/jpeg;base64,{base64.b64encode(jpeg).decode('ascii')}"
+        with self._lock:
+            self._entries[photo.name] = data_uri
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return data_uri
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+# Singleton instance used by the PDF service
+photo_inliner = PhotoInliner(max_px=getattr(settings, 'PDF_PHOTO_MAX_PX', 600))
@@ -0,0 +1,189 @@
+"""
+Native async versions of the ResumeViewSet render actions.
+
+DRF viewsets are synchronous: under ASGI, Django runs them in a thread and the
+request holds that thread while Chromium renders. These views await the
+browser pool and the async ORM directly instead, so one ASGI worker keeps many
+exports in flight (up to PDF_BROWSER_POOL_SIZE * PDF_BROWSER_PAGES_PER_BROWSER
+renders at a time).
+
+They answer on the same URLs as ResumeViewSet.export_pdf and
+ResumeViewSet.render_html when ASYNC_RENDER_VIEWS is enabled, which asgi.py
+does by default (see resumes/urls.py), and return the same responses. The
+Docker image serves asgi.py with uvicorn; under manage.py runserver (WSGI)
+the ResumeViewSet actions answer.
+"""
+
+import logging
+import traceback
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, JsonResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from .handlebars_helpers import HELPERS
+from .models import Template, Resume
+from .pdf_service import PDFGenerationService
+from .render_admission import RenderRejected
+from .render_context import resume_contexts
+from .template_cache import compiled_templates
+from .views import owned_resumes, payment_required_payload, render_rejected_payload
+
+logger = logging.getLogger(__name__)
+
+
+class ResumeNotFound(Exception):
+    """The resume does not exist or is not visible to the requester"""
+
+
+def _authenticate(request):
+    """
+    Run the DRF authentication classes on a Django request.
+
+    Returns the authenticated user (AnonymousUser when no credentials are
+    sent). Test clients using force_authenticate are honored.
+    """
+    drf_request = Request(
+        request,
+        authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES]
+    )
+    return drf_request.user
+
+
+async def _get_resume(request, pk):
+    """Return the resume `pk` of the requester with its template, like get_object()"""
+    user = await sync_to_async(_authenticate)(request)
+    session_key = request.session.session_key if hasattr(request, 'session') else None
+    queryset = owned_resumes(user, session_key).select_related('template')
+    try:
+        return user, await queryset.aget(pk=pk)
+    except (Resume.DoesNotExist, ValidationError):
+        raise ResumeNotFound()
+
+
+async def _get_default_template():
+    """First available free template, used when a resume has none"""
+    return await Template.objects.filter(is_active=True, is_premium=False).afirst()
+
+
+def _render_template(template, resume) -> str:
+    """
+    Render a resume with its template HTML.
+
+    Blocking: compiling the template, rendering it and building the context
+    (photo URLs may be signed by the storage backend) run in a thread.
+    """
+    # Same context as the PDF export, cached per resume version
+    handlebars_template = compiled_templates.get(template)
+    return handlebars_template(resume_contexts.get(resume), helpers=HELPERS)
+
+
+def _error_response(exc):
+    if isinstance(exc, ResumeNotFound):
+        return JsonResponse({'detail': 'Not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return JsonResponse({'detail': str(exc.detail)}, status=exc.status_code)
+
+
+async def export_pdf(request, pk):
+    """
+    Export resume as PDF (async version of ResumeViewSet.export_pdf).
+    """
+    if request.method != 'POST':
+        return JsonResponse(
+            {'detail': f'Method "{request.method}" not allowed.'},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+
+    try:
+        _, resume = await _get_resume(request, pk)
+    except (ResumeNotFound, APIException) as e:
+        return _error_response(e)
+
+    try:
+        logger.info(f'Starting PDF export for resume {resume.id}')
+
+        template = resume.template
+        if not template:
+            logger.warning(f'No template set for resume {resume.id}, using default')
+            template = await _get_default_template()
+            if not template:
+                logger.error('No template available in database')
+                return JsonResponse({
+                    'error': 'No template available'
+                }, status=status.HTTP_404_NOT_FOUND)
+
+        logger.info(f'Using template {template.id} (premium: {template.is_premium})')
+
+        payload = await sync_to_async(payment_required_payload)(resume, template, request)
+        if payload is not None:
+            return JsonResponse(payload, status=status.HTTP_402_PAYMENT_REQUIRED)
+
+        pdf_content = await PDFGenerationService.generate_resume_pdf(resume, template)
+
+        logger.info(f'PDF generated successfully: {len(pdf_content)} bytes')
+
+        filename = PDFGenerationService.export_filename(resume)
+        response = HttpResponse(pdf_content, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['X-Resume-ID'] = str(resume.id)
+        response['X-Template-Premium'] = str(template.is_premium)
+
+        return response
+
+    except RenderRejected as e:
+        response = JsonResponse(render_rejected_payload(e), status=e.status_code)
+        response['Retry-After'] = str(e.retry_after)
+        return response
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Failed to generate PDF',
+            'detail': str(e),
+            'traceback': traceback.format_exc()
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+async def render_html(request, pk):
+    """
+    Render resume with its template HTML (async version of ResumeViewSet.render_html).
+    """
+    if request.method != 'GET':
+        return JsonResponse(
+            {'detail': f'Method "{request.method}" not allowed.'},
+            status=status.HTTP_405_METHOD_NOT_ALLOWED
+        )
+
+    try:
+        _, resume = await _get_resume(request, pk)
+    except (ResumeNotFound, APIException) as e:
+        return _error_response(e)
+
+    try:
+        template = resume.template or await _get_default_template()
+        if not template:
+            return JsonResponse({
+                'error': 'No template available'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        rendered_html = await sync_to_async(_render_template, thread_sensitive=False)(template, resume)
+
+        return JsonResponse({
+            'html': rendered_html,
+            'css': template.template_css,
+            'template_name': template.name,
+        })
+
+    except Exception as e:
+        return JsonResponse({
+            'error': 'Failed to render template',
+            'detail': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+# Like DRF views: authentication is token based, not cookie based.
+# (django.views.decorators.csrf.csrf_exempt does not support coroutines in Django 4.2)
+export_pdf.csrf_exempt = True
+render_html.csrf_exempt = True
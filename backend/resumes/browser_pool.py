@@ -0,0 +1,413 @@
+"""
+Persistent Chromium browser pool for PDF rendering.
+
+Launching Chromium costs several hundred milliseconds and ~150 MB of RSS, so
+instead of starting a browser for every export, each worker process keeps a
+small pool of warm browsers (each with a reusable browser context) and only
+opens a fresh page per render. Each browser renders up to `pages_per_browser`
+pages concurrently, so async callers can keep size * pages_per_browser
+renders in flight.
+
+Playwright objects are bound to the event loop that created them, so the pool
+owns a dedicated event loop running in a daemon thread:
+- synchronous callers (Django views, Celery tasks) use `run()`
+- asynchronous callers (ASGI views) use `await submit()`
+
+Documents reach the pool with their assets already inlined (asset_inliner.py),
+so with `block_network` every outbound request of a browser context is
+aborted: a render never waits on, nor leaks data to, a remote server.
+"""
+
+import asyncio
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from playwright.async_api import async_playwright
+
+logger = logging.getLogger(__name__)
+
+BROWSER_LAUNCH_ARGS = ['--no-sandbox', '--disable-setuid-sandbox']
+
+# Requests aborted when the pool blocks network access (data: URIs still load)
+NETWORK_URL_RE = re.compile(r'^(https?|wss?|ftp)://', re.IGNORECASE)
+
+
+async def _abort_request(route):
+    logger.debug(f"Blocked PDF render request: {route.request.url}")
+    await route.abort()
+
+
+class BrowserSlot:
+    """A single pooled browser with its reusable context"""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.browser = None
+        self.context = None
+        self.renders = 0
+        self.launched_at = None
+        self.last_used = time.monotonic()
+        self.active = 0
+        # Serializes launching and recycling with the pages in flight
+        self.lock = asyncio.Lock()
+
+    @property
+    def in_use(self) -> bool:
+        return self.active > 0
+
+    @property
+    def is_healthy(self) -> bool:
+        """Check that the browser process is still connected"""
+        return self.browser is not None and self.browser.is_connected()
+
+    async def close(self):
+        """Close the browser (it will be relaunched lazily on next use)"""
+        browser = self.browser
+        self.browser = None
+        self.context = None
+        self.renders = 0
+        self.launched_at = None
+        if browser is not None:
+            try:
+                await browser.close()
+            except Exception as e:
+                logger.warning(f"Error closing pooled browser {self.index}: {str(e)}")
+
+
+class BrowserPool:
+    """
+    Pool of warm Chromium browsers.
+
+    Browsers are launched lazily, health-checked before each render, and
+    recycled after `max_renders` renders, when their RSS exceeds
+    `max_memory_mb`, or after being idle for `idle_timeout` seconds.
+    A browser is only recycled once none of its pages is in flight.
+    """
+
+    def __init__(
+        self,
+        size: int = 2,
+        max_renders: int = 100,
+        idle_timeout: float = 300,
+        max_memory_mb: Optional[int] = None,
+        pages_per_browser: int = 1,
+        block_network: bool = False,
+    ):
+        self.size = max(1, size)
+        self.pages_per_browser = max(1, pages_per_browser)
+        self.block_network = block_network
+        self.max_renders = max_renders
+        self.idle_timeout = idle_timeout
+        self.max_memory_mb = max_memory_mb
+
+        self._loop = None
+        self._thread = None
+        self._playwright = None
+        self._slots: List[BrowserSlot] = []
+        self._available = None
+        self._reaper = None
+        self._start_lock = threading.Lock()
+        self._stats = {
+            'renders': 0,
+            'launches': 0,
+            'recycled_max_renders': 0,
+            'recycled_memory': 0,
+            'recycled_idle': 0,
+            'recycled_unhealthy': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Event loop management
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self):
+        """Start the pool event loop thread if it is not running yet"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+
+            self._loop = asyncio.new_event_loop()
+            ready = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(self._loop)
+                self._loop.call_soon(ready.set)
+                self._loop.run_forever()
+
+            self._thread = threading.Thread(
+                target=run_loop, name='pdf-browser-pool', daemon=True
+            )
+            self._thread.start()
+            ready.wait()
+
+            asyncio.run_coroutine_threadsafe(self._setup(), self._loop).result()
+            logger.info(f"Browser pool started (size={self.size})")
+
+    async def _setup(self):
+        """Create the slots and start the idle reaper (runs on the pool loop)"""
+        self._slots = [BrowserSlot(i) for i in range(self.size)]
+        # One queue entry per page a browser may render concurrently,
+        # interleaved so the load is spread over the browsers
+        self._available = asyncio.Queue()
+        for _ in range(self.pages_per_browser):
+            for slot in self._slots:
+                self._available.put_nowait(slot)
+        if self.idle_timeout:
+            self._reaper = asyncio.ensure_future(self._reap_idle_browsers())
+
+    def run(self, coro_fn, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run `coro_fn(*args, **kwargs)` on the pool loop and block for its result.
+
+        Used by synchronous callers.
+        """
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(coro_fn(*args, **kwargs), self._loop)
+        return future.result(timeout)
+
+    async def submit(self, coro_fn, *args, **kwargs) -> Any:
+        """
+        Run `coro_fn(*args, **kwargs)` on the pool loop from another event loop.
+
+        Used by asynchronous callers.
+        """
+        self._ensure_started()
+        future = asyncio.run_coroutine_threadsafe(coro_fn(*args, **kwargs), self._loop)
+        return await asyncio.wrap_future(future)
+
+    # ------------------------------------------------------------------
+    # Browser lifecycle (pool loop only)
+    # ------------------------------------------------------------------
+
+    async def _launch(self, slot: BrowserSlot):
+        """Launch a browser and its context for the given slot"""
+        if self._playwright is None:
+            self._playwright = await async_playwright().start()
+
+        slot.browser = await self._playwright.chromium.launch(
+            headless=True,
+            args=BROWSER_LAUNCH_ARGS
+        )
+        slot.context = await slot.browser.new_context()
+        if self.block_network:
+            await slot.context.route(NETWORK_URL_RE, _abort_request)
+        slot.renders = 0
+        slot.launched_at = time.monotonic()
+        self._stats['launches'] += 1
+        logger.info(f"Launched pooled browser {slot.index}")
+
+    async def _acquire(self) -> BrowserSlot:
+        """Take a slot from the pool, making sure its browser is usable"""
+        slot = await self._available.get()
+        slot.active += 1
+        try:
+            async with slot.lock:
+                if slot.browser is not None and not slot.is_healthy:
+                    logger.warning(f"Pooled browser {slot.index} is disconnected, relaunching")
+                    self._stats['recycled_unhealthy'] += 1
+                    await slot.close()
+                if slot.browser is None:
+                    await self._launch(slot)
+        except Exception:
+            slot.active -= 1
+            self._available.put_nowait(slot)
+            raise
+        return slot
+
+    async def _release(self, slot: BrowserSlot):
+        """Return a slot to the pool, recycling its browser if needed"""
+        try:
+            # Only the last page in flight may recycle the browser
+            if slot.browser is not None and slot.active == 1:
+                async with slot.lock:
+                    if slot.browser is not None and slot.active == 1:
+                        await self._maybe_recycle(slot)
+        finally:
+            slot.active -= 1
+            slot.last_used = time.monotonic()
+            self._available.put_nowait(slot)
+
+    async def _maybe_recycle(self, slot: BrowserSlot):
+        """Close the browser if it reached its render or memory budget"""
+        if self.max_renders and slot.renders >= self.max_renders:
+            logger.info(f"Recycling browser {slot.index} after {slot.renders} renders")
+            self._stats['recycled_max_renders'] += 1
+            await slot.close()
+        elif self.max_memory_mb:
+            rss_mb = await self._browser_rss_mb(slot)
+            if rss_mb is not None and rss_mb > self.max_memory_mb:
+                logger.info(f"Recycling browser {slot.index} using {rss_mb:.0f} MB")
+                self._stats['recycled_memory'] += 1
+                await slot.close()
+
+    async def _browser_rss_mb(self, slot: BrowserSlot) -> Optional[float]:
+        """
+        Return the resident memory of all the browser processes, in MB.
+
+        Process ids come from the DevTools protocol and RSS is read from
+        /proc, so this returns None on platforms without procfs.
+        """
+        if not os.path.isdir('/proc'):
+            return None
+
+        try:
+            session = await slot.browser.new_browser_cdp_session()
+            try:
+                info = await session.send('SystemInfo.getProcessInfo')
+            finally:
+                await session.detach()
+        except Exception as e:
+            logger.debug(f"Could not read process info for browser {slot.index}: {str(e)}")
+            return None
+
+        total_kb = 0
+        for process in info.get('processInfo', []):
+            try:
+                with open(f"/proc/{process['id']}/status") as status_file:
+                    for line in status_file:
+                        if line.startswith('VmRSS:'):
+                            total_kb += int(line.split()[1])
+                            break
+            except (OSError, KeyError, ValueError):
+                continue
+        return total_kb / 1024
+
+    async def _reap_idle_browsers(self):
+        """Close browsers that have not been used for `idle_timeout` seconds"""
+        interval = max(1.0, self.idle_timeout / 2)
+        while True:
+            await asyncio.sleep(interval)
+            await self._close_idle_browsers()
+
+    async def _close_idle_browsers(self):
+        now = time.monotonic()
+        for slot in self._slots:
+            if slot.in_use or slot.lock.locked() or slot.browser is None:
+                continue
+            async with slot.lock:
+                # A render may have taken the slot while waiting for the lock
+                if slot.in_use or slot.browser is None or now - slot.last_used < self.idle_timeout:
+                    continue
+                logger.info(f"Closing idle browser {slot.index}")
+                self._stats['recycled_idle'] += 1
+                await slot.close()
+
+    # ------------------------------------------------------------------
+    # Rendering
+    # ------------------------------------------------------------------
+
+    async def render_pdf(
+        self,
+        html: str,
+        pdf_options: Dict[str, Any],
+        wait_until: str = 'load'
+    ) -> bytes:
+        """
+        Render HTML to PDF on a pooled browser (runs on the pool loop).
+
+        Args:
+            html: The complete HTML document
+            pdf_options: Keyword arguments for `page.pdf()`
+            wait_until: Load state to wait for after setting the content
+
+        Returns:
+            bytes: The generated PDF content
+        """
+        slot = await self._acquire()
+        try:
+            page = await slot.context.new_page()
+            try:
+                await page.set_content(html, wait_until=wait_until)
+                pdf_bytes = await page.pdf(**pdf_options)
+            finally:
+                await page.close()
+            slot.renders += 1
+            self._stats['renders'] += 1
+            return pdf_bytes
+        except Exception:
+            # A failed render may leave the browser in a bad state
+            if not slot.is_healthy:
+                self._stats['recycled_unhealthy'] += 1
+                await slot.close()
+            raise
+        finally:
+            await self._release(slot)
+
+    # ------------------------------------------------------------------
+    # Introspection and shutdown
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Any]:
+        """Return pool counters and the state of each slot"""
+        return {
+            **self._stats,
+            'size': self.size,
+            'browsers_running': sum(1 for slot in self._slots if slot.browser is not None),
+            'browsers_in_use': sum(1 for slot in self._slots if slot.in_use),
+            'renders_in_flight': sum(slot.active for slot in self._slots),
+            'pages_per_browser': self.pages_per_browser,
+            'block_network': self.block_network,
+        }
+
+    async def _close_all(self):
+        if self._reaper is not None:
+            self._reaper.cancel()
+        for slot in self._slots:
+            await slot.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def shutdown(self):
+        """Close every browser and stop the pool loop"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_all(), self._loop).result(10)
+        except Exception as e:
+            logger.warning(f"Error shutting down browser pool: {str(e)}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._thread = None
+
+
+_pool: Optional[BrowserPool] = None
+_pool_pid: Optional[int] = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """
+    Return the browser pool of the current worker process.
+
+    The pool is created on first use (after any fork, so pre-forking servers
+    get one pool per worker) and configured from Django settings.
+    """
+    global _pool, _pool_pid
+
+    pid = os.getpid()
+    if _pool is not None and _pool_pid == pid:
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != pid:
+            _pool = BrowserPool(
+                size=getattr(settings, 'PDF_BROWSER_POOL_SIZE', 2),
+                max_renders=getattr(settings, 'PDF_BROWSER_MAX_RENDERS', 100),
+                idle_timeout=getattr(settings, 'PDF_BROWSER_IDLE_TIMEOUT', 300),
+                max_memory_mb=getattr(settings, 'PDF_BROWSER_MAX_MEMORY_MB', None),
+                pages_per_browser=getattr(settings, 'PDF_BROWSER_PAGES_PER_BROWSER', 1),
+                block_network=getattr(settings, 'PDF_BLOCK_NETWORK', True),
+            )
+            _pool_pid = pid
+            atexit.register(_pool.shutdown)
+    return _pool
@@ -0,0 +1,125 @@
+"""
+Response cache of the template catalog.
+
+The catalog endpoints (TemplateViewSet list, free, premium and categories)
+only change when an admin edits a template or a category, so their rendered
+JSON is kept in the Django cache (Redis in production, see CACHES):
+
+- entries are keyed by a catalog version, an opaque token bumped by the
+  Template/TemplateCategory save, delete and m2m hooks (see signals.py).
+  Bumping the version makes every entry unreachable at once, stale entries
+  simply expire (CATALOG_CACHE_TIMEOUT)
+- each entry stores its strong ETag, so browsers revalidating with
+  If-None-Match get a 304 without the catalog being queried or rendered
+- the key also covers the scheme and host of the request: paginated
+  responses carry absolute next/previous URLs built from them
+
+The cache is an optimization: if the cache backend fails, responses are
+built from the database as before.
+"""
+
+import functools
+import hashlib
+import logging
+import uuid
+from typing import Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import urlencode
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'template-catalog'
+VERSION_KEY = f'{KEY_PREFIX}:version'
+
+
+def _cache():
+    return caches[getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')]
+
+
+def catalog_version() -> str:
+    """Return the current catalog version, creating one if none is set"""
+    version = _cache().get(VERSION_KEY)
+    if version is None:
+        version = uuid.uuid4().hex
+        # Another process may have set it meanwhile, keep theirs
+        if not _cache().add(VERSION_KEY, version, timeout=None):
+            version = _cache().get(VERSION_KEY) or version
+    return version
+
+
+def bump_catalog_version() -> None:
+    """Invalidate every cached catalog response"""
+    try:
+        _cache().set(VERSION_KEY, uuid.uuid4().hex, timeout=None)
+    except Exception as e:
+        logger.warning(f"Could not invalidate the template catalog cache: {str(e)}")
+
+
+def catalog_cache_key(version: str, action: str, request) -> str:
+    """Cache key of a catalog response: version, action, origin and query parameters"""
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    origin = f'{request.scheme}://{request.get_host()}'
+    digest = hashlib.sha256(f'{origin}\n{query}'.encode()).hexdigest()[:32]
+    return f'{KEY_PREFIX}:{version}:{action}:{digest}'
+
+
+def compute_etag(content: bytes) -> str:
+    """Strong ETag of a response body"""
+    return f'"{hashlib.sha256(content).hexdigest()[:40]}"'
+
+
+def _get_entry(action: str, request) -> Tuple[Optional[str], Optional[tuple]]:
+    """Return (cache key, cached (etag, content)), (None, None) if the cache is down"""
+    try:
+        key = catalog_cache_key(catalog_version(), action, request)
+        return key, _cache().get(key)
+    except Exception as e:
+        logger.warning(f"Template catalog cache unavailable: {str(e)}")
+        return None, None
+
+
+def _set_entry(key: str, entry: tuple) -> None:
+    try:
+        _cache().set(key, entry, timeout=getattr(settings, 'CATALOG_CACHE_TIMEOUT', 3600))
+    except Exception as e:
+        logger.warning(f"Could not store template catalog response: {str(e)}")
+
+
+def _catalog_response(request, etag: str, content: bytes) -> HttpResponse:
+    response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    # Browsers keep the response but revalidate it on every use
+    patch_cache_control(response, no_cache=True)
+    return get_conditional_response(request, etag=etag, response=response)
+
+
+def cached_catalog_response(view_method):
+    """
+    Serve a TemplateViewSet action from the catalog cache.
+
+    Successful responses are rendered to JSON once and cached under the
+    current catalog version; other responses are returned untouched.
+    """
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key, entry = _get_entry(self.action, request)
+        if entry is not None:
+            etag, content = entry
+            return _catalog_response(request, etag, content)
+
+        response = view_method(self, request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+
+        content = JSONRenderer().render(response.data)
+        etag = compute_etag(content)
+        if key is not None:
+            _set_entry(key, (etag, content))
+        return _catalog_response(request, etag, content)
+
+    return wrapper
@@ -0,0 +1,188 @@
+"""
+Premium entitlements: can a resume be exported with a template without payment.
+
+Free templates are always exportable. Premium templates need the resume to
+be paid for, or its owner to be premium: lifetime, or a subscription that has
+not ended (subscription_end_date, when set). The export views and
+Resume.can_export_without_watermark used to compute this separately, with
+diverging rules.
+
+resolve_entitlements() reuses the template and the user loaded with the
+resume (select_related) and reads whatever is missing in one query:
+
+- the premium status of users is kept in the Django cache
+  (ENTITLEMENT_CACHE_TIMEOUT, never past the end of the subscription) and
+  dropped by the payment webhooks when it changes
+  (invalidate_user_entitlements)
+- results are memoized on the request, a resume serialized or checked
+  several times in a request is resolved once
+
+The cache is an optimization: if the cache backend fails, entitlements are
+read from the database.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.db.models import Subquery
+from django.utils import timezone
+
+from .models import Resume, Template
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'entitlements'
+
+
+@dataclass(frozen=True)
+class Entitlements:
+    user_is_premium: bool
+    resume_is_paid: bool
+    template_is_premium: bool
+
+    @property
+    def can_export(self) -> bool:
+        """Export with the template, without payment nor watermark"""
+        return not self.template_is_premium or self.user_is_premium or self.resume_is_paid
+
+
+def premium_is_active(is_premium: bool, subscription_end_date, now=None) -> bool:
+    """Premium flag of a user, unless the subscription has ended"""
+    if not is_premium:
+        return False
+    return subscription_end_date is None or (now or timezone.now()) < subscription_end_date
+
+
+def _cache():
+    return caches[getattr(settings, 'ENTITLEMENT_CACHE_ALIAS', 'default')]
+
+
+def user_cache_key(user_id) -> str:
+    return f'{KEY_PREFIX}:user:{user_id}'
+
+
+def _get_cached_user_premium(user_id) -> Optional[bool]:
+    try:
+        return _cache().get(user_cache_key(user_id))
+    except Exception as e:
+        logger.warning(f"Entitlement cache unavailable: {str(e)}")
+        return None
+
+
+def _cache_user_premium(user_id, is_premium: bool, subscription_end_date) -> bool:
+    """Cache the premium status of a user and return it"""
+    now = timezone.now()
+    active = premium_is_active(is_premium, subscription_end_date, now)
+    timeout = getattr(settings, 'ENTITLEMENT_CACHE_TIMEOUT', 300)
+    if active and subscription_end_date is not None:
+        # The entry expires with the subscription
+        timeout = min(timeout, int((subscription_end_date - now).total_seconds()))
+    if timeout > 0:
+        try:
+            _cache().set(user_cache_key(user_id), active, timeout)
+        except Exception as e:
+            logger.warning(f"Could not cache the entitlements of user {user_id}: {str(e)}")
+    return active
+
+
+def invalidate_user_entitlements(user_id) -> None:
+    """Drop the cached premium status of a user (call after commit)"""
+    try:
+        _cache().delete(user_cache_key(user_id))
+    except Exception as e:
+        logger.warning(f"Could not invalidate the entitlements of user {user_id}: {str(e)}")
+
+
+def _is_cached(resume, field_name: str) -> bool:
+    return Resume._meta.get_field(field_name).is_cached(resume)
+
+
+def _load(user_id, template_id):
+    """
+    Read the missing premium flags in one query.
+
+    Returns (user is premium, template is premium), None for what was not asked.
+    """
+    user_is_premium = template_is_premium = None
+    templates = Template.objects.filter(pk=template_id).order_by()
+
+    if user_id is not None:
+        queryset = get_user_model().objects.filter(pk=user_id).order_by()
+        fields = ['is_premium', 'subscription_end_date']
+        if template_id is not None:
+            queryset = queryset.annotate(template_is_premium=Subquery(templates.values('is_premium')[:1]))
+            fields.append('template_is_premium')
+        row = queryset.values(*fields).first()
+        if row is not None:
+            user_is_premium = _cache_user_premium(user_id, row['is_premium'], row['subscription_end_date'])
+            template_is_premium = row.get('template_is_premium')
+        else:
+            user_is_premium = False
+
+    if template_id is not None and template_is_premium is None:
+        template_is_premium = templates.values_list('is_premium', flat=True).first()
+    return user_is_premium, template_is_premium
+
+
+def _request_memo(request):
+    if request is None:
+        return None
+    memo = getattr(request, '_entitlements', None)
+    if memo is None:
+        memo = {}
+        request._entitlements = memo
+    return memo
+
+
+def resolve_entitlements(resume, template=None, request=None) -> Entitlements:
+    """
+    Entitlements of a resume exported with `template` (default: its own).
+
+    Args:
+        resume: Resume instance, its template and user are used if loaded
+        template: Template the resume is exported with
+        request: Request the result is memoized on
+    """
+    if template is None and resume.template_id is not None and _is_cached(resume, 'template'):
+        template = resume.template
+    template_id = template.pk if template is not None else resume.template_id
+
+    memo = _request_memo(request)
+    memo_key = (resume.pk, template_id, resume.user_id, resume.is_paid)
+    if memo is not None and memo_key in memo:
+        return memo[memo_key]
+
+    user_is_premium = template_is_premium = None
+    if template is not None:
+        template_is_premium = template.is_premium
+    if resume.user_id is None:
+        user_is_premium = False
+    elif _is_cached(resume, 'user') and resume.user is not None:
+        user_is_premium = premium_is_active(resume.user.is_premium, resume.user.subscription_end_date)
+    else:
+        user_is_premium = _get_cached_user_premium(resume.user_id)
+
+    need_user = user_is_premium is None
+    need_template = template_is_premium is None and template_id is not None
+    if need_user or need_template:
+        loaded_user, loaded_template = _load(
+            resume.user_id if need_user else None,
+            template_id if need_template else None,
+        )
+        if need_user:
+            user_is_premium = loaded_user
+        if need_template:
+            template_is_premium = loaded_template
+
+    entitlements = Entitlements(
+        user_is_premium=bool(user_is_premium),
+        resume_is_paid=resume.is_paid,
+        template_is_premium=bool(template_is_premium),
+    )
+    if memo is not None:
+        memo[memo_key] = entitlements
+    return entitlements
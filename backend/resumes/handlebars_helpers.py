@@ -0,0 +1,119 @@
+"""
+Handlebars helpers shared by every server-side render path.
+
+The preview endpoint (ResumeViewSet.render_html) and the PDF service both
+render with HELPERS, so a template renders identically in both places. The
+helpers mirror frontend/lib/services/templateRenderer.ts; keep the two in
+sync when adding or changing a helper.
+
+Helpers are plain module-level functions built once at import time. pybars
+calls them with the current scope as first argument (`this`).
+"""
+
+import re
+
+from pybars import strlist
+
+YEAR_RE = re.compile(r'(\d{4})')
+
+WORK_MODE_TRANSLATIONS = {
+    'remote': 'Télétravail',
+    'onsite': 'Sur site',
+    'hybrid': 'Hybride',
+}
+
+
+def safe_string(value):
+    """Mark a string as already-escaped HTML (Handlebars.SafeString)"""
+    return strlist([str(value)])
+
+
+def _js_number(value):
+    """Render whole floats like JavaScript does (60.0 -> 60)"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def percentage_helper(this, level, max_val=5):
+    """Helper for level percentage"""
+    try:
+        return _js_number(float(level) / float(max_val) * 100)
+    except (ValueError, TypeError, ZeroDivisionError):
+        return 0
+
+
+def has_items_helper(this, array):
+    """Helper to check if array has items"""
+    if array is None:
+        return None
+    return bool(array) and len(array) > 0
+
+
+def nl2br_helper(this, text):
+    """Helper for newlines to <br>"""
+    if not text:
+        return ''
+    return safe_string(str(text).replace('\n', '<br>'))
+
+
+def preserve_whitespace_helper(this, text):
+    """Helper to preserve whitespace (for descriptions with line breaks)"""
+    if not text:
+        return ''
+    return safe_string(f'<span style="white-space: pre-wrap;">{text}</span>')
+
+
+def substr_helper(this, string, start, length=None):
+    """Helper to get substring (like Python slice [:4])"""
+    if not string:
+        return ''
+    string = str(string)
+    start = int(start)
+    if start < 0:
+        start = max(len(string) + start, 0)
+    if length is not None:
+        return string[start:start + max(int(length), 0)]
+    return string[start:]
+
+
+def first_helper(this, value, count):
+    """Helper to get first N characters"""
+    if not value:
+        return ''
+    return str(value)[:max(int(count), 0)]
+
+
+def last_helper(this, string, count):
+    """Helper to get last N characters"""
+    if not string:
+        return ''
+    string = str(string)
+    return string[max(len(string) - int(count), 0):]
+
+
+def year_helper(this, date_str):
+    """Helper to format date (extract year)"""
+    if not date_str:
+        return ''
+    # Try to extract year from various date formats
+    match = YEAR_RE.search(str(date_str))
+    return match.group(1) if match else str(date_str)
+
+
+def translate_work_mode_helper(this, value):
+    """Helper to translate work_mode to French"""
+    return WORK_MODE_TRANSLATIONS.get(value) or value
+
+
+HELPERS = {
+    'percentage': percentage_helper,
+    'hasItems': has_items_helper,
+    'nl2br': nl2br_helper,
+    'preserveWhitespace': preserve_whitespace_helper,
+    'substr': substr_helper,
+    'first': first_helper,
+    'last': last_helper,
+    'year': year_helper,
+    'translate_work_mode': translate_work_mode_helper,
+}
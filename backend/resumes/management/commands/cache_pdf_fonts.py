@@ -0,0 +1,93 @@
+"""
+Management command to download the web fonts used by templates.
+
+PDF renders run without network access (PDF_BLOCK_NETWORK): remote
+stylesheets and font files referenced by templates are served from the local
+font cache (PDF_FONT_CACHE_DIR) instead. Run this command after importing or
+updating templates that use web fonts.
+"""
+import requests
+from django.core.management.base import BaseCommand
+
+from resumes.asset_inliner import FONT_URL_RE, FontCache, find_remote_assets, inline_fonts
+from resumes.models import Template
+
+# Google Fonts only serves woff2 to browsers it recognizes
+USER_AGENT = (
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 '
+    '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+)
+
+
+class Command(BaseCommand):
+    help = 'Download the stylesheets and fonts used by templates into the PDF font cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Download assets that are already cached again',
+        )
+
+    def handle(self, *args, **options):
+        font_cache = FontCache()
+        session = requests.Session()
+        session.headers['User-Agent'] = USER_AGENT
+
+        stylesheet_urls = set()
+        font_urls = set()
+        for template in Template.objects.filter(is_active=True).only('template_html', 'template_css'):
+            for source in (template.template_html or '', template.template_css or ''):
+                stylesheets, fonts = find_remote_assets(source)
+                stylesheet_urls.update(stylesheets)
+                font_urls.update(fonts)
+
+        if not stylesheet_urls and not font_urls:
+            self.stdout.write(self.style.SUCCESS('No remote stylesheet or font used by templates'))
+            return
+
+        cached_count = 0
+        failed_count = 0
+
+        def download(url):
+            response = session.get(url, timeout=30)
+            response.raise_for_status()
+            return response.content
+
+        # Stylesheets reference more font files, which must be cached before
+        # the stylesheets themselves (they are stored with fonts inlined)
+        stylesheets = []
+        for url in sorted(stylesheet_urls):
+            if not options['force'] and font_cache.get(url) is not None:
+                continue
+            try:
+                css = download(url).decode('utf-8')
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  ✗ {url}: {str(e)}'))
+                failed_count += 1
+                continue
+            font_urls.update(FONT_URL_RE.findall(css))
+            stylesheets.append((url, css))
+
+        for url in sorted(font_urls):
+            if not options['force'] and font_cache.get(url) is not None:
+                continue
+            try:
+                font_cache.set(url, download(url))
+            except Exception as e:
+                self.stdout.write(self.style.ERROR(f'  ✗ {url}: {str(e)}'))
+                failed_count += 1
+                continue
+            self.stdout.write(self.style.SUCCESS(f'  ✓ Cached font: {url}'))
+            cached_count += 1
+
+        for url, css in stylesheets:
+            font_cache.set(url, inline_fonts(css, font_cache).encode('utf-8'))
+            self.stdout.write(self.style.SUCCESS(f'  ✓ Cached stylesheet: {url}'))
+            cached_count += 1
+
+        self.stdout.write(self.style.SUCCESS('\n=== Summary ==='))
+        self.stdout.write(self.style.SUCCESS(f'Cached: {cached_count}'))
+        if failed_count:
+            self.stdout.write(self.style.ERROR(f'Failed: {failed_count}'))
+        self.stdout.write(self.style.SUCCESS(f'Font cache: {font_cache.directory}'))
@@ -0,0 +1,83 @@
+# Generated by Django 4.2.16 on 2026-10-18 02:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+import resumes.models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resumes", "0015_populate_categories"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PDFExportJob",
+            fields=[
+                (
+                    "id",
+                    models.UUIDField(
+                        default=uuid.uuid4,
+                        editable=False,
+                        primary_key=True,
+                        serialize=False,
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("succeeded", "Succeeded"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=20,
+                    ),
+                ),
+                (
+                    "file",
+                    models.FileField(
+                        blank=True,
+                        null=True,
+                        upload_to=resumes.models.pdf_export_upload_path,
+                    ),
+                ),
+                (
+                    "filename",
+                    models.CharField(
+                        blank=True, help_text="Download filename", max_length=255
+                    ),
+                ),
+                ("error_message", models.TextField(blank=True, null=True)),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                ("completed_at", models.DateTimeField(blank=True, null=True)),
+                (
+                    "resume",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="pdf_export_jobs",
+                        to="resumes.resume",
+                    ),
+                ),
+                (
+                    "template",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="pdf_export_jobs",
+                        to="resumes.template",
+                    ),
+                ),
+            ],
+            options={
+                "db_table": "pdf_export_jobs",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 03:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resumes", "0016_pdfexportjob"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resume",
+            name="version",
+            field=models.PositiveIntegerField(default=1),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.16 on 2026-10-18 03:28
+
+from django.db import migrations, models
+import resumes.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("resumes", "0017_resume_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="resume",
+            name="photo_placeholder",
+            field=models.TextField(blank=True, default=""),
+        ),
+        migrations.AddField(
+            model_name="resume",
+            name="photo_preview",
+            field=models.ImageField(
+                blank=True, null=True, upload_to=resumes.models.resume_photo_upload_path
+            ),
+        ),
+    ]
@@ -24,6 +24,16 @@ def resume_photo_upload_path(instance, filename):
     return os.path.join('resumes', 'photos', new_filename)
 
 
+def pdf_export_upload_path(instance, filename):
+    """
+    Generate upload path for asynchronously exported PDFs.
+
+    Returns:
+        Path: resumes/exports/{job uuid}.pdf
+    """
+    return os.path.join('resumes', 'exports', f"{instance.id}.pdf")
+
+
 class TemplateCategory(models.Model):
     """Template Category model for organizing templates"""
 
@@ -98,12 +108,14 @@ class Template(models.Model):
     @property
     def category_slugs(self):
         """Return list of category slugs"""
-        return list(self.categories.values_list('slug', flat=True))
+        # categories.all() reads prefetch_related('categories') when present,
+        # values_list() would query the database for every template
+        return [category.slug for category in self.categories.all()]
 
     @property
     def category_names(self):
         """Return list of category names"""
-        return list(self.categories.values_list('name', flat=True))
+        return [category.name for category in self.categories.all()]
 
 
 class Resume(models.Model):
@@ -142,7 +154,10 @@ class Resume(models.Model):
     website = models.URLField(blank=True)
     linkedin_url = models.URLField(blank=True)
     github_url = models.URLField(blank=True)
+    # Print rendition of the photo, with its preview and placeholder (see photo_pipeline.py)
     photo = models.ImageField(upload_to=resume_photo_upload_path, blank=True, null=True)
+    photo_preview = models.ImageField(upload_to=resume_photo_upload_path, blank=True, null=True)
+    photo_placeholder = models.TextField(blank=True, default='')
     date_of_birth = models.DateField(blank=True, null=True, help_text="Date of birth")
     nationality = models.CharField(max_length=100, blank=True, help_text="Nationality")
     driving_license = models.CharField(max_length=100, blank=True, help_text="Driving license type")
@@ -174,6 +189,9 @@ class Resume(models.Model):
         default='free'
     )
 
+    # Incremented on every save, ETag of the resume (see resume_version.py)
+    version = models.PositiveIntegerField(default=1)
+
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -190,16 +208,20 @@ class Resume(models.Model):
     def __str__(self):
         return f"{self.full_name} - {self.title or 'Resume'}"
 
+    def save(self, *args, **kwargs):
+        """Bump the version of an existing resume on every save"""
+        update_fields = kwargs.get('update_fields')
+        if not self._state.adding and (update_fields is None or update_fields):
+            self.version += 1
+            if update_fields is not None:
+                kwargs['update_fields'] = [*update_fields, 'version']
+        super().save(*args, **kwargs)
+
     @property
     def can_export_without_watermark(self):
-        """Check if resume can be exported without watermark"""
-        if self.is_paid:
-            return True
-        if self.user and self.user.is_premium and self.user.is_subscription_active:
-            return True
-        if not self.template or not self.template.is_premium:
-            return True
-        return False
+        """Check if resume can be exported without watermark (see entitlements.py)"""
+        from .entitlements import resolve_entitlements
+        return resolve_entitlements(self).can_export
 
 
 class Experience(models.Model):
@@ -296,3 +318,47 @@ class Skill(models.Model):
 
     def __str__(self):
         return f"{self.name} ({self.level})"
+
+
+class PDFExportJob(models.Model):
+    """PDF export job rendered asynchronously by a Celery worker"""
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    resume = models.ForeignKey(Resume, on_delete=models.CASCADE, related_name='pdf_export_jobs')
+    template = models.ForeignKey(
+        Template,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='pdf_export_jobs'
+    )
+    status = models.CharField(
+        max_length=20,
+        choices=[
+            (STATUS_PENDING, 'Pending'),
+            (STATUS_RUNNING, 'Running'),
+            (STATUS_SUCCEEDED, 'Succeeded'),
+            (STATUS_FAILED, 'Failed'),
+        ],
+        default=STATUS_PENDING
+    )
+    file = models.FileField(upload_to=pdf_export_upload_path, blank=True, null=True)
+    filename = models.CharField(max_length=255, blank=True, help_text="Download filename")
+    error_message = models.TextField(blank=True, null=True)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    completed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'pdf_export_jobs'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"PDF export {self.id} - {self.status}"
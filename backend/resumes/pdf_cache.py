@@ -0,0 +1,247 @@
+"""
+Content-addressed cache of generated PDFs.
+
+The cache key is a SHA-256 digest of the complete HTML document sent to
+Chromium (template HTML/CSS + resume data) and the PDF options, so an
+unchanged resume exported twice returns the stored PDF without touching
+Playwright, and any change to the resume or the template yields a new key.
+
+Entries are stored as {location}/{resume_id}/{digest}.pdf:
+- writing a new PDF for a resume drops its previous entries
+- deleting a resume or editing a template purges the related entries
+- the size is bounded by PDF_CACHE_MAX_BYTES per process: the least
+  recently used entries are evicted
+
+Each process indexes the entries it wrote or served in memory (one per
+resume, with its size), and evicts from that index. Eviction never lists
+the storage nor reads file sizes and dates, which are remote calls on GCS.
+Entries left by other or earlier processes are not indexed; they are
+replaced the next time their resume is exported, or purged with it.
+
+Backends are pluggable through PDF_CACHE_BACKEND:
+- StoragePDFCache: Django default storage (local disk or GCS, see STORAGES)
+- FileSystemPDFCache: a local directory (PDF_CACHE_DIR)
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Bump to invalidate every cached PDF after a change in the rendering pipeline
+CACHE_FORMAT_VERSION = 1
+
+
+def pdf_cache_key(complete_html: str, pdf_options: Dict[str, Any]) -> str:
+    """
+    Compute the content address of a PDF.
+
+    Args:
+        complete_html: The complete HTML document rendered by Chromium
+        pdf_options: The options passed to page.pdf()
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    digest.update(f"v{CACHE_FORMAT_VERSION}\n".encode())
+    digest.update(json.dumps(pdf_options, sort_keys=True).encode())
+    digest.update(b"\n")
+    digest.update(complete_html.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class StoragePDFCache:
+    """PDF cache stored on a Django storage backend"""
+
+    def __init__(
+        self,
+        storage=None,
+        location: str = 'pdf_cache',
+        max_bytes: int = 500 * 1024 * 1024,
+    ):
+        self.storage = storage or default_storage
+        self.location = location.strip('/')
+        self.max_bytes = max_bytes
+        # Entries of this process, least recently used first:
+        # resume directory -> (path, size)
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _join(self, *parts) -> str:
+        return '/'.join(str(part) for part in (self.location, *parts) if part)
+
+    def _resume_dir(self, resume_id) -> str:
+        return self._join(resume_id)
+
+    def _path(self, resume_id, key: str) -> str:
+        return self._join(resume_id, f"{key}.pdf")
+
+    def get(self, resume_id, key: str) -> Optional[bytes]:
+        """Return the cached PDF, or None on a miss"""
+        path = self._path(resume_id, key)
+        try:
+            with self.storage.open(path, 'rb') as pdf_file:
+                pdf_bytes = pdf_file.read()
+        except (FileNotFoundError, OSError):
+            self.misses += 1
+            return None
+        except Exception as e:
+            # Remote backends raise their own "not found" errors
+            logger.debug(f"PDF cache miss for {path}: {str(e)}")
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._index(self._resume_dir(resume_id), path, len(pdf_bytes))
+        return pdf_bytes
+
+    def set(self, resume_id, key: str, pdf_bytes: bytes) -> None:
+        """Store a PDF, replacing the previous entries of the same resume"""
+        path = self._path(resume_id, key)
+        try:
+            self.invalidate_resume(resume_id)
+            self.storage.save(path, ContentFile(pdf_bytes))
+        except Exception as e:
+            # The cache must never break an export
+            logger.warning(f"Could not store PDF in cache ({path}): {str(e)}")
+            return
+
+        self._index(self._resume_dir(resume_id), path, len(pdf_bytes))
+        try:
+            self.evict()
+        except Exception as e:
+            logger.warning(f"PDF cache eviction failed: {str(e)}")
+
+    def _index(self, resume_dir: str, path: str, size: int) -> None:
+        """Record the entry of a resume as the most recently used"""
+        with self._lock:
+            self._unindex(resume_dir)
+            self._entries[resume_dir] = (path, size)
+            self._total_bytes += size
+
+    def _unindex(self, resume_dir: str) -> None:
+        # Called with self._lock held
+        entry = self._entries.pop(resume_dir, None)
+        if entry is not None:
+            self._total_bytes -= entry[1]
+
+    def invalidate_resume(self, resume_id) -> None:
+        """Delete every cached PDF of a resume"""
+        resume_dir = self._resume_dir(resume_id)
+        with self._lock:
+            self._unindex(resume_dir)
+        try:
+            _, files = self.storage.listdir(resume_dir)
+        except (FileNotFoundError, OSError):
+            return
+        for name in files:
+            self.storage.delete(f"{resume_dir}/{name}")
+
+    def cached_resume_ids(self) -> set:
+        """Return the ids of the resumes that have cached PDFs"""
+        try:
+            resume_dirs, _ = self.storage.listdir(self.location)
+        except (FileNotFoundError, OSError):
+            return set()
+        return set(resume_dirs)
+
+    def evict(self) -> int:
+        """
+        Delete the least recently used entries of this process until they
+        fit in max_bytes.
+
+        Returns:
+            int: Number of deleted entries
+        """
+        evicted = []
+        with self._lock:
+            while self._total_bytes > self.max_bytes and self._entries:
+                _, (path, size) = self._entries.popitem(last=False)
+                self._total_bytes -= size
+                evicted.append(path)
+            total_bytes = self._total_bytes
+
+        for path in evicted:
+            try:
+                self.storage.delete(path)
+            except Exception as e:
+                logger.warning(f"Could not evict {path} from the PDF cache: {str(e)}")
+
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} PDF(s) from cache ({total_bytes} bytes left)")
+        return len(evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the indexed entries of this process"""
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'entries': len(self._entries),
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+        }
+
+
+class FileSystemPDFCache(StoragePDFCache):
+    """PDF cache stored in a local directory, whatever the default storage is"""
+
+    def __init__(self, directory=None, **kwargs):
+        directory = directory or getattr(settings, 'PDF_CACHE_DIR', None) or settings.BASE_DIR / 'pdf_cache'
+        kwargs.setdefault('location', '')
+        super().__init__(storage=FileSystemStorage(location=directory), **kwargs)
+
+
+_pdf_cache = None
+_pdf_cache_lock = threading.Lock()
+
+
+def get_pdf_cache() -> Optional[StoragePDFCache]:
+    """
+    Return the configured PDF cache, or None when PDF_CACHE_ENABLED is False.
+    """
+    global _pdf_cache
+
+    if not getattr(settings, 'PDF_CACHE_ENABLED', True):
+        return None
+
+    if _pdf_cache is None:
+        with _pdf_cache_lock:
+            if _pdf_cache is None:
+                backend = import_string(
+                    getattr(settings, 'PDF_CACHE_BACKEND', 'resumes.pdf_cache.StoragePDFCache')
+                )
+                _pdf_cache = backend(
+                    max_bytes=getattr(settings, 'PDF_CACHE_MAX_BYTES', 500 * 1024 * 1024)
+                )
+    return _pdf_cache
+
+
+def invalidate_template(template_id) -> None:
+    """Purge the cached PDFs of every resume using a template"""
+    from .models import Resume
+
+    cache = get_pdf_cache()
+    if cache is None:
+        return
+
+    cached_resume_ids = cache.cached_resume_ids()
+    if not cached_resume_ids:
+        return
+
+    resume_ids = Resume.objects.filter(template_id=template_id).values_list('id', flat=True)
+    for resume_id in resume_ids.iterator():
+        if str(resume_id) in cached_resume_ids:
+            cache.invalidate_resume(resume_id)
@@ -3,152 +3,107 @@ PDF Generation Service using Playwright
 
 This service uses pybars3 (Handlebars for Python) to compile templates,
 then Playwright to render the compiled HTML to PDF.
+
+Rendering happens on warm browsers from the per-process BrowserPool
+(see browser_pool.py), so an export only pays for set_content + page.pdf.
+Renders go through admission control (see render_admission.py): bursts get
+a fast RenderRejected instead of piling up in front of the pool. Identical
+concurrent renders are coalesced into one (see render_coalescing.py).
+The photo and web fonts are inlined before rendering (see asset_inliner.py),
+so the page only waits for `load`, never for network idle.
 """
 
 import asyncio
-from typing import Dict, Any, Optional
-from playwright.async_api import async_playwright
+from datetime import datetime
+from typing import Any, Mapping, Optional
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from pybars import Compiler
 import logging
 
+from .asset_inliner import inline_fonts, photo_inliner
+from .browser_pool import get_browser_pool
+from .handlebars_helpers import HELPERS
+from .pdf_cache import get_pdf_cache, pdf_cache_key
+from .render_admission import RenderRejected, get_render_admission
+from .render_coalescing import get_render_coalescer
+from .render_context import resume_contexts
+from .template_cache import compiled_templates, template_cache_key
+
 logger = logging.getLogger(__name__)
 
+# Options passed to page.pdf(): A4 with no margins and proper page breaks
+PDF_OPTIONS = {
+    'format': 'A4',
+    'print_background': True,
+    'margin': {
+        'top': '0',
+        'right': '0',
+        'bottom': '0',
+        'left': '0'
+    },
+    'prefer_css_page_size': False,
+}
+
 
 class PDFGenerationService:
     """Service for generating PDFs from HTML templates using Playwright"""
 
     @staticmethod
-    def _get_handlebars_helpers():
-        """
-        Define all Handlebars helpers for pybars3.
-        These helpers match the frontend implementation in templateRenderer.ts
-        """
-
-        def percentage_helper(this, level, max_val=5):
-            """Helper for level percentage"""
-            try:
-                return (int(level) / int(max_val)) * 100
-            except (ValueError, TypeError, ZeroDivisionError):
-                return 0
-
-        def has_items_helper(this, array):
-            """Helper to check if array has items"""
-            return array and len(array) > 0
-
-        def nl2br_helper(this, text):
-            """Helper for newlines to <br>"""
-            if not text:
-                return ''
-            return str(text).replace('\n', '<br>')
-
-        def preserve_whitespace_helper(this, text):
-            """Helper to preserve whitespace"""
-            if not text:
-                return ''
-            return f'<span style="white-space: pre-wrap;">{text}</span>'
-
-        def substr_helper(this, string, start, length=None):
-            """Helper to get substring"""
-            if not string:
-                return ''
-            string = str(string)
-            start = int(start)
-            if length is not None:
-                return string[start:start + int(length)]
-            return string[start:]
-
-        def first_helper(this, value, count):
-            """Helper to get first N characters"""
-            if not value:
-                return ''
-            return str(value)[:int(count)]
-
-        def last_helper(this, string, count):
-            """Helper to get last N characters"""
-            if not string:
-                return ''
-            return str(string)[-int(count):]
-
-        def year_helper(this, date_str):
-            """Helper to format date (extract year)"""
-            if not date_str:
-                return ''
-            # Try to extract year from various date formats
-            import re
-            match = re.search(r'(\d{4})', str(date_str))
-            return match.group(1) if match else str(date_str)
-
-        def translate_work_mode_helper(this, value):
-            """Helper to translate work_mode to French"""
-            translations = {
-                'remote': 'Télétravail',
-                'onsite': 'Sur site',
-                'hybrid': 'Hybride',
-            }
-            return translations.get(value, value)
-
-        return {
-            'percentage': percentage_helper,
-            'hasItems': has_items_helper,
-            'nl2br': nl2br_helper,
-            'preserveWhitespace': preserve_whitespace_helper,
-            'substr': substr_helper,
-            'first': first_helper,
-            'last': last_helper,
-            'year': year_helper,
-            'translate_work_mode': translate_work_mode_helper,
-        }
-
-    @staticmethod
-    async def generate_pdf(
+    def build_html(
         html_content: str,
         css_content: str,
-        cv_data: Dict[str, Any],
-        filename: str = "cv.pdf"
-    ) -> bytes:
+        cv_data: Mapping[str, Any],
+        template_key: Optional[tuple] = None
+    ) -> str:
         """
-        Generate a PDF from HTML/CSS template with CV data.
+        Compile the Handlebars template with CV data and wrap it in a
+        complete HTML document ready to be printed.
 
         Args:
             html_content: The HTML template
             css_content: The CSS styles
             cv_data: The CV data to inject
-            filename: The desired filename
+            template_key: (template id, updated_at) used to reuse the
+                compiled template from the shared cache
 
         Returns:
-            bytes: The generated PDF content
+            str: The complete HTML document
         """
-        try:
-            logger.info(f"Starting PDF generation for {filename}")
-
-            # Step 1: Compile Handlebars template with pybars3
-            compiler = Compiler()
-            helpers = PDFGenerationService._get_handlebars_helpers()
-
-            # Compile the template
-            template = compiler.compile(html_content)
-
-            # Render the template with CV data and helpers
-            rendered_html = template(cv_data, helpers=helpers)
-
-            logger.info(f"Template compiled successfully with pybars3")
-
-            # Step 2: Inject CSS into the rendered HTML
-            # Extract <body> content from rendered HTML if it's a full document
-            if '<body' in rendered_html.lower():
-                # Template is a full HTML document, extract body content
-                import re
-                body_match = re.search(r'<body[^>]*>(.*)</body>', rendered_html, re.DOTALL | re.IGNORECASE)
-                if body_match:
-                    body_content = body_match.group(1)
-                else:
-                    body_content = rendered_html
+        # Step 1: Compile Handlebars template with pybars3
+        # Compile the template (or reuse the cached compilation)
+        if template_key is not None:
+            template = compiled_templates.get_or_compile(template_key, html_content)
+        else:
+            template = Compiler().compile(html_content)
+
+        # Render the template with CV data and helpers
+        rendered_html = template(cv_data, helpers=HELPERS)
+
+        logger.info(f"Template compiled successfully with pybars3")
+
+        # Remote stylesheets and fonts are replaced by their cached copy.
+        # This runs on the rendered HTML: the compiled template is shared
+        # with the preview endpoint, which keeps the remote references.
+        rendered_html = inline_fonts(rendered_html)
+        css_content = inline_fonts(css_content)
+
+        # Step 2: Inject CSS into the rendered HTML
+        # Extract <body> content from rendered HTML if it's a full document
+        if '<body' in rendered_html.lower():
+            # Template is a full HTML document, extract body content
+            import re
+            body_match = re.search(r'<body[^>]*>(.*)</body>', rendered_html, re.DOTALL | re.IGNORECASE)
+            if body_match:
+                body_content = body_match.group(1)
             else:
-                # Template is just a fragment
                 body_content = rendered_html
+        else:
+            # Template is just a fragment
+            body_content = rendered_html
 
-            # Build complete HTML for PDF with aggressive page-break prevention
-            complete_html = f"""<!DOCTYPE html>
+        # Build complete HTML for PDF with aggressive page-break prevention
+        complete_html = f"""<!DOCTYPE html>
 <html lang="fr">
 <head>
     <meta charset="UTF-8">
@@ -248,38 +203,97 @@ class PDFGenerationService:
 </body>
 </html>"""
 
-            # Step 3: Generate PDF with Playwright
-            async with async_playwright() as p:
-                # Launch browser in headless mode
-                browser = await p.chromium.launch(
-                    headless=True,
-                    args=['--no-sandbox', '--disable-setuid-sandbox']
-                )
-
-                # Create a new page
-                page = await browser.new_page()
-
-                # Set content and wait for it to be fully loaded
-                await page.set_content(complete_html, wait_until='networkidle')
-
-                # Generate PDF with no margins and proper page breaks
-                pdf_bytes = await page.pdf(
-                    format='A4',
-                    print_background=True,
-                    margin={
-                        'top': '0',
-                        'right': '0',
-                        'bottom': '0',
-                        'left': '0'
-                    },
-                    prefer_css_page_size=False
-                )
-
-                await browser.close()
-
-                logger.info(f"PDF generated successfully: {len(pdf_bytes)} bytes")
+        return complete_html
+
+    @staticmethod
+    def _get_cached_pdf(resume_id, complete_html: str):
+        """
+        Look up a PDF in the content-addressed cache.
+
+        Returns:
+            (cache, key, pdf_bytes): pdf_bytes is None on a miss, cache is
+            None when caching is disabled or no resume id was given
+        """
+        cache = get_pdf_cache() if resume_id is not None else None
+        if cache is None:
+            return None, None, None
+        key = pdf_cache_key(complete_html, PDF_OPTIONS)
+        return cache, key, cache.get(resume_id, key)
+
+    @staticmethod
+    async def _render_on_pool(pool, complete_html: str, cache, cache_key, resume_id) -> bytes:
+        """
+        Render a document on the browser pool loop.
+
+        Concurrent renders of the same document are coalesced into one
+        (render_coalescing.py), which goes through admission control and is
+        stored in the PDF cache by the request that rendered it.
+        """
+        render_key = cache_key or pdf_cache_key(complete_html, PDF_OPTIONS)
+
+        async def render():
+            pdf_bytes = await get_render_admission().run(
+                pool.render_pdf, complete_html, PDF_OPTIONS,
+                wait_until=getattr(settings, 'PDF_WAIT_UNTIL', 'load')
+            )
+            if cache is not None:
+                await asyncio.to_thread(cache.set, resume_id, cache_key, pdf_bytes)
+            return pdf_bytes
+
+        return await get_render_coalescer().run(render_key, render)
+
+    @staticmethod
+    async def generate_pdf(
+        html_content: str,
+        css_content: str,
+        cv_data: Mapping[str, Any],
+        filename: str = "cv.pdf",
+        template_key: Optional[tuple] = None,
+        resume_id=None
+    ) -> bytes:
+        """
+        Generate a PDF from HTML/CSS template with CV data.
+
+        Args:
+            html_content: The HTML template
+            css_content: The CSS styles
+            cv_data: The CV data to inject
+            filename: The desired filename
+            template_key: (template id, updated_at) for the compiled template cache
+            resume_id: Enables the PDF output cache for this resume
+
+        Returns:
+            bytes: The generated PDF content
+
+        Raises:
+            RenderRejected: The render queue of this process is saturated
+        """
+        try:
+            logger.info(f"Starting PDF generation for {filename}")
+
+            complete_html = PDFGenerationService.build_html(
+                html_content, css_content, cv_data, template_key=template_key
+            )
+
+            # Cache lookups hit the storage backend, keep them off the event loop
+            cache, cache_key, pdf_bytes = await sync_to_async(
+                PDFGenerationService._get_cached_pdf, thread_sensitive=False
+            )(resume_id, complete_html)
+            if pdf_bytes is not None:
+                logger.info(f"PDF served from cache: {len(pdf_bytes)} bytes")
                 return pdf_bytes
 
+            pool = get_browser_pool()
+            pdf_bytes = await pool.submit(
+                PDFGenerationService._render_on_pool, pool, complete_html, cache, cache_key, resume_id
+            )
+
+            logger.info(f"PDF generated successfully: {len(pdf_bytes)} bytes")
+            return pdf_bytes
+
+        except RenderRejected as e:
+            logger.warning(f"PDF render rejected: {str(e)}")
+            raise
         except Exception as e:
             logger.error(f"Error generating PDF: {str(e)}")
             raise
@@ -288,16 +302,107 @@ class PDFGenerationService:
     def generate_pdf_sync(
         html_content: str,
         css_content: str,
-        cv_data: Dict[str, Any],
-        filename: str = "cv.pdf"
+        cv_data: Mapping[str, Any],
+        filename: str = "cv.pdf",
+        template_key: Optional[tuple] = None,
+        resume_id=None
     ) -> bytes:
         """
-        Synchronous wrapper for generate_pdf.
+        Synchronous version of generate_pdf.
 
         This is needed because Django views are synchronous by default.
+        The calling thread blocks while the render runs on the pool loop.
         """
-        return asyncio.run(
-            PDFGenerationService.generate_pdf(
-                html_content, css_content, cv_data, filename
+        try:
+            logger.info(f"Starting PDF generation for {filename}")
+
+            complete_html = PDFGenerationService.build_html(
+                html_content, css_content, cv_data, template_key=template_key
+            )
+
+            cache, cache_key, pdf_bytes = PDFGenerationService._get_cached_pdf(resume_id, complete_html)
+            if pdf_bytes is not None:
+                logger.info(f"PDF served from cache: {len(pdf_bytes)} bytes")
+                return pdf_bytes
+
+            pool = get_browser_pool()
+            pdf_bytes = pool.run(
+                PDFGenerationService._render_on_pool, pool, complete_html, cache, cache_key, resume_id
             )
+
+            logger.info(f"PDF generated successfully: {len(pdf_bytes)} bytes")
+            return pdf_bytes
+
+        except RenderRejected as e:
+            logger.warning(f"PDF render rejected: {str(e)}")
+            raise
+        except Exception as e:
+            logger.error(f"Error generating PDF: {str(e)}")
+            raise
+
+    @staticmethod
+    def build_resume_context(resume) -> Mapping[str, Any]:
+        """
+        Return the template context of a resume.
+
+        Shared with the preview endpoint and cached per resume version,
+        see render_context.py.
+        """
+        return resume_contexts.get(resume)
+
+    @staticmethod
+    def build_pdf_context(resume) -> Mapping[str, Any]:
+        """
+        Return the template context of a resume for PDF rendering.
+
+        Same as build_resume_context, with the photo embedded as a print-sized
+        data URI instead of its storage URL. Reads the photo from storage on
+        the first export of a photo.
+        """
+        context = resume_contexts.get(resume)
+        if not resume.photo:
+            return context
+        return context.replace(photo=photo_inliner.data_uri(resume.photo))
+
+    @staticmethod
+    def export_filename(resume) -> str:
+        """Download filename of a resume PDF"""
+        safe_name = resume.full_name.replace(' ', '_') if resume.full_name else f'CV_{resume.id}'
+        timestamp = datetime.now().strftime('%Y%m%d')
+        return f'{safe_name}_{timestamp}.pdf'
+
+    @staticmethod
+    def generate_resume_pdf_sync(resume, template) -> bytes:
+        """
+        Render a resume with the given template to PDF.
+
+        Shared by the export_pdf view and the asynchronous export task.
+        """
+        return PDFGenerationService.generate_pdf_sync(
+            html_content=template.template_html or '',
+            css_content=template.template_css or '',
+            cv_data=PDFGenerationService.build_pdf_context(resume),
+            filename=f"{resume.id}.pdf",
+            template_key=template_cache_key(template),
+            resume_id=resume.id
+        )
+
+    @staticmethod
+    async def generate_resume_pdf(resume, template) -> bytes:
+        """
+        Asynchronous version of generate_resume_pdf_sync, used by the ASGI views.
+
+        The resume and template must be fully loaded: no query is made here.
+        """
+        # Inlining the photo may read it from storage, keep it off the event loop
+        cv_data = await sync_to_async(
+            PDFGenerationService.build_pdf_context, thread_sensitive=False
+        )(resume)
+        return await PDFGenerationService.generate_pdf(
+            html_content=template.template_html or '',
+            css_content=template.template_css or '',
+            cv_data=cv_data,
+            filename=f"{resume.id}.pdf",
+            template_key=template_cache_key(template),
+            resume_id=resume.id
         )
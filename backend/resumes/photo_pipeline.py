@@ -0,0 +1,165 @@
+"""
+Resume photo processing on upload.
+
+upload_photo used to store the uploaded file as is (up to 5 MB), and that
+full-size image was embedded in every preview and PDF. Uploads are now
+decoded once with Pillow and re-encoded into fixed renditions:
+
+- the EXIF orientation is applied and the pixels are converted to sRGB,
+  then re-encoded without any metadata (EXIF, GPS position, ICC profile)
+- print: JPEG no larger than PDF_PHOTO_MAX_PX, stored in Resume.photo and
+  embedded as is in PDFs (see asset_inliner.py)
+- preview: WebP no larger than PHOTO_PREVIEW_MAX_PX, Resume.photo_preview,
+  used by the HTML previews
+- placeholder: WebP data URI of PHOTO_PLACEHOLDER_PX pixels kept in
+  Resume.photo_placeholder, shown while the preview loads
+
+Files are named after the SHA-256 of their content: uploading the same photo
+again reuses the stored files, and a URL always serves the same bytes. A file
+is deleted once no resume references it any more.
+"""
+
+import base64
+import hashlib
+import io
+import logging
+from dataclasses import dataclass
+from typing import Iterable, List
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Q
+
+logger = logging.getLogger(__name__)
+
+PHOTO_DIR = 'resumes/photos'
+PHOTO_FIELDS = ['photo', 'photo_preview', 'photo_placeholder']
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF'}
+
+
+class PhotoError(ValueError):
+    """The upload is not a usable image"""
+
+
+@dataclass(frozen=True)
+class PhotoRenditions:
+    print_jpeg: bytes
+    preview_webp: bytes
+    placeholder: str
+
+
+def _decode(upload):
+    """Open an upload as an upright RGB image in sRGB, without metadata"""
+    from PIL import Image, ImageCms, ImageOps
+
+    max_pixels = getattr(settings, 'PHOTO_MAX_PIXELS', 40_000_000)
+    try:
+        image = Image.open(upload)
+        if image.format not in ALLOWED_FORMATS:
+            raise PhotoError(f'Unsupported image format: {image.format}')
+        # Checked before decoding: a small file can expand to gigabytes of pixels
+        if image.width * image.height > max_pixels:
+            raise PhotoError(f'Image too large: {image.width}x{image.height} pixels')
+        image.load()
+    except PhotoError:
+        raise
+    except Exception as e:
+        raise PhotoError('The file is not a valid image') from e
+
+    icc_profile = image.info.get('icc_profile')
+    image = ImageOps.exif_transpose(image)
+
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        # Transparent areas become white, like on the printed page
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    elif image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    if icc_profile:
+        try:
+            image = ImageCms.profileToProfile(
+                image, ImageCms.ImageCmsProfile(io.BytesIO(icc_profile)),
+                ImageCms.createProfile('sRGB'), outputMode='RGB'
+            )
+        except Exception as e:
+            logger.warning(f"Could not convert the photo to sRGB: {str(e)}")
+
+    image.info = {}
+    return image
+
+
+def _encode(image, max_px: int, image_format: str, **options) -> bytes:
+    from PIL import Image
+
+    rendition = image.copy()
+    rendition.thumbnail((max_px, max_px), Image.LANCZOS)
+    output = io.BytesIO()
+    rendition.save(output, format=image_format, **options)
+    return output.getvalue()
+
+
+def process_photo(upload) -> PhotoRenditions:
+    """
+    Decode an uploaded photo and build its renditions.
+
+    Raises PhotoError if the upload is not a supported image.
+    """
+    image = _decode(upload)
+    placeholder = _encode(image, getattr(settings, 'PHOTO_PLACEHOLDER_PX', 16), 'WEBP', quality=30)
+    return PhotoRenditions(
+        print_jpeg=_encode(
+            image, getattr(settings, 'PDF_PHOTO_MAX_PX', 600), 'JPEG', quality=85, optimize=True
+        ),
+        preview_webp=_encode(
+            image, getattr(settings, 'PHOTO_PREVIEW_MAX_PX', 320), 'WEBP', quality=80, method=6
+        ),
+        placeholder=f"data:image/webp;base64,{base64.b64encode(placeholder).decode('ascii')}",
+    )
+
+
+def photo_name(content: bytes, extension: str) -> str:
+    """Storage name of a rendition, from its content"""
+    return f'{PHOTO_DIR}/{hashlib.sha256(content).hexdigest()[:32]}.{extension}'
+
+
+def _store(storage, content: bytes, extension: str) -> str:
+    name = photo_name(content, extension)
+    if storage.exists(name):
+        return name
+    return storage.save(name, ContentFile(content))
+
+
+def photo_files(resume) -> List[str]:
+    """Storage names of the photo renditions of a resume"""
+    return [field.name for field in (resume.photo, resume.photo_preview) if field]
+
+
+def set_resume_photo(resume, renditions: PhotoRenditions) -> None:
+    """Store the renditions and point the resume to them (the resume is not saved)"""
+    resume.photo.name = _store(resume.photo.storage, renditions.print_jpeg, 'jpg')
+    resume.photo_preview.name = _store(resume.photo_preview.storage, renditions.preview_webp, 'webp')
+    resume.photo_placeholder = renditions.placeholder
+
+
+def clear_resume_photo(resume) -> None:
+    """Remove the photo of the resume (the resume is not saved)"""
+    resume.photo = None
+    resume.photo_preview = None
+    resume.photo_placeholder = ''
+
+
+def delete_unreferenced_photo_files(names: Iterable[str]) -> None:
+    """Delete the files that no resume references any more"""
+    from .models import Resume
+
+    storage = Resume._meta.get_field('photo').storage
+    for name in set(names):
+        if Resume.objects.filter(Q(photo=name) | Q(photo_preview=name)).exists():
+            continue
+        try:
+            storage.delete(name)
+        except Exception as e:
+            logger.warning(f"Could not delete photo file {name}: {str(e)}")
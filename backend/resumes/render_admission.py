@@ -0,0 +1,189 @@
+"""
+Admission control for PDF rendering.
+
+Without a bound, a burst of exports queues up in front of the browser pool:
+every waiting request holds a worker thread (or connection) and its rendered
+HTML, and clients time out long before their turn. RenderAdmission caps the
+renders in flight per process and the number of requests allowed to wait for
+one, and rejects the rest immediately:
+
+- queue full: RenderQueueFull (429 Too Many Requests)
+- no render slot within max_queue_wait seconds: RenderQueueTimeout (503)
+
+Both carry a Retry-After estimate computed from the queue depth and the
+recent render times.
+
+Admission runs on the browser pool event loop (see PDFGenerationService), so
+sync and async callers share the same queue and no locking is needed.
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+
+class RenderRejected(Exception):
+    """A render was refused by admission control"""
+
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class RenderQueueFull(RenderRejected):
+    """Too many renders are already waiting"""
+
+    status_code = 429
+
+
+class RenderQueueTimeout(RenderRejected):
+    """No render slot became available within the max queue wait"""
+
+    status_code = 503
+
+
+class RenderAdmission:
+    """
+    Bounded render queue of a worker process.
+
+    Args:
+        max_concurrency: Renders in flight at the same time
+        max_queue: Requests allowed to wait for a render slot
+        max_queue_wait: Seconds a request may wait before being rejected
+    """
+
+    # Number of recent wait/render times kept for the percentiles
+    SAMPLE_SIZE = 1000
+
+    def __init__(self, max_concurrency: int = 2, max_queue: int = 20, max_queue_wait: float = 10):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_queue_wait = max_queue_wait
+
+        self._semaphore = None
+        self.in_flight = 0
+        self.queue_depth = 0
+        self._wait_times = deque(maxlen=self.SAMPLE_SIZE)
+        self._render_times = deque(maxlen=self.SAMPLE_SIZE)
+        self._stats = {
+            'admitted': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'max_queue_depth': 0,
+            'max_wait_seconds': 0.0,
+        }
+
+    def retry_after(self) -> int:
+        """Seconds after which a rejected request may succeed"""
+        render_time = (
+            sum(self._render_times) / len(self._render_times) if self._render_times else 1.0
+        )
+        backlog = self.queue_depth + self.in_flight
+        return max(1, math.ceil(backlog * render_time / self.max_concurrency))
+
+    async def run(self, coro_fn, *args, **kwargs) -> Any:
+        """
+        Await `coro_fn(*args, **kwargs)` once a render slot is available.
+
+        Raises:
+            RenderQueueFull: max_queue requests are already waiting
+            RenderQueueTimeout: no slot was freed within max_queue_wait
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if self._semaphore.locked():
+            if self.queue_depth >= self.max_queue:
+                self._stats['rejected_queue_full'] += 1
+                raise RenderQueueFull(
+                    f'PDF render queue is full ({self.queue_depth} waiting)',
+                    self.retry_after()
+                )
+
+        self.queue_depth += 1
+        self._stats['max_queue_depth'] = max(self._stats['max_queue_depth'], self.queue_depth)
+        queued_at = time.monotonic()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.max_queue_wait)
+        except asyncio.TimeoutError:
+            self._stats['rejected_timeout'] += 1
+            raise RenderQueueTimeout(
+                f'No PDF render slot available after {self.max_queue_wait}s',
+                self.retry_after()
+            )
+        finally:
+            self.queue_depth -= 1
+            wait = time.monotonic() - queued_at
+
+        self._wait_times.append(wait)
+        self._stats['admitted'] += 1
+        self._stats['max_wait_seconds'] = max(self._stats['max_wait_seconds'], wait)
+
+        self.in_flight += 1
+        started_at = time.monotonic()
+        try:
+            return await coro_fn(*args, **kwargs)
+        finally:
+            self._render_times.append(time.monotonic() - started_at)
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    @staticmethod
+    def _percentile(samples, percentile: float) -> Optional[float]:
+        if not samples:
+            return None
+        ordered = sorted(samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percentile))]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the queue counters and the recent wait/render time percentiles"""
+        wait_times = list(self._wait_times)
+        render_times = list(self._render_times)
+        return {
+            **self._stats,
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'max_queue_wait': self.max_queue_wait,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'wait_seconds_p50': self._percentile(wait_times, 0.5),
+            'wait_seconds_p95': self._percentile(wait_times, 0.95),
+            'render_seconds_p50': self._percentile(render_times, 0.5),
+            'render_seconds_p95': self._percentile(render_times, 0.95),
+        }
+
+
+_admission: Optional[RenderAdmission] = None
+_admission_pid: Optional[int] = None
+_admission_lock = threading.Lock()
+
+
+def get_render_admission() -> RenderAdmission:
+    """Return the render admission control of the current worker process"""
+    global _admission, _admission_pid
+
+    pid = os.getpid()
+    if _admission is not None and _admission_pid == pid:
+        return _admission
+
+    with _admission_lock:
+        if _admission is None or _admission_pid != pid:
+            max_concurrency = getattr(settings, 'PDF_RENDER_MAX_CONCURRENCY', None) or (
+                getattr(settings, 'PDF_BROWSER_POOL_SIZE', 2)
+                * getattr(settings, 'PDF_BROWSER_PAGES_PER_BROWSER', 1)
+            )
+            _admission = RenderAdmission(
+                max_concurrency=max_concurrency,
+                max_queue=getattr(settings, 'PDF_RENDER_MAX_QUEUE', 20),
+                max_queue_wait=getattr(settings, 'PDF_RENDER_MAX_QUEUE_WAIT', 10),
+            )
+            _admission_pid = pid
+    return _admission
@@ -0,0 +1,265 @@
+"""
+Single-flight coalescing of identical PDF renders.
+
+Double-clicks and frontend retries send several exports of the same resume
+version at the same moment. They all produce the same document, so renders
+are keyed by the PDF content address (pdf_cache_key: template + resume data +
+PDF options) and concurrent requests for the same key share one render:
+
+- in-process: the first request (leader) renders, the others await its
+  result. This runs on the browser pool event loop, like admission control,
+  so sync and async callers are coalesced together.
+- across processes: the leader takes a short-lived lock on the key before
+  rendering and publishes the PDF under the key when done. A leader that
+  finds the key locked polls for the published PDF instead of rendering it
+  again, and renders it itself if the lock holder dies (the lock expires)
+  or does not publish within `wait_timeout`.
+
+Lock backends (PDF_RENDER_LOCK_BACKEND):
+- RedisRenderLock: SET NX PX lock and result in Redis (REDIS_URL)
+- LocalRenderLock: in-memory stand-in with the same semantics, for tests
+  and single-process deployments
+
+Coalescing is an optimization: if the lock backend is unreachable, requests
+render on their own.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# Returned by failed lock backend calls
+LOCK_UNAVAILABLE = object()
+
+
+class LocalRenderLock:
+    """In-memory render lock and result store (one process only)"""
+
+    def __init__(self):
+        self._locks = {}
+        self._results = {}
+        self._mutex = threading.Lock()
+
+    @staticmethod
+    def _alive(entry) -> bool:
+        return entry is not None and entry[1] > time.monotonic()
+
+    def acquire(self, key: str, ttl: float) -> Optional[str]:
+        """Lock `key` for `ttl` seconds, returns a token or None if locked"""
+        with self._mutex:
+            if self._alive(self._locks.get(key)):
+                return None
+            token = uuid.uuid4().hex
+            self._locks[key] = (token, time.monotonic() + ttl)
+            return token
+
+    def release(self, key: str, token: str) -> None:
+        """Release `key` if it is still held with `token`"""
+        with self._mutex:
+            entry = self._locks.get(key)
+            if entry is not None and entry[0] == token:
+                del self._locks[key]
+
+    def publish(self, key: str, data: bytes, ttl: float) -> None:
+        """Make the rendered PDF available to the waiting processes"""
+        now = time.monotonic()
+        with self._mutex:
+            for expired in [k for k, entry in self._results.items() if entry[1] <= now]:
+                del self._results[expired]
+            self._results[key] = (data, now + ttl)
+
+    def fetch(self, key: str) -> Optional[bytes]:
+        """Return the published PDF of `key`, or None"""
+        with self._mutex:
+            entry = self._results.get(key)
+            return entry[0] if self._alive(entry) else None
+
+
+class RedisRenderLock:
+    """Render lock and result store shared by every process through Redis"""
+
+    # Delete the lock only if we still own it
+    RELEASE_SCRIPT = """
+    if redis.call('get', KEYS[1]) == ARGV[1] then
+        return redis.call('del', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url: Optional[str] = None, prefix: str = 'pdf-render'):
+        import redis
+
+        self.prefix = prefix
+        self.client = redis.Redis.from_url(
+            url or settings.REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=2,
+        )
+        self._release = self.client.register_script(self.RELEASE_SCRIPT)
+
+    def _lock_key(self, key: str) -> str:
+        return f'{self.prefix}:lock:{key}'
+
+    def _result_key(self, key: str) -> str:
+        return f'{self.prefix}:result:{key}'
+
+    def acquire(self, key: str, ttl: float) -> Optional[str]:
+        token = uuid.uuid4().hex
+        if self.client.set(self._lock_key(key), token, nx=True, px=int(ttl * 1000)):
+            return token
+        return None
+
+    def release(self, key: str, token: str) -> None:
+        self._release(keys=[self._lock_key(key)], args=[token])
+
+    def publish(self, key: str, data: bytes, ttl: float) -> None:
+        self.client.set(self._result_key(key), data, px=int(ttl * 1000))
+
+    def fetch(self, key: str) -> Optional[bytes]:
+        return self.client.get(self._result_key(key))
+
+
+class RenderCoalescer:
+    """
+    Shares one render between concurrent requests for the same key.
+
+    Args:
+        lock: The cross-process lock backend (None: in-process only)
+        lock_ttl: Lifetime of the lock and of the published PDF, in seconds
+        wait_timeout: Seconds to wait for another process before rendering
+        poll_interval: Seconds between two checks for the published PDF
+    """
+
+    def __init__(self, lock=None, lock_ttl: float = 60, wait_timeout: float = 30, poll_interval: float = 0.1):
+        self.lock = lock
+        self.lock_ttl = lock_ttl
+        self.wait_timeout = wait_timeout
+        self.poll_interval = poll_interval
+        self._flights: Dict[str, asyncio.Future] = {}
+        self._stats = {
+            'renders': 0,
+            'coalesced_local': 0,
+            'coalesced_remote': 0,
+            'lock_errors': 0,
+        }
+
+    async def run(self, key: str, render_fn, *args, **kwargs) -> bytes:
+        """
+        Return the PDF of `key`, awaiting `render_fn(*args, **kwargs)` only if
+        no identical render is in flight.
+        """
+        flight = self._flights.get(key)
+        if flight is not None:
+            self._stats['coalesced_local'] += 1
+            return await asyncio.shield(flight)
+
+        flight = asyncio.get_running_loop().create_future()
+        self._flights[key] = flight
+        try:
+            result = await self._render_once(key, render_fn, *args, **kwargs)
+        except BaseException as e:
+            flight.set_exception(e)
+            # Followers re-raise it, don't warn when there are none
+            flight.exception()
+            raise
+        else:
+            flight.set_result(result)
+            return result
+        finally:
+            del self._flights[key]
+
+    async def _lock_call(self, method: str, *args):
+        """Call the lock backend in a thread, LOCK_UNAVAILABLE if it fails"""
+        try:
+            return await asyncio.to_thread(getattr(self.lock, method), *args)
+        except Exception as e:
+            self._stats['lock_errors'] += 1
+            logger.warning(f"PDF render lock {method} failed: {str(e)}")
+            return LOCK_UNAVAILABLE
+
+    async def _render(self, render_fn, *args, **kwargs) -> bytes:
+        self._stats['renders'] += 1
+        return await render_fn(*args, **kwargs)
+
+    async def _render_once(self, key: str, render_fn, *args, **kwargs) -> bytes:
+        """Render `key` unless another process renders or rendered it"""
+        if self.lock is None:
+            return await self._render(render_fn, *args, **kwargs)
+
+        deadline = time.monotonic() + self.wait_timeout
+        while True:
+            # Check for a published result first: the lock is free again
+            # once its holder has published
+            pdf_bytes = await self._lock_call('fetch', key)
+            if pdf_bytes is LOCK_UNAVAILABLE:
+                return await self._render(render_fn, *args, **kwargs)
+            if pdf_bytes is not None:
+                self._stats['coalesced_remote'] += 1
+                return pdf_bytes
+
+            token = await self._lock_call('acquire', key, self.lock_ttl)
+            if token is LOCK_UNAVAILABLE:
+                return await self._render(render_fn, *args, **kwargs)
+            if token is not None:
+                break
+
+            if time.monotonic() >= deadline:
+                logger.warning(f"Timed out waiting for the render of {key}, rendering it")
+                return await self._render(render_fn, *args, **kwargs)
+
+            await asyncio.sleep(self.poll_interval)
+
+        try:
+            pdf_bytes = await self._render(render_fn, *args, **kwargs)
+            await self._lock_call('publish', key, pdf_bytes, self.lock_ttl)
+            return pdf_bytes
+        finally:
+            await self._lock_call('release', key, token)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the render and coalescing counters"""
+        return {
+            **self._stats,
+            'in_flight': len(self._flights),
+            'lock_backend': type(self.lock).__name__ if self.lock is not None else None,
+        }
+
+
+_coalescer: Optional[RenderCoalescer] = None
+_coalescer_pid: Optional[int] = None
+_coalescer_lock = threading.Lock()
+
+
+def get_render_coalescer() -> RenderCoalescer:
+    """Return the render coalescer of the current worker process"""
+    global _coalescer, _coalescer_pid
+
+    pid = os.getpid()
+    if _coalescer is not None and _coalescer_pid == pid:
+        return _coalescer
+
+    with _coalescer_lock:
+        if _coalescer is None or _coalescer_pid != pid:
+            backend = getattr(settings, 'PDF_RENDER_LOCK_BACKEND', None)
+            lock = None
+            if backend:
+                try:
+                    lock = import_string(backend)()
+                except Exception as e:
+                    logger.warning(f"PDF render lock backend unavailable, coalescing in-process only: {str(e)}")
+            _coalescer = RenderCoalescer(
+                lock=lock,
+                lock_ttl=getattr(settings, 'PDF_RENDER_LOCK_TTL', 60),
+                wait_timeout=getattr(settings, 'PDF_RENDER_LOCK_WAIT', 30),
+            )
+            _coalescer_pid = pid
+    return _coalescer
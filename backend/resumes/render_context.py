@@ -0,0 +1,178 @@
+"""
+Handlebars render context of a resume.
+
+The preview endpoint (ResumeViewSet.render_html) and the PDF export both
+render templates with a ResumeRenderContext, so a template sees exactly the
+same data in both places.
+
+A context is built in a single pass over the resume fields and is immutable,
+so one instance is shared by every render of the same resume version: built
+contexts are kept in a bounded LRU keyed by (Resume.id, version). Every save
+bumps the version, save(update_fields=...) included (updated_at is only
+written when listed), so an edited resume never reuses a stale context.
+
+Templates use several spellings for the same section (experience_data,
+experience, experiences...). Aliases are resolved on lookup instead of being
+copied into the context.
+"""
+
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict
+
+from django.conf import settings
+
+# Alternative names used by some templates -> canonical context key
+ALIASES = MappingProxyType({
+    'experience': 'experience_data',
+    'education': 'education_data',
+    'skills': 'skills_data',
+    'languages': 'languages_data',
+    'certifications': 'certifications_data',
+    'projects': 'projects_data',
+    'experiences': 'experience_data',
+    'educations': 'education_data',
+})
+
+# Sections some templates expect but the resume model does not store
+EMPTY_SECTIONS = frozenset({'hobbies', 'references'})
+
+TEXT_FIELDS = (
+    'full_name', 'email', 'phone', 'address', 'city', 'postal_code',
+    'website', 'linkedin_url', 'github_url', 'title', 'nationality',
+    'driving_license', 'summary',
+)
+
+SECTION_FIELDS = (
+    'experience_data', 'education_data', 'skills_data', 'languages_data',
+    'certifications_data', 'projects_data', 'custom_sections',
+)
+
+
+class ResumeRenderContext(Mapping):
+    """
+    Read-only template context of one resume version.
+
+    Behaves like the dict the templates used to receive (including the alias
+    keys), but aliases point at the canonical entry instead of a copy.
+    Section lists are shared between renders and must not be mutated.
+    """
+
+    __slots__ = ('_data',)
+
+    def __init__(self, data: Dict[str, Any]):
+        self._data = MappingProxyType(dict(data))
+
+    @classmethod
+    def from_resume(cls, resume) -> 'ResumeRenderContext':
+        """Build the context of a resume in a single pass over its fields"""
+        data = {field: getattr(resume, field) or '' for field in TEXT_FIELDS}
+
+        name_parts = data['full_name'].split()
+        data['first_name'] = name_parts[0] if name_parts else ''
+        data['last_name'] = ' '.join(name_parts[1:])
+
+        # Previews load the small rendition, PDFs embed the print one (build_pdf_context)
+        photo = resume.photo_preview or resume.photo
+        data['photo'] = photo.url if photo else None
+        data['date_of_birth'] = str(resume.date_of_birth) if resume.date_of_birth else ''
+
+        for field in SECTION_FIELDS:
+            data[field] = getattr(resume, field) or []
+
+        return cls(data)
+
+    def replace(self, **changes) -> 'ResumeRenderContext':
+        """Return a copy of the context with some entries replaced"""
+        return type(self)({**self._data, **changes})
+
+    def __getitem__(self, key):
+        try:
+            return self._data[key]
+        except KeyError:
+            if key in ALIASES:
+                return self._data[ALIASES[key]]
+            if key in EMPTY_SECTIONS:
+                return []
+            raise
+
+    def __iter__(self):
+        yield from self._data
+        yield from ALIASES
+        yield from EMPTY_SECTIONS
+
+    def __len__(self):
+        return len(self._data) + len(ALIASES) + len(EMPTY_SECTIONS)
+
+    def __contains__(self, key):
+        return key in self._data or key in ALIASES or key in EMPTY_SECTIONS
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self._data)!r})'
+
+
+class ResumeContextCache:
+    """Bounded, thread-safe LRU of resume render contexts"""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, resume) -> ResumeRenderContext:
+        """Return the render context of a Resume model instance"""
+        key = resume_context_key(resume)
+        with self._lock:
+            context = self._entries.get(key)
+            if context is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return context
+            self.misses += 1
+
+        context = ResumeRenderContext.from_resume(resume)
+
+        with self._lock:
+            self._entries[key] = context
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return context
+
+    def invalidate(self, resume_id) -> None:
+        """Drop every cached context of the given resume"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == resume_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }
+
+
+def resume_context_key(resume) -> tuple:
+    """Cache key of a Resume model instance"""
+    return (resume.id, resume.version)
+
+
+# Singleton instance shared by the preview and PDF render paths
+resume_contexts = ResumeContextCache(
+    max_size=getattr(settings, 'RESUME_CONTEXT_CACHE_SIZE', 256)
+)
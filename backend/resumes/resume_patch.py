@@ -0,0 +1,206 @@
+"""
+JSON-Patch (RFC 6902) autosave of resumes.
+
+The editor used to autosave by sending every section (experience_data,
+education_data...) back through ResumeUpdateSerializer, and each save
+rewrote the whole row. PATCH /resumes/{id}/delta takes a list of patch
+operations instead:
+
+    [
+        {"op": "replace", "path": "/experience_data/2/description", "value": "..."},
+        {"op": "add", "path": "/skills_data/-", "value": {"name": "Django"}},
+        {"op": "remove", "path": "/projects_data/0"},
+        {"op": "replace", "path": "/summary", "value": "..."}
+    ]
+
+The first path segment is a ResumeUpdateSerializer field. Section fields
+can be patched at any depth, other fields are only replaced as a whole.
+Operations are applied in order to copies of the touched fields of the
+serialized resume; the view then validates the new values with
+ResumeUpdateSerializer (touched fields only) and writes only the columns
+that changed. A failing operation rejects the whole patch.
+"""
+
+import copy
+from typing import Any, Dict, List, Optional
+
+# Resume JSON fields that can be patched item by item
+SECTION_FIELDS = (
+    'experience_data', 'education_data', 'skills_data', 'languages_data',
+    'certifications_data', 'projects_data', 'custom_sections',
+)
+
+OPERATIONS = ('add', 'remove', 'replace', 'move', 'copy', 'test')
+
+# Above this, the client should save the resume through the regular update
+MAX_OPERATIONS = 500
+
+_MISSING = object()
+
+
+class PatchError(ValueError):
+    """An operation cannot be applied, the patch is rejected"""
+
+    def __init__(self, message: str, index: Optional[int] = None):
+        super().__init__(message)
+        self.index = index
+
+
+def parse_pointer(path: str) -> List[str]:
+    """Split a JSON pointer ("/a/b~1c") into its unescaped tokens"""
+    if not isinstance(path, str) or not path.startswith('/'):
+        raise PatchError(f'Invalid path: {path!r}')
+    return [token.replace('~1', '/').replace('~0', '~') for token in path[1:].split('/')]
+
+
+def _index(container: list, token: str, allow_end: bool = False) -> int:
+    if allow_end and token == '-':
+        return len(container)
+    # str.isdigit() also accepts digits int() rejects ('²')
+    if not (token.isascii() and token.isdigit()) or (len(token) > 1 and token.startswith('0')):
+        raise PatchError(f'Invalid list index: {token!r}')
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f'List index out of range: {index}')
+    return index
+
+
+def _resolve(document: Any, tokens: List[str]) -> Any:
+    for token in tokens:
+        if isinstance(document, list):
+            document = document[_index(document, token)]
+        elif isinstance(document, dict):
+            if token not in document:
+                raise PatchError(f'Member not found: {token!r}')
+            document = document[token]
+        else:
+            raise PatchError(f'Cannot traverse a {type(document).__name__} with {token!r}')
+    return document
+
+
+def _add(document: Any, tokens: List[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1])
+    if isinstance(parent, list):
+        parent.insert(_index(parent, tokens[-1], allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[tokens[-1]] = value
+    else:
+        raise PatchError(f'Cannot add to a {type(parent).__name__}')
+    return document
+
+
+def _remove(document: Any, tokens: List[str]) -> Any:
+    if not tokens:
+        raise PatchError('Cannot remove a whole field')
+    parent = _resolve(document, tokens[:-1])
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, tokens[-1])), document
+    if isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise PatchError(f'Member not found: {tokens[-1]!r}')
+        return parent.pop(tokens[-1]), document
+    raise PatchError(f'Cannot remove from a {type(parent).__name__}')
+
+
+def _replace(document: Any, tokens: List[str], value: Any) -> Any:
+    if not tokens:
+        return value
+    parent = _resolve(document, tokens[:-1])
+    if isinstance(parent, list):
+        parent[_index(parent, tokens[-1])] = value
+    elif isinstance(parent, dict):
+        if tokens[-1] not in parent:
+            raise PatchError(f'Member not found: {tokens[-1]!r}')
+        parent[tokens[-1]] = value
+    else:
+        raise PatchError(f'Cannot replace in a {type(parent).__name__}')
+    return document
+
+
+class ResumePatch:
+    """
+    Applies patch operations to a serialized resume.
+
+    Args:
+        document: The resume representation (ResumeUpdateSerializer data),
+            not modified
+        fields: Names of the fields that may be patched
+    """
+
+    def __init__(self, document, fields):
+        self.document = document
+        self.fields = set(fields)
+        self.values: Dict[str, Any] = {}
+
+    def _field(self, tokens: List[str]) -> str:
+        field = tokens[0]
+        if field not in self.fields:
+            raise PatchError(f'Unknown field: {field!r}')
+        if len(tokens) > 1 and field not in SECTION_FIELDS:
+            raise PatchError(f'{field!r} can only be replaced as a whole')
+        if field not in self.values:
+            # Touched fields are copied once, the resume keeps its values
+            # if the patch is rejected
+            value = self.document.get(field)
+            self.values[field] = copy.deepcopy(value) if field in SECTION_FIELDS else value
+            if field in SECTION_FIELDS and self.values[field] is None:
+                self.values[field] = []
+        return field
+
+    def _apply(self, operation: Dict[str, Any]) -> None:
+        op = operation.get('op')
+        if op not in OPERATIONS:
+            raise PatchError(f'Unsupported operation: {op!r}')
+
+        tokens = parse_pointer(operation.get('path'))
+        field = self._field(tokens)
+        value = operation.get('value', _MISSING)
+        if op in ('add', 'replace', 'test') and value is _MISSING:
+            raise PatchError(f'"{op}" requires a value')
+
+        if op == 'test':
+            if _resolve(self.values[field], tokens[1:]) != value:
+                raise PatchError(f'Test failed: {operation["path"]}')
+        elif op == 'add':
+            self.values[field] = _add(self.values[field], tokens[1:], value)
+        elif op == 'replace':
+            self.values[field] = _replace(self.values[field], tokens[1:], value)
+        elif op == 'remove':
+            _, self.values[field] = _remove(self.values[field], tokens[1:])
+        else:
+            source = parse_pointer(operation.get('from'))
+            source_field = self._field(source)
+            if op == 'move':
+                if operation['path'].startswith(operation['from'] + '/'):
+                    raise PatchError('Cannot move a value into one of its children')
+                value, self.values[source_field] = _remove(self.values[source_field], source[1:])
+            else:
+                value = copy.deepcopy(_resolve(self.values[source_field], source[1:]))
+            self.values[field] = _add(self.values[field], tokens[1:], value)
+
+    def apply(self, operations) -> Dict[str, Any]:
+        """
+        Apply the operations in order.
+
+        Returns:
+            {field: new value} of the touched fields
+        """
+        if not isinstance(operations, list) or not operations:
+            raise PatchError('Expected a non-empty list of operations')
+        if len(operations) > MAX_OPERATIONS:
+            raise PatchError(f'Too many operations (max {MAX_OPERATIONS})')
+
+        for index, operation in enumerate(operations):
+            if not isinstance(operation, dict):
+                raise PatchError('Operations must be objects', index)
+            try:
+                self._apply(operation)
+            except PatchError as e:
+                e.index = index
+                raise
+            except (KeyError, TypeError, ValueError) as e:
+                raise PatchError(f'Invalid operation: {str(e)}', index)
+
+        return self.values
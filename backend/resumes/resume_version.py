@@ -0,0 +1,74 @@
+"""
+Optimistic concurrency for resume auto-save.
+
+Every save of a resume increments Resume.version (see Resume.save). The
+version is the ETag ("<version>") of the update/partial_update/delta
+responses, and a write sent with If-Match: "<version>" is rejected with
+409 Conflict when the resume was saved since (another tab, a retried
+request).
+
+GET /resumes/{id} also returns inputs that change without a save of the
+resume: the export entitlements (the owner pays or upgrades) and the
+template name. Its ETag is "<version>-<digest of these inputs>"
+(representation_etag), and If-None-Match gets a 304 only while both are
+unchanged. Photo URLs follow the photo fields, which are part of the
+version. If-Match accepts both forms and compares the version only.
+
+Requests without these headers behave as before: the last write wins.
+"""
+
+import hashlib
+from typing import Optional, Set
+
+
+def resume_etag(resume) -> str:
+    """ETag of a resume version"""
+    return f'"{resume.version}"'
+
+
+def representation_etag(resume, request=None) -> str:
+    """
+    ETag of the GET representation of a resume.
+
+    The template and user loaded with the resume (select_related) are used,
+    entitlements are memoized on the request for the serializer.
+    """
+    from .entitlements import resolve_entitlements
+
+    template = resume.template if resume.template_id is not None else None
+    inputs = (
+        resolve_entitlements(resume, request=request).can_export,
+        resume.template_id,
+        template.name if template is not None else None,
+    )
+    digest = hashlib.sha256(repr(inputs).encode()).hexdigest()[:16]
+    return f'"{resume.version}-{digest}"'
+
+
+def if_match_versions(request) -> Optional[Set[int]]:
+    """
+    Versions listed in the If-Match header.
+
+    Returns None when the header is absent or "*" (any version matches).
+    Weak tags (W/"3", as rewritten by compressing proxies) are accepted.
+    """
+    header = request.META.get('HTTP_IF_MATCH')
+    if not header or header.strip() == '*':
+        return None
+
+    versions = set()
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        # "<version>" or "<version>-<digest>" (representation_etag)
+        tag = tag.strip('"').split('-', 1)[0]
+        if tag.isascii() and tag.isdigit():
+            versions.add(int(tag))
+    return versions
+
+
+def is_version_conflict(request, resume) -> bool:
+    """True if the request was made against another version of the resume"""
+    versions = if_match_versions(request)
+    return versions is not None and resume.version not in versions
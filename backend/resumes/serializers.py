@@ -1,5 +1,8 @@
+from django.urls import reverse
+from django.utils import timezone
 from rest_framework import serializers
-from .models import Template, Resume, Experience, Education, Skill, TemplateCategory
+from .entitlements import resolve_entitlements
+from .models import Template, Resume, Experience, Education, Skill, TemplateCategory, PDFExportJob
 
 
 class TemplateCategorySerializer(serializers.ModelSerializer):
@@ -11,6 +14,16 @@ class TemplateCategorySerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
+class TemplateCategoryCountSerializer(TemplateCategorySerializer):
+    """Template category with its number of active templates"""
+
+    # Annotated by TemplateViewSet.get_categories_queryset
+    count = serializers.IntegerField(source='template_count', read_only=True)
+
+    class Meta(TemplateCategorySerializer.Meta):
+        fields = TemplateCategorySerializer.Meta.fields + ['count']
+
+
 class TemplateSerializer(serializers.ModelSerializer):
     """Template serializer"""
 
@@ -32,6 +45,18 @@ class TemplateSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at']
 
 
+class TemplateCatalogSerializer(serializers.ModelSerializer):
+    """Compact template entry of the catalog payload (categories as slugs)"""
+
+    thumbnail = serializers.CharField(read_only=True)
+    category_slugs = serializers.ReadOnlyField()
+
+    class Meta:
+        model = Template
+        fields = ['id', 'name', 'description', 'thumbnail', 'category_slugs', 'is_premium']
+        read_only_fields = fields
+
+
 class TemplateDetailSerializer(serializers.ModelSerializer):
     """Template detail serializer with HTML/CSS"""
 
@@ -91,23 +116,46 @@ class ResumeSerializer(serializers.ModelSerializer):
     education = EducationSerializer(many=True, read_only=True)
     skills = SkillSerializer(many=True, read_only=True)
     template_name = serializers.CharField(source='template.name', read_only=True)
-    can_export_without_watermark = serializers.BooleanField(read_only=True)
+    can_export_without_watermark = serializers.SerializerMethodField()
+    photo_urls = serializers.SerializerMethodField()
 
     class Meta:
         model = Resume
         fields = [
             'id', 'session_id', 'user', 'template', 'template_name',
             'full_name', 'email', 'phone', 'address', 'city', 'postal_code',
-            'website', 'linkedin_url', 'github_url', 'photo', 'date_of_birth',
+            'website', 'linkedin_url', 'github_url', 'photo', 'photo_urls', 'date_of_birth',
             'nationality', 'driving_license', 'summary', 'title',
             'experience_data', 'education_data', 'skills_data',
             'languages_data', 'certifications_data', 'projects_data',
             'custom_sections', 'is_paid', 'payment_type',
             'experiences', 'education', 'skills',
             'can_export_without_watermark',
-            'created_at', 'updated_at'
+            'version', 'created_at', 'updated_at'
         ]
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+        read_only_fields = ['id', 'user', 'version', 'created_at', 'updated_at']
+
+    def get_can_export_without_watermark(self, obj) -> bool:
+        return resolve_entitlements(obj, request=self.context.get('request')).can_export
+
+    def _file_url(self, file):
+        request = self.context.get('request')
+        return request.build_absolute_uri(file.url) if request else file.url
+
+    def get_photo_urls(self, obj):
+        """
+        Photo renditions (see photo_pipeline.py), None without photo.
+
+        Photos uploaded before the renditions existed only have the original.
+        """
+        if not obj.photo:
+            return None
+        print_url = self._file_url(obj.photo)
+        return {
+            'preview': self._file_url(obj.photo_preview) if obj.photo_preview else print_url,
+            'print': print_url,
+            'placeholder': obj.photo_placeholder or None,
+        }
 
     def create(self, validated_data):
         request = self.context.get('request')
@@ -127,6 +175,20 @@ class ResumeSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
+class ResumeListSerializer(serializers.ModelSerializer):
+    """Resume list entry: no sections, no nested experiences/education/skills"""
+
+    template_name = serializers.CharField(source='template.name', read_only=True)
+
+    class Meta:
+        model = Resume
+        fields = [
+            'id', 'template', 'template_name', 'full_name', 'email', 'title',
+            'photo', 'is_paid', 'payment_type', 'version', 'created_at', 'updated_at'
+        ]
+        read_only_fields = fields
+
+
 class ResumeCreateSerializer(serializers.ModelSerializer):
     """Simplified serializer for creating resumes"""
 
@@ -186,7 +248,67 @@ class ResumeUpdateSerializer(serializers.ModelSerializer):
             'nationality', 'driving_license', 'summary', 'title',
             'experience_data', 'education_data', 'skills_data',
             'languages_data', 'certifications_data', 'projects_data',
-            'custom_sections'
+            'custom_sections', 'version'
         ]
+        read_only_fields = ['version']
         # Note: 'photo' is excluded - file uploads should be handled separately
         # via multipart/form-data using a dedicated endpoint
+
+    def update(self, instance, validated_data):
+        """
+        Write only the columns whose value changed, in a single UPDATE.
+
+        updated_at/last_accessed (auto_now) are written with them. When no
+        value changed, only last_accessed is refreshed, without bumping the
+        version. The changed field names are kept in `updated_fields`.
+        """
+        self.updated_fields = []
+        for name, value in validated_data.items():
+            field = instance._meta.get_field(name)
+            if field.is_relation:
+                # Compare the foreign key, without fetching the related object
+                current, value_key = field.value_from_object(instance), getattr(value, 'pk', value)
+            else:
+                current, value_key = getattr(instance, name), value
+            if value_key != current:
+                setattr(instance, name, value)
+                self.updated_fields.append(name)
+
+        if self.updated_fields:
+            instance.save(update_fields=self.updated_fields + ['updated_at', 'last_accessed'])
+        else:
+            # The content is unchanged: the version (and the cached renders
+            # keyed on it) stays the same
+            instance.last_accessed = timezone.now()
+            Resume.objects.filter(pk=instance.pk).update(last_accessed=instance.last_accessed)
+        return instance
+
+
+class PDFExportJobSerializer(serializers.ModelSerializer):
+    """PDF export job status serializer"""
+
+    job_id = serializers.UUIDField(source='id', read_only=True)
+    status_url = serializers.SerializerMethodField()
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = PDFExportJob
+        fields = [
+            'job_id', 'resume', 'template', 'status', 'filename',
+            'error_message', 'status_url', 'download_url',
+            'created_at', 'completed_at'
+        ]
+        read_only_fields = fields
+
+    def _job_url(self, obj, url_name):
+        path = reverse(f'resumes:{url_name}', kwargs={'pk': obj.resume_id, 'job_id': obj.id})
+        request = self.context.get('request')
+        return request.build_absolute_uri(path) if request else path
+
+    def get_status_url(self, obj):
+        return self._job_url(obj, 'resume-export-job')
+
+    def get_download_url(self, obj):
+        if obj.status != PDFExportJob.STATUS_SUCCEEDED:
+            return None
+        return self._job_url(obj, 'resume-export-job-download')
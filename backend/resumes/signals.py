@@ -0,0 +1,83 @@
+from django.db import transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.db.models.signals import m2m_changed, post_save, post_delete
+
+from .catalog_cache import bump_catalog_version
+from .models import Resume, Template
+from .pdf_cache import get_pdf_cache, invalidate_template
+from .render_context import resume_contexts
+from .template_cache import compiled_templates
+
+
+@receiver(post_save, sender='resumes.Template')
+@receiver(post_delete, sender='resumes.Template')
+def invalidate_compiled_template(sender, instance, **kwargs):
+    """
+    Drop the cached pybars compilation when a template is edited or deleted
+    """
+    compiled_templates.invalidate(instance.id)
+
+
+@receiver(post_save, sender='resumes.Template')
+def invalidate_template_pdf_cache(sender, instance, created, **kwargs):
+    """
+    Purge the cached PDFs rendered with a template when it is edited.
+
+    Cache keys already change with the template content, this frees the
+    space used by the stale entries.
+    """
+    if not created:
+        invalidate_template(instance.id)
+
+
+@receiver(post_delete, sender='resumes.Resume')
+def invalidate_resume_pdf_cache(sender, instance, **kwargs):
+    """
+    Delete the cached PDFs of a deleted resume
+    """
+    cache = get_pdf_cache()
+    if cache is not None:
+        cache.invalidate_resume(instance.id)
+
+
+@receiver(post_delete, sender='resumes.Resume')
+def invalidate_resume_render_context(sender, instance, **kwargs):
+    """
+    Drop the cached render contexts of a deleted resume
+    """
+    resume_contexts.invalidate(instance.id)
+
+
+@receiver(post_save, sender='resumes.Experience')
+@receiver(post_delete, sender='resumes.Experience')
+@receiver(post_save, sender='resumes.Education')
+@receiver(post_delete, sender='resumes.Education')
+@receiver(post_save, sender='resumes.Skill')
+@receiver(post_delete, sender='resumes.Skill')
+def bump_resume_version(sender, instance, **kwargs):
+    """
+    Experiences, education and skills are nested in the resume
+    representation: changing them changes the resume version (its ETag)
+    """
+    if isinstance(kwargs.get('origin'), Resume):
+        return  # Deleted with their resume
+    Resume.objects.filter(pk=instance.resume_id).update(version=F('version') + 1)
+
+
+@receiver(post_save, sender='resumes.Template')
+@receiver(post_delete, sender='resumes.Template')
+@receiver(post_save, sender='resumes.TemplateCategory')
+@receiver(post_delete, sender='resumes.TemplateCategory')
+@receiver(m2m_changed, sender=Template.categories.through)
+def invalidate_template_catalog(sender, **kwargs):
+    """
+    Invalidate the cached catalog responses when templates or categories change.
+
+    The version is bumped right away for this process, and again on commit
+    so responses cached by other requests before the commit are dropped too.
+    """
+    if kwargs.get('action', 'post_').startswith('pre_'):
+        return
+    bump_catalog_version()
+    transaction.on_commit(bump_catalog_version)
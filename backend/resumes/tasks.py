@@ -0,0 +1,94 @@
+"""
+Celery tasks for the resumes app.
+"""
+
+import logging
+
+from datetime import timedelta
+
+from celery import shared_task
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+
+from .models import PDFExportJob
+from .pdf_service import PDFGenerationService
+from .render_admission import RenderRejected
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task(bind=True, max_retries=5)
+def render_pdf_export_job(self, job_id):
+    """
+    Render the PDF of an export job and store it on the job.
+
+    Jobs refused by render admission control go back to pending and are
+    retried after the suggested Retry-After delay.
+
+    Args:
+        job_id: The PDFExportJob id
+    """
+    try:
+        job = PDFExportJob.objects.select_related('resume', 'template').get(id=job_id)
+    except PDFExportJob.DoesNotExist:
+        logger.warning(f"PDF export job {job_id} no longer exists")
+        return
+
+    job.status = PDFExportJob.STATUS_RUNNING
+    job.save(update_fields=['status', 'updated_at'])
+
+    try:
+        if job.template is None:
+            raise ValueError('Template no longer exists')
+
+        pdf_content = PDFGenerationService.generate_resume_pdf_sync(job.resume, job.template)
+        job.file.save(f"{job.id}.pdf", ContentFile(pdf_content), save=False)
+        job.status = PDFExportJob.STATUS_SUCCEEDED
+        job.error_message = None
+        logger.info(f"PDF export job {job.id} succeeded: {len(pdf_content)} bytes")
+
+    except RenderRejected as e:
+        if self.request.retries >= self.max_retries:
+            logger.error(f"PDF export job {job.id} failed: {str(e)}")
+            job.status = PDFExportJob.STATUS_FAILED
+            job.error_message = str(e)
+        else:
+            logger.warning(f"PDF export job {job.id} rejected, retrying in {e.retry_after}s")
+            job.status = PDFExportJob.STATUS_PENDING
+            job.save(update_fields=['status', 'updated_at'])
+            raise self.retry(exc=e, countdown=e.retry_after)
+
+    except Exception as e:
+        logger.error(f"PDF export job {job.id} failed: {str(e)}")
+        job.status = PDFExportJob.STATUS_FAILED
+        job.error_message = str(e)
+
+    job.completed_at = timezone.now()
+    job.save(update_fields=['status', 'file', 'error_message', 'completed_at', 'updated_at'])
+
+
+@shared_task(ignore_result=True)
+def delete_expired_pdf_export_jobs():
+    """
+    Delete the PDF export jobs older than PDF_EXPORT_JOB_RETENTION, and
+    their files.
+
+    Scheduled by Celery beat (CELERY_BEAT_SCHEDULE).
+
+    Returns:
+        Number of deleted jobs
+    """
+    cutoff = timezone.now() - timedelta(seconds=settings.PDF_EXPORT_JOB_RETENTION)
+    jobs = PDFExportJob.objects.filter(created_at__lt=cutoff)
+
+    for job in jobs.exclude(file='').exclude(file__isnull=True).only('id', 'file').iterator():
+        try:
+            job.file.delete(save=False)
+        except Exception as e:
+            logger.warning(f"Could not delete the file of PDF export job {job.id}: {str(e)}")
+
+    deleted, _ = jobs.delete()
+    if deleted:
+        logger.info(f"Deleted {deleted} expired PDF export jobs")
+    return deleted
@@ -0,0 +1,94 @@
+"""
+Process-wide cache of compiled Handlebars templates.
+
+pybars compilation is more expensive than rendering, so compiled template
+callables are kept in a bounded LRU keyed by (Template.id, updated_at).
+Entries for a template are dropped by a post_save hook (see signals.py) and,
+since the key includes updated_at, an edited template never reuses a stale
+compilation even in processes that missed the signal.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+from django.conf import settings
+from pybars import Compiler
+
+
+class CompiledTemplateCache:
+    """Bounded, thread-safe LRU of compiled pybars templates"""
+
+    def __init__(self, max_size: int = 128):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_compile(self, key: Hashable, source: str) -> Callable:
+        """
+        Return the compiled template for `key`, compiling `source` on a miss.
+
+        Args:
+            key: Cache key, usually (template id, updated_at)
+            source: The Handlebars template source
+
+        Returns:
+            The compiled template callable
+        """
+        with self._lock:
+            compiled = self._entries.get(key)
+            if compiled is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+            self.misses += 1
+
+        # Compile outside the lock so other templates are not blocked
+        compiled = Compiler().compile(source or '')
+
+        with self._lock:
+            self._entries[key] = compiled
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return compiled
+
+    def get(self, template) -> Callable:
+        """Return the compiled HTML of a Template model instance"""
+        return self.get_or_compile(template_cache_key(template), template.template_html)
+
+    def invalidate(self, template_id) -> None:
+        """Drop every cached compilation of the given template"""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == template_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }
+
+
+def template_cache_key(template) -> tuple:
+    """Cache key of a Template model instance"""
+    return (template.id, template.updated_at)
+
+
+# Singleton instance shared by the preview and PDF render paths
+compiled_templates = CompiledTemplateCache(
+    max_size=getattr(settings, 'COMPILED_TEMPLATE_CACHE_SIZE', 128)
+)
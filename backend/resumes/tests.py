@@ -1,3 +1,1886 @@
-from django.test import TestCase
+import asyncio
+import base64
+import hashlib
+import io
+import json
+import math
+import re
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils import timezone
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, force_authenticate
+
+from PIL import Image
+from pybars import Compiler, strlist
+
+from cvbuilder_backend.celery import app as celery_app
+from . import async_views, pdf_cache
+from .asset_inliner import FontCache, inline_fonts, photo_inliner
+from .browser_pool import NETWORK_URL_RE, BrowserPool
+from .entitlements import invalidate_user_entitlements, resolve_entitlements
+from .handlebars_helpers import HELPERS
+from .models import Template, TemplateCategory, Resume, PDFExportJob
+from .pdf_cache import CACHE_FORMAT_VERSION, StoragePDFCache, get_pdf_cache, pdf_cache_key
+from .pdf_service import PDF_OPTIONS, PDFGenerationService
+from .photo_pipeline import photo_name
+from .render_admission import RenderAdmission, RenderQueueFull, RenderQueueTimeout
+from .render_coalescing import LocalRenderLock, RenderCoalescer
+from .render_context import ResumeRenderContext, resume_contexts
+from .tasks import delete_expired_pdf_export_jobs
+from .template_cache import CompiledTemplateCache, compiled_templates, template_cache_key
+
+User = get_user_model()
+
+FAKE_PDF = b'%PDF-1.4 fake'
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# The suite runs against a local-memory cache, whatever CACHE_BACKEND and
+# REDIS_URL the environment sets
+_cache_override = override_settings(CACHES=LOCMEM_CACHES)
+
+
+def setUpModule():
+    _cache_override.enable()
+
+
+def tearDownModule():
+    _cache_override.disable()
+
+
+class ResumeTestMixin:
+    """Common fixtures: an authenticated user with one resume"""
+
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user(email='jean@example.com', password='secret123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.template = Template.objects.create(
+            name='Classic',
+            template_html='<h1>{{full_name}}</h1>',
+            template_css='h1 { color: black; }',
+        )
+        self.resume = Resume.objects.create(
+            user=self.user,
+            template=self.template,
+            full_name='Jean Dupont',
+            email='jean@example.com',
+        )
+
+
+class AsyncPDFExportTests(ResumeTestMixin, TestCase):
+    """export_pdf_async enqueues a job rendered by the Celery task"""
+
+    def setUp(self):
+        super().setUp()
+        # Eager mode with an in-memory broker: tasks run inline on delay()
+        eager_conf = {
+            'CELERY_TASK_ALWAYS_EAGER': True,
+            'CELERY_TASK_EAGER_PROPAGATES': True,
+            'CELERY_BROKER_URL': 'memory://',
+            'CELERY_RESULT_BACKEND': 'cache+memory://',
+        }
+        self._celery_conf = {key: celery_app.conf.get(key) for key in eager_conf}
+        celery_app.conf.update(eager_conf)
+        self.media_root = tempfile.mkdtemp()
+        media_override = override_settings(MEDIA_ROOT=self.media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+    def tearDown(self):
+        celery_app.conf.update(**self._celery_conf)
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
+
+    def export_url(self, resume=None):
+        return f'/api/resumes/{(resume or self.resume).id}/export_pdf_async'
+
+    @mock.patch('resumes.pdf_service.PDFGenerationService.generate_pdf_sync', return_value=FAKE_PDF)
+    def test_enqueue_poll_and_download(self, generate_pdf_sync):
+        response = self.client.post(self.export_url())
+        self.assertEqual(response.status_code, 202)
+        job_id = response.data['job_id']
+        self.assertEqual(response.data['status'], PDFExportJob.STATUS_SUCCEEDED)
+
+        status_response = self.client.get(f'/api/resumes/{self.resume.id}/export_jobs/{job_id}')
+        self.assertEqual(status_response.status_code, 200)
+        self.assertEqual(status_response.data['status'], PDFExportJob.STATUS_SUCCEEDED)
+        self.assertTrue(status_response.data['download_url'].endswith(f'/export_jobs/{job_id}/download'))
+
+        download = self.client.get(f'/api/resumes/{self.resume.id}/export_jobs/{job_id}/download')
+        self.assertEqual(download.status_code, 200)
+        self.assertEqual(download['Content-Type'], 'application/pdf')
+        self.assertEqual(download.content, FAKE_PDF)
+
+        cv_data = generate_pdf_sync.call_args.kwargs['cv_data']
+        self.assertEqual(cv_data['full_name'], 'Jean Dupont')
+
+    @mock.patch(
+        'resumes.pdf_service.PDFGenerationService.generate_pdf_sync',
+        side_effect=RuntimeError('Chromium crashed')
+    )
+    def test_failed_render_is_reported(self, generate_pdf_sync):
+        response = self.client.post(self.export_url())
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], PDFExportJob.STATUS_FAILED)
+        self.assertEqual(response.data['error_message'], 'Chromium crashed')
+        self.assertIsNone(response.data['download_url'])
+
+        download = self.client.get(
+            f"/api/resumes/{self.resume.id}/export_jobs/{response.data['job_id']}/download"
+        )
+        self.assertEqual(download.status_code, 409)
+
+    @mock.patch(
+        'resumes.pdf_service.PDFGenerationService.generate_pdf_sync',
+        side_effect=[RenderQueueFull('PDF render queue is full', 3), FAKE_PDF]
+    )
+    def test_rejected_render_is_retried(self, generate_pdf_sync):
+        # Eager retries run inline; only the Retry signal itself would propagate
+        celery_app.conf.update(CELERY_TASK_EAGER_PROPAGATES=False)
+
+        response = self.client.post(self.export_url())
+        self.assertEqual(response.status_code, 202)
+        job = PDFExportJob.objects.get(pk=response.data['job_id'])
+        self.assertEqual(job.status, PDFExportJob.STATUS_SUCCEEDED)
+        self.assertEqual(generate_pdf_sync.call_count, 2)
+
+    def test_pending_job_cannot_be_downloaded(self):
+        job = PDFExportJob.objects.create(resume=self.resume, template=self.template)
+        response = self.client.get(f'/api/resumes/{self.resume.id}/export_jobs/{job.id}/download')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['status'], PDFExportJob.STATUS_PENDING)
+
+    @mock.patch('resumes.pdf_service.PDFGenerationService.generate_pdf_sync', return_value=FAKE_PDF)
+    def test_premium_template_requires_payment(self, generate_pdf_sync):
+        self.template.is_premium = True
+        self.template.save()
+
+        response = self.client.post(self.export_url())
+        self.assertEqual(response.status_code, 402)
+        self.assertFalse(PDFExportJob.objects.exists())
+        generate_pdf_sync.assert_not_called()
+
+    def test_other_users_jobs_are_not_visible(self):
+        other = User.objects.create_user(email='other@example.com', password='secret123')
+        other_resume = Resume.objects.create(user=other, template=self.template)
+        job = PDFExportJob.objects.create(resume=other_resume, template=self.template)
+
+        response = self.client.get(f'/api/resumes/{other_resume.id}/export_jobs/{job.id}')
+        self.assertEqual(response.status_code, 404)
+
+    def test_job_urls_are_absolute(self):
+        job = PDFExportJob.objects.create(
+            resume=self.resume, template=self.template, status=PDFExportJob.STATUS_SUCCEEDED
+        )
+
+        response = self.client.get(f'/api/resumes/{self.resume.id}/export_jobs/{job.id}')
+
+        self.assertEqual(
+            response.data['status_url'],
+            f'http://testserver/api/resumes/{self.resume.id}/export_jobs/{job.id}'
+        )
+        self.assertEqual(response.data['download_url'], response.data['status_url'] + '/download')
+
+    def test_expired_jobs_are_deleted_with_their_file(self):
+        old_job = PDFExportJob.objects.create(resume=self.resume, template=self.template)
+        old_job.file.save(f'{old_job.id}.pdf', ContentFile(FAKE_PDF))
+        recent_job = PDFExportJob.objects.create(resume=self.resume, template=self.template)
+        recent_job.file.save(f'{recent_job.id}.pdf', ContentFile(FAKE_PDF))
+        PDFExportJob.objects.filter(pk=old_job.pk).update(
+            created_at=timezone.now() - timedelta(seconds=settings.PDF_EXPORT_JOB_RETENTION + 60)
+        )
+        storage = old_job.file.storage
+
+        self.assertEqual(delete_expired_pdf_export_jobs(), 1)
+
+        self.assertFalse(PDFExportJob.objects.filter(pk=old_job.pk).exists())
+        self.assertFalse(storage.exists(old_job.file.name))
+        self.assertTrue(PDFExportJob.objects.filter(pk=recent_job.pk).exists())
+        self.assertTrue(storage.exists(recent_job.file.name))
+
+    def test_cleanup_runs_periodically(self):
+        tasks = [entry['task'] for entry in settings.CELERY_BEAT_SCHEDULE.values()]
+        self.assertIn('resumes.tasks.delete_expired_pdf_export_jobs', tasks)
+
+
+def _js_string(value):
+    """String conversion following JavaScript rules for numbers"""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        if value.is_integer():
+            return str(int(value))
+    return str(value)
+
+
+def _js_to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return float('nan')
+
+
+class FrontendHelpers:
+    """
+    Literal port of the helpers registered in
+    frontend/lib/services/templateRenderer.ts, used as the parity reference.
+    """
+
+    @staticmethod
+    def percentage(this, level, max_val=5):
+        level, max_val = _js_to_number(level), _js_to_number(max_val)
+        if max_val == 0:
+            return 0
+        return _js_string(level / max_val * 100)
+
+    @staticmethod
+    def hasItems(this, array):
+        if array is None:
+            return None
+        return len(array) > 0
+
+    @staticmethod
+    def nl2br(this, text):
+        if not text:
+            return ''
+        return strlist([text.replace('\n', '<br>')])
+
+    @staticmethod
+    def preserveWhitespace(this, text):
+        if not text:
+            return ''
+        return strlist([f'<span style="white-space: pre-wrap;">{text}</span>'])
+
+    @staticmethod
+    def substr(this, string, start, length=None):
+        if not string:
+            return ''
+        start = int(start)
+        if start < 0:
+            start = max(len(string) + start, 0)
+        if length is not None:
+            return string[start:start + max(int(length), 0)]
+        return string[start:]
+
+    @staticmethod
+    def first(this, string, n):
+        if not string:
+            return ''
+        return string[0:max(int(n), 0)]
+
+    @staticmethod
+    def last(this, string, n):
+        if not string:
+            return ''
+        return string[max(len(string) - int(n), 0):]
+
+    @staticmethod
+    def year(this, date_str):
+        if not date_str:
+            return ''
+        match = re.search(r'(\d{4})', date_str)
+        return match.group(1) if match else date_str
+
+    @staticmethod
+    def translate_work_mode(this, value):
+        translations = {
+            'remote': 'Télétravail',
+            'onsite': 'Sur site',
+            'hybrid': 'Hybride',
+        }
+        return translations.get(value) or value
+
+    @classmethod
+    def as_dict(cls):
+        return {name: getattr(cls, name) for name in HELPERS}
+
+
+TEMPLATES_DIR = Path(__file__).resolve().parent / 'templates'
+
+PARITY_CONTEXT = {
+    'full_name': 'Jean Dupont',
+    'first_name': 'Jean',
+    'last_name': 'Dupont',
+    'email': 'jean.dupont@example.com',
+    'phone': '+33 6 12 34 56 78',
+    'address': '123 Rue de la Paix',
+    'city': 'Paris',
+    'postal_code': '75001',
+    'website': 'https://jeandupont.fr',
+    'linkedin_url': 'https://linkedin.com/in/jeandupont',
+    'github_url': 'https://github.com/jeandupont',
+    'photo': 'https://example.com/photo.jpg',
+    'title': 'Développeur Full Stack',
+    'date_of_birth': '1990-01-15',
+    'nationality': 'Française',
+    'driving_license': 'Permis B',
+    'summary': 'Développeur passionné.\nExpert Python & JavaScript <3',
+    'experience_data': [
+        {
+            'position': 'Lead Developer',
+            'company': 'TechCorp',
+            'location': 'Paris',
+            'start_date': '2020-01-15',
+            'end_date': '',
+            'is_current': True,
+            'description': 'Direction technique.\nMentorat de 5 développeurs.',
+            'work_mode': 'hybrid',
+        },
+        {
+            'position': 'Développeur',
+            'company': 'WebAgency',
+            'location': 'Lyon',
+            'start_date': '2016-09-01',
+            'end_date': '2019-12-31',
+            'is_current': False,
+            'description': 'Sites e-commerce',
+            'work_mode': 'onsite',
+        },
+    ],
+    'education_data': [
+        {
+            'degree': 'Master Informatique',
+            'institution': 'Université Paris-Saclay',
+            'location': 'Orsay',
+            'start_date': '2014-09-01',
+            'end_date': '2016-06-30',
+            'is_current': False,
+            'description': 'Mention bien',
+            'work_mode': 'remote',
+        },
+    ],
+    'skills_data': [
+        {'name': 'Python', 'level': 'expert', 'level_percentage': 100},
+        {'name': 'Docker', 'level': 'intermediate', 'level_percentage': 40},
+    ],
+    'languages_data': [
+        {'name': 'Français', 'level': 'Natif'},
+        {'name': 'Anglais', 'level': 'C1'},
+    ],
+    'certifications_data': [
+        {'name': 'AWS Solutions Architect', 'issuer': 'Amazon', 'date': '2021-03-01'},
+    ],
+    'projects_data': [
+        {'name': 'CV Builder', 'description': 'Générateur de CV', 'url': 'https://example.com'},
+    ],
+    'custom_sections': [
+        {'title': "Centres d'intérêt", 'content': 'Escalade, photographie'},
+    ],
+}
+
+
+class HandlebarsHelperParityTests(TestCase):
+    """
+    The server-side helper registry must render every template exactly like
+    the frontend TemplateRenderer helpers.
+    """
+
+    def render(self, source, helpers, context=PARITY_CONTEXT):
+        return str(Compiler().compile(source)(context, helpers=helpers))
+
+    def assertRendersIdentically(self, source, context=PARITY_CONTEXT):
+        # Compile once: pybars compilation dominates the cost of this suite
+        template = Compiler().compile(source)
+        self.assertEqual(
+            str(template(context, helpers=HELPERS)),
+            str(template(context, helpers=FrontendHelpers.as_dict()))
+        )
+
+    def test_registry_has_every_frontend_helper(self):
+        self.assertEqual(set(HELPERS), set(FrontendHelpers.as_dict()))
+
+    def test_all_templates_render_identically(self):
+        template_files = sorted(TEMPLATES_DIR.glob('*.html'))
+        self.assertTrue(template_files)
+
+        for template_file in template_files:
+            with self.subTest(template=template_file.name):
+                self.assertRendersIdentically(template_file.read_text(encoding='utf-8'))
+
+    def test_helper_edge_cases(self):
+        cases = [
+            ('{{percentage level 5}}', {'level': 3}),
+            ('{{percentage level 3}}', {'level': 1}),
+            ('{{percentage level}}', {'level': '4'}),
+            ('{{nl2br text}}', {'text': 'a\nb'}),
+            ('{{{nl2br text}}}', {'text': 'a\nb'}),
+            ('{{preserveWhitespace text}}', {'text': 'a  b'}),
+            ('{{substr text 4}}', {'text': 'John Doe'}),
+            ('{{substr text 0 4}}', {'text': 'John Doe'}),
+            ('{{first text 4}}', {'text': '2020-01-15'}),
+            ('{{last text 0}}', {'text': '2020'}),
+            ('{{last text 4}}', {'text': 'FY2020'}),
+            ('{{year text}}', {'text': 'Jan 2020'}),
+            ('{{year text}}', {'text': 'Présent'}),
+            ('{{translate_work_mode mode}}', {'mode': 'remote'}),
+            ('{{translate_work_mode mode}}', {'mode': 'other'}),
+            ('{{translate_work_mode mode}}', {}),
+            ('{{#if (hasItems items)}}yes{{else}}no{{/if}}', {'items': []}),
+            ('{{#if (hasItems items)}}yes{{else}}no{{/if}}', {'items': [1]}),
+        ]
+        for source, context in cases:
+            with self.subTest(source=source, context=context):
+                self.assertRendersIdentically(source, context)
+
+    def test_safe_string_helpers_are_not_escaped(self):
+        self.assertEqual(self.render('{{nl2br text}}', HELPERS, {'text': 'a\nb'}), 'a<br>b')
+        self.assertEqual(self.render('{{percentage level}}', HELPERS, {'level': 3}), '60')
+
+
+class ResumeRenderContextTests(ResumeTestMixin, TestCase):
+    """Preview and PDF export share one cached context per resume version"""
+
+    def setUp(self):
+        super().setUp()
+        resume_contexts.clear()
+        self.resume.full_name = 'Jean Pierre Dupont'
+        self.resume.experience_data = [{'position': 'Lead Developer', 'company': 'TechCorp'}]
+        self.resume.save()
+
+    def test_context_fields_and_aliases(self):
+        context = ResumeRenderContext.from_resume(self.resume)
+
+        self.assertEqual(context['first_name'], 'Jean')
+        self.assertEqual(context['last_name'], 'Pierre Dupont')
+        self.assertEqual(context['phone'], '')
+        self.assertIsNone(context['photo'])
+        self.assertIs(context['experience'], context['experience_data'])
+        self.assertIs(context['experiences'], context['experience_data'])
+        self.assertEqual(context['hobbies'], [])
+        self.assertIn('educations', context)
+        self.assertEqual(len(context), len(dict(context)))
+
+    def test_context_is_read_only(self):
+        context = ResumeRenderContext.from_resume(self.resume)
+        with self.assertRaises(TypeError):
+            context['full_name'] = 'Other'
+
+    def test_context_is_cached_per_resume_version(self):
+        context = resume_contexts.get(self.resume)
+        self.assertIs(resume_contexts.get(Resume.objects.get(pk=self.resume.pk)), context)
+
+        self.resume.title = 'CTO'
+        self.resume.save()
+        updated = resume_contexts.get(self.resume)
+        self.assertIsNot(updated, context)
+        self.assertEqual(updated['title'], 'CTO')
+
+    def test_photo_changes_are_rendered(self):
+        # Photo saves only write the photo columns (and bump the version)
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        self.template.template_html = '<img src="{{photo}}">'
+        self.template.save()
+        path = f'/api/resumes/{self.resume.id}/render_html'
+
+        def rendered():
+            request = AsyncRequestFactory().get(path)
+            force_authenticate(request, user=self.user)
+            async_response = async_to_sync(async_views.render_html)(request, pk=self.resume.id)
+            html = self.client.get(path).json()['html']
+            self.assertEqual(json.loads(async_response.content)['html'], html)
+            return html
+
+        self.assertEqual(rendered(), '<img src="">')
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (64, 64), 'white').save(buffer, 'PNG')
+        photo = SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+        response = self.client.post(f'{path[:-len("render_html")]}upload_photo', {'photo': photo}, format='multipart')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.resume.refresh_from_db()
+        self.assertEqual(rendered(), f'<img src="{self.resume.photo_preview.url}">')
+
+        self.client.delete(f'{path[:-len("render_html")]}delete_photo')
+        self.assertEqual(rendered(), '<img src="">')
+
+    def test_preview_and_pdf_render_the_same_html(self):
+        self.template.template_html = (
+            '<h1>{{first_name}} {{last_name}}</h1>'
+            '{{#each experiences}}<p>{{position}} - {{company}}</p>{{/each}}'
+        )
+        self.template.save()
+
+        response = self.client.get(f'/api/resumes/{self.resume.id}/render_html')
+
+        self.assertEqual(response.status_code, 200)
+        expected = '<h1>Jean Pierre Dupont</h1><p>Lead Developer - TechCorp</p>'
+        self.assertEqual(response.json()['html'], expected)
+        complete_html = PDFGenerationService.build_html(
+            self.template.template_html,
+            self.template.template_css,
+            PDFGenerationService.build_resume_context(self.resume),
+        )
+        self.assertIn(expected, complete_html)
+
+
+class AssetInlinerTests(ResumeTestMixin, TestCase):
+    """Photo and fonts are embedded in the document before rendering"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        photo_inliner.clear()
+        resume_contexts.clear()
+
+    def test_photo_is_inlined_resized_for_print(self):
+        upload = io.BytesIO()
+        Image.new('RGBA', (1800, 1200), (200, 30, 30, 255)).save(upload, format='PNG')
+        with self.settings(MEDIA_ROOT=self.media_root):
+            self.resume.photo = SimpleUploadedFile('photo.png', upload.getvalue(), content_type='image/png')
+            self.resume.save()
+
+            context = PDFGenerationService.build_pdf_context(self.resume)
+
+        prefix = 'data:image/jpeg;base64,'
+        self.assertTrue(context['photo'].startswith(prefix))
+        with Image.open(io.BytesIO(base64.b64decode(context['photo'][len(prefix):]))) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (600, 400)))
+        # The preview keeps the storage URL
+        self.assertEqual(PDFGenerationService.build_resume_context(self.resume)['photo'], self.resume.photo.url)
+
+    def test_unreadable_photo_is_dropped(self):
+        self.resume.photo.name = 'resumes/photos/missing.jpg'
+
+        with self.settings(MEDIA_ROOT=self.media_root):
+            self.assertIsNone(PDFGenerationService.build_pdf_context(self.resume)['photo'])
+
+    def test_remote_fonts_are_replaced_by_cached_copies(self):
+        font_cache = FontCache(self.media_root)
+        font_url = 'https://fonts.gstatic.com/s/inter/v13/inter.woff2'
+        font_cache.set(font_url, b'wOF2 font')
+        font_cache.set('https://fonts.googleapis.com/css2?family=Inter', b'body { font-family: Inter; }')
+        source = (
+            '<link rel="stylesheet" href="https://fonts.googleapis.com/css2?family=Inter">'
+            '<link href="https://fonts.googleapis.com/css2?family=Lato" rel="stylesheet">'
+            f'<style>@font-face {{ src: url("{font_url}") format("woff2"); }}</style>'
+        )
+
+        inlined = inline_fonts(source, font_cache)
+
+        self.assertNotIn('https://', inlined)
+        self.assertIn('<style>body { font-family: Inter; }</style>', inlined)
+        self.assertIn(f'url("data:font/woff2;base64,{base64.b64encode(b"wOF2 font").decode()}")', inlined)
+
+
+class FakeAsyncBrowserPool:
+    """Stands in for BrowserPool: renders take a few ms and are counted"""
+
+    def __init__(self, delay=0.02):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.wait_until = None
+
+    async def render_pdf(self, html, pdf_options, wait_until='load'):
+        self.wait_until = wait_until
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return FAKE_PDF
+
+    async def submit(self, coro_fn, *args, **kwargs):
+        return await coro_fn(*args, **kwargs)
+
+
+@override_settings(PDF_CACHE_ENABLED=False)
+class AsyncRenderViewsTests(ResumeTestMixin, TestCase):
+    """The ASGI versions of export_pdf and render_html"""
+
+    def setUp(self):
+        super().setUp()
+        self.factory = AsyncRequestFactory()
+        self.pool = FakeAsyncBrowserPool()
+        self.admission = RenderAdmission(max_concurrency=8, max_queue=8)
+        self.coalescer = RenderCoalescer(lock=LocalRenderLock())
+        for target, value in [
+            ('resumes.pdf_service.get_browser_pool', self.pool),
+            ('resumes.pdf_service.get_render_admission', self.admission),
+            ('resumes.pdf_service.get_render_coalescer', self.coalescer),
+        ]:
+            patcher = mock.patch(target, return_value=value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def request(self, method, path, user=None):
+        request = getattr(self.factory, method)(path)
+        force_authenticate(request, user=user or self.user)
+        return request
+
+    def export(self, user=None, resume=None):
+        resume = resume or self.resume
+        path = f'/api/resumes/{resume.id}/export_pdf'
+        return async_views.export_pdf(self.request('post', path, user), pk=resume.id)
+
+    async def test_export_pdf(self):
+        response = await self.export()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertEqual(response.content, FAKE_PDF)
+        self.assertEqual(response['X-Resume-ID'], str(self.resume.id))
+        self.assertEqual(self.pool.wait_until, 'load')
+
+    async def test_concurrent_exports_overlap(self):
+        resumes = [
+            await Resume.objects.acreate(user=self.user, template=self.template, full_name=f'Jean {i}')
+            for i in range(5)
+        ]
+
+        responses = await asyncio.gather(*(self.export(resume=resume) for resume in resumes))
+
+        self.assertEqual([response.status_code for response in responses], [200] * 5)
+        self.assertEqual(self.pool.max_in_flight, 5)
+        self.assertEqual(self.admission.stats()['admitted'], 5)
+
+    async def test_identical_concurrent_exports_share_one_render(self):
+        responses = await asyncio.gather(*(self.export() for _ in range(5)))
+
+        self.assertEqual([response.content for response in responses], [FAKE_PDF] * 5)
+        self.assertEqual(self.admission.stats()['admitted'], 1)
+        stats = self.coalescer.stats()
+        self.assertEqual((stats['renders'], stats['coalesced_local']), (1, 4))
+
+    async def test_premium_template_requires_payment(self):
+        self.template.is_premium = True
+        await self.template.asave()
+
+        response = await self.export()
+
+        self.assertEqual(response.status_code, 402)
+        self.assertEqual(self.pool.max_in_flight, 0)
+
+    async def test_other_users_resume_is_not_found(self):
+        other = await sync_to_async(User.objects.create_user)(email='other@example.com', password='secret123')
+
+        response = await self.export(user=other)
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_render_html_matches_sync_view(self):
+        path = f'/api/resumes/{self.resume.id}/render_html'
+        response = await async_views.render_html(self.request('get', path), pk=self.resume.id)
+
+        self.assertEqual(response.status_code, 200)
+        sync_response = await sync_to_async(self.client.get)(path)
+        self.assertEqual(json.loads(response.content), sync_response.json())
+
+    async def test_render_html_renders_off_the_event_loop(self):
+        loop_thread = threading.current_thread()
+        render_threads = []
+        render_template = async_views._render_template
+
+        def record_thread(template, resume):
+            render_threads.append(threading.current_thread())
+            return render_template(template, resume)
+
+        path = f'/api/resumes/{self.resume.id}/render_html'
+        with mock.patch('resumes.async_views._render_template', side_effect=record_thread):
+            response = await async_views.render_html(self.request('get', path), pk=self.resume.id)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(render_threads), 1)
+        self.assertIsNot(render_threads[0], loop_thread)
+
+
+class RenderAdmissionTests(TestCase):
+    """Bounded render queue: fast 429/503 instead of piling up"""
+
+    async def hold(self, release):
+        await release.wait()
+        return FAKE_PDF
+
+    async def test_queue_full_is_rejected(self):
+        admission = RenderAdmission(max_concurrency=1, max_queue=1, max_queue_wait=5)
+        release = asyncio.Event()
+        running = asyncio.ensure_future(admission.run(self.hold, release))
+        queued = asyncio.ensure_future(admission.run(self.hold, release))
+        try:
+            await asyncio.sleep(0.01)
+            self.assertEqual((admission.in_flight, admission.queue_depth), (1, 1))
+
+            with self.assertRaises(RenderQueueFull) as rejected:
+                await admission.run(self.hold, release)
+            self.assertEqual(rejected.exception.status_code, 429)
+            self.assertGreaterEqual(rejected.exception.retry_after, 1)
+        finally:
+            release.set()
+
+        self.assertEqual(await asyncio.gather(running, queued), [FAKE_PDF, FAKE_PDF])
+        stats = admission.stats()
+        self.assertEqual(stats['admitted'], 2)
+        self.assertEqual(stats['rejected_queue_full'], 1)
+        self.assertEqual(stats['max_queue_depth'], 2)
+        self.assertEqual((stats['in_flight'], stats['queue_depth']), (0, 0))
+        self.assertIsNotNone(stats['wait_seconds_p95'])
+
+    async def test_queue_wait_timeout_is_rejected(self):
+        admission = RenderAdmission(max_concurrency=1, max_queue=5, max_queue_wait=0.05)
+        release = asyncio.Event()
+        running = asyncio.ensure_future(admission.run(self.hold, release))
+        try:
+            await asyncio.sleep(0.01)
+            with self.assertRaises(RenderQueueTimeout) as rejected:
+                await admission.run(self.hold, release)
+            self.assertEqual(rejected.exception.status_code, 503)
+            self.assertEqual(admission.stats()['rejected_timeout'], 1)
+            self.assertEqual(admission.queue_depth, 0)
+        finally:
+            release.set()
+        await running
+
+
+class RenderAdmissionViewsTests(ResumeTestMixin, TestCase):
+    """Rejected exports answer with Retry-After"""
+
+    @mock.patch(
+        'resumes.views.PDFGenerationService.generate_resume_pdf_sync',
+        side_effect=RenderQueueFull('PDF render queue is full', 7)
+    )
+    def test_export_pdf_rejected(self, generate_resume_pdf_sync):
+        response = self.client.post(f'/api/resumes/{self.resume.id}/export_pdf')
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '7')
+        self.assertEqual(response.data['retry_after'], 7)
+
+    @mock.patch(
+        'resumes.async_views.PDFGenerationService.generate_resume_pdf',
+        side_effect=RenderQueueTimeout('No PDF render slot available', 4)
+    )
+    async def test_async_export_pdf_rejected(self, generate_resume_pdf):
+        request = AsyncRequestFactory().post(f'/api/resumes/{self.resume.id}/export_pdf')
+        force_authenticate(request, user=self.user)
+
+        response = await async_views.export_pdf(request, pk=self.resume.id)
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '4')
+
+    def test_render_stats_are_staff_only(self):
+        response = self.client.get('/api/render_stats')
+        self.assertEqual(response.status_code, 403)
+
+        self.user.is_staff = True
+        self.user.save()
+        response = self.client.get('/api/render_stats')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('queue_depth', response.data['admission'])
+        self.assertIn('browsers_in_use', response.data['browser_pool'])
+
+
+class RenderCoalescerTests(TestCase):
+    """Identical concurrent renders share one render, also across processes"""
+
+    def setUp(self):
+        self.renders = 0
+
+    async def render(self, delay=0.05):
+        self.renders += 1
+        await asyncio.sleep(delay)
+        return FAKE_PDF
+
+    async def test_processes_share_a_render_through_the_lock(self):
+        # Two coalescers on one lock backend stand for two worker processes
+        lock = LocalRenderLock()
+        first = RenderCoalescer(lock=lock, poll_interval=0.01)
+        second = RenderCoalescer(lock=lock, poll_interval=0.01)
+
+        results = await asyncio.gather(
+            first.run('key', self.render),
+            second.run('key', self.render),
+            second.run('key', self.render),
+        )
+
+        self.assertEqual(results, [FAKE_PDF] * 3)
+        self.assertEqual(self.renders, 1)
+        self.assertEqual(second.stats()['coalesced_remote'], 1)
+        self.assertEqual(second.stats()['coalesced_local'], 1)
+
+    async def test_different_keys_render_separately(self):
+        coalescer = RenderCoalescer(lock=LocalRenderLock())
+
+        await asyncio.gather(coalescer.run('a', self.render), coalescer.run('b', self.render))
+
+        self.assertEqual(self.renders, 2)
+
+    async def test_failed_render_is_shared_then_retried(self):
+        coalescer = RenderCoalescer(lock=LocalRenderLock())
+
+        async def crash():
+            await asyncio.sleep(0.01)
+            raise RuntimeError('Chromium crashed')
+
+        results = await asyncio.gather(
+            coalescer.run('key', crash), coalescer.run('key', crash), return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+
+        self.assertEqual(await coalescer.run('key', self.render), FAKE_PDF)
+
+    async def test_unreachable_lock_backend_renders_anyway(self):
+        lock = mock.Mock()
+        lock.fetch.side_effect = ConnectionError('Redis is down')
+        coalescer = RenderCoalescer(lock=lock)
+
+        self.assertEqual(await coalescer.run('key', self.render), FAKE_PDF)
+        self.assertEqual(coalescer.stats()['lock_errors'], 1)
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser = browser
+        browser.pages_open += 1
+        browser.max_pages_open = max(browser.max_pages_open, browser.pages_open)
+
+    async def set_content(self, html, wait_until):
+        self.html = html
+        await asyncio.sleep(0.01)
+
+    async def pdf(self, **options):
+        if self.browser.crash_on_render:
+            self.browser.connected = False
+            raise RuntimeError('Target page, context or browser has been closed')
+        return f'%PDF {self.html}'.encode()
+
+    async def close(self):
+        self.browser.pages_open -= 1
+
+
+class FakeBrowser:
+    """Playwright browser (and its context) rendering the HTML as the PDF content"""
+
+    def __init__(self):
+        self.connected = True
+        self.closed = False
+        self.crash_on_render = False
+        self.routes = []
+        self.pages_open = 0
+        self.max_pages_open = 0
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self):
+        return self
+
+    async def route(self, url, handler):
+        self.routes.append(url)
+
+    async def new_page(self):
+        return FakePage(self)
+
+    async def close(self):
+        self.connected = False
+        self.closed = True
+
+
+class FakePlaywright:
+    """Result of async_playwright(), launching FakeBrowsers"""
+
+    def __init__(self):
+        self.chromium = self
+        self.browsers = []
+
+    async def start(self):
+        return self
+
+    async def stop(self):
+        pass
+
+    async def launch(self, **kwargs):
+        browser = FakeBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+class BrowserPoolTests(TestCase):
+    """Chromium browser pool, on a fake Playwright"""
+
+    def setUp(self):
+        self.playwright = FakePlaywright()
+        patcher = mock.patch('resumes.browser_pool.async_playwright', return_value=self.playwright)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def make_pool(self, **kwargs):
+        kwargs.setdefault('idle_timeout', 0)
+        pool = BrowserPool(**kwargs)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def render(self, pool, html='<p>CV</p>'):
+        return pool.run(pool.render_pdf, html, {'format': 'A4'})
+
+    def test_browsers_are_reused(self):
+        pool = self.make_pool(size=1)
+
+        self.assertEqual(self.render(pool, '<p>1</p>'), b'%PDF <p>1</p>')
+        self.assertEqual(self.render(pool, '<p>2</p>'), b'%PDF <p>2</p>')
+
+        self.assertEqual(len(self.playwright.browsers), 1)
+        self.assertEqual(pool.stats()['launches'], 1)
+        self.assertEqual(pool.stats()['renders'], 2)
+
+    def test_concurrent_renders_are_spread_over_the_pool(self):
+        pool = self.make_pool(size=2, pages_per_browser=2)
+
+        async def render_many():
+            return await asyncio.gather(*(pool.render_pdf('<p>CV</p>', {}) for _ in range(8)))
+
+        self.assertEqual(len(pool.run(render_many)), 8)
+        self.assertEqual(len(self.playwright.browsers), 2)
+        self.assertEqual([browser.max_pages_open for browser in self.playwright.browsers], [2, 2])
+        self.assertEqual(pool.stats()['renders_in_flight'], 0)
+
+    def test_browser_is_recycled_after_max_renders(self):
+        pool = self.make_pool(size=1, max_renders=2)
+
+        for _ in range(3):
+            self.render(pool)
+
+        first, second = self.playwright.browsers
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+        self.assertEqual(pool.stats()['recycled_max_renders'], 1)
+
+    def test_crashed_browser_is_relaunched(self):
+        pool = self.make_pool(size=1)
+        self.render(pool)
+        self.playwright.browsers[0].connected = False
+
+        self.assertEqual(self.render(pool), b'%PDF <p>CV</p>')
+
+        self.assertEqual(len(self.playwright.browsers), 2)
+        self.assertEqual(pool.stats()['recycled_unhealthy'], 1)
+
+    def test_browser_crashing_during_a_render_is_replaced(self):
+        pool = self.make_pool(size=1)
+        self.render(pool)
+        self.playwright.browsers[0].crash_on_render = True
+
+        with self.assertRaises(RuntimeError):
+            self.render(pool)
+        self.assertEqual(self.render(pool), b'%PDF <p>CV</p>')
+
+        self.assertTrue(self.playwright.browsers[0].closed)
+        self.assertEqual(len(self.playwright.browsers), 2)
+        self.assertEqual(pool.stats()['recycled_unhealthy'], 1)
+
+    def test_idle_browsers_are_closed_unless_in_use(self):
+        pool = self.make_pool(size=2)
+        self.render(pool)
+        self.render(pool)
+
+        async def reap_while_rendering():
+            slot = await pool._acquire()
+            try:
+                await pool._close_idle_browsers()
+            finally:
+                await pool._release(slot)
+            return slot
+
+        busy = pool.run(reap_while_rendering)
+
+        self.assertIsNotNone(busy.browser)
+        self.assertEqual([slot.browser is None for slot in pool._slots if slot is not busy], [True])
+        self.assertEqual(pool.stats()['recycled_idle'], 1)
+
+    def test_network_is_blocked(self):
+        pool = self.make_pool(size=1, block_network=True)
+
+        self.render(pool)
+
+        self.assertEqual(self.playwright.browsers[0].routes, [NETWORK_URL_RE])
+
+
+class CompiledTemplateCacheTests(TestCase):
+    """Process-wide LRU of compiled Handlebars templates"""
+
+    def setUp(self):
+        self.template = Template.objects.create(name='Classic', template_html='<h1>{{full_name}}</h1>')
+
+    def test_template_is_compiled_once(self):
+        templates = CompiledTemplateCache()
+
+        compiled = templates.get(self.template)
+
+        self.assertIs(templates.get(self.template), compiled)
+        self.assertEqual(str(compiled({'full_name': 'Jean'})), '<h1>Jean</h1>')
+        self.assertEqual(templates.stats(), {'hits': 1, 'misses': 1, 'size': 1, 'max_size': 128})
+
+    def test_edited_template_is_recompiled(self):
+        templates = CompiledTemplateCache()
+        templates.get(self.template)
+
+        self.template.template_html = '<h2>{{full_name}}</h2>'
+        self.template.save()
+
+        self.assertEqual(str(templates.get(self.template)({'full_name': 'Jean'})), '<h2>Jean</h2>')
+        self.assertEqual(templates.stats()['misses'], 2)
+
+    def test_least_recently_used_templates_are_evicted(self):
+        templates = CompiledTemplateCache(max_size=2)
+        first = templates.get_or_compile('first', '1')
+        templates.get_or_compile('second', '2')
+        templates.get_or_compile('first', '1')
+
+        templates.get_or_compile('third', '3')
+
+        self.assertEqual(templates.stats()['size'], 2)
+        self.assertIs(templates.get_or_compile('first', '1'), first)
+        templates.get_or_compile('second', '2')
+        self.assertEqual(templates.stats()['misses'], 4)
+
+    def test_saved_or_deleted_template_is_dropped(self):
+        compiled_templates.clear()
+        self.addCleanup(compiled_templates.clear)
+        other = Template.objects.create(name='Modern', template_html='<p></p>')
+        compiled_templates.get(self.template)
+        compiled_templates.get(other)
+
+        self.template.save()
+        self.assertEqual(compiled_templates.stats()['size'], 1)
+
+        other.delete()
+        self.assertEqual(compiled_templates.stats()['size'], 0)
+
+
+class PDFCacheTests(ResumeTestMixin, TestCase):
+    """Content-addressed PDF cache"""
+
+    def setUp(self):
+        super().setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.storage = FileSystemStorage(location=self.directory)
+
+    def make_cache(self, **kwargs):
+        return StoragePDFCache(storage=self.storage, **kwargs)
+
+    def resume_key(self):
+        complete_html = PDFGenerationService.build_html(
+            self.template.template_html,
+            self.template.template_css,
+            PDFGenerationService.build_pdf_context(self.resume),
+            template_key=template_cache_key(self.template),
+        )
+        return pdf_cache_key(complete_html, PDF_OPTIONS)
+
+    def test_key_is_the_sha256_of_the_options_and_document(self):
+        options = {'format': 'A4', 'print_background': True}
+        expected = hashlib.sha256(
+            f'v{CACHE_FORMAT_VERSION}\n'.encode()
+            + json.dumps(options, sort_keys=True).encode()
+            + '\n<html>é</html>'.encode('utf-8')
+        ).hexdigest()
+
+        self.assertEqual(pdf_cache_key('<html>é</html>', options), expected)
+        self.assertEqual(pdf_cache_key('<html>é</html>', dict(reversed(options.items()))), expected)
+        self.assertNotEqual(pdf_cache_key('<html>e</html>', options), expected)
+        self.assertNotEqual(pdf_cache_key('<html>é</html>', {**options, 'format': 'Letter'}), expected)
+
+    def test_miss_then_hit(self):
+        store = self.make_cache()
+
+        self.assertIsNone(store.get(self.resume.id, 'a' * 64))
+        store.set(self.resume.id, 'a' * 64, FAKE_PDF)
+
+        self.assertEqual(store.get(self.resume.id, 'a' * 64), FAKE_PDF)
+        self.assertEqual(store.stats()['hits'], 1)
+        self.assertEqual(store.stats()['misses'], 1)
+
+    def test_resume_change_replaces_its_entry(self):
+        store = self.make_cache()
+        key = self.resume_key()
+        store.set(self.resume.id, key, FAKE_PDF)
+
+        self.resume.full_name = 'Marie Curie'
+        self.resume.save()
+        new_key = self.resume_key()
+
+        self.assertNotEqual(new_key, key)
+        self.assertIsNone(store.get(self.resume.id, new_key))
+        store.set(self.resume.id, new_key, b'%PDF-1.4 new')
+        self.assertIsNone(store.get(self.resume.id, key))
+        self.assertEqual(store.get(self.resume.id, new_key), b'%PDF-1.4 new')
+        self.assertEqual(self.storage.listdir(store._resume_dir(self.resume.id))[1], [f'{new_key}.pdf'])
+
+    def test_deleted_resume_is_purged(self):
+        pdf_cache._pdf_cache = None
+        self.addCleanup(setattr, pdf_cache, '_pdf_cache', None)
+        with override_settings(PDF_CACHE_BACKEND='resumes.pdf_cache.FileSystemPDFCache', PDF_CACHE_DIR=self.directory):
+            get_pdf_cache().set(self.resume.id, 'a' * 64, FAKE_PDF)
+            resume_id = str(self.resume.id)
+            self.resume.delete()
+
+        self.assertEqual(self.storage.listdir(resume_id), ([], []))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        store = self.make_cache(max_bytes=250)
+        first, second, third = (Resume.objects.create(template=self.template) for _ in range(3))
+        store.set(first.id, 'a' * 64, b'1' * 100)
+        store.set(second.id, 'a' * 64, b'2' * 100)
+        # A hit makes the first entry the most recently used
+        store.get(first.id, 'a' * 64)
+
+        store.set(third.id, 'a' * 64, b'3' * 100)
+
+        self.assertIsNone(store.get(second.id, 'a' * 64))
+        self.assertFalse(self.storage.exists(f'{second.id}/{"a" * 64}.pdf'))
+        self.assertIsNotNone(store.get(first.id, 'a' * 64))
+        self.assertIsNotNone(store.get(third.id, 'a' * 64))
+        self.assertEqual(store.stats()['entries'], 2)
+        self.assertEqual(store.stats()['bytes'], 200)
+
+    def test_eviction_does_not_scan_the_storage(self):
+        store = self.make_cache(max_bytes=250)
+        resumes = [Resume.objects.create(template=self.template) for _ in range(4)]
+
+        with mock.patch.object(self.storage, 'listdir', wraps=self.storage.listdir) as listdir, \
+                mock.patch.object(self.storage, 'size', side_effect=AssertionError('size() called')), \
+                mock.patch.object(self.storage, 'get_modified_time', side_effect=AssertionError('mtime called')):
+            for resume in resumes:
+                store.set(resume.id, 'a' * 64, b'x' * 100)
+
+        # Only the directory of the resume being written is listed
+        self.assertEqual(
+            [call.args[0] for call in listdir.call_args_list],
+            [store._resume_dir(resume.id) for resume in resumes]
+        )
+        self.assertEqual(store.stats()['entries'], 2)
+
+
+class TemplateCatalogMixin:
+    """Common fixtures: 12 templates, half premium, in 1 to 3 of 3 categories"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.client = APIClient()
+        categories = [
+            TemplateCategory.objects.create(slug=slug, name=slug.title(), order=order)
+            for order, slug in enumerate(['tech', 'business', 'creative'])
+        ]
+        self.templates = []
+        for i in range(12):
+            template = Template.objects.create(
+                name=f'Template {i:02d}',
+                template_html='<h1>{{full_name}}</h1>',
+                template_css='',
+                is_premium=i % 2 == 1,
+            )
+            template.categories.set(categories[:1 + i % 3])
+            self.templates.append(template)
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TemplateViewSetQueryCountTests(TemplateCatalogMixin, TestCase):
+    """Template endpoints run a fixed number of queries, whatever the page size"""
+
+    def test_list(self):
+        # count, page, categories
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/templates')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), 9)
+        first = response.json()['results'][0]
+        self.assertEqual(first['category_slugs'], ['tech'])
+        self.assertEqual(first['category_names'], ['Tech'])
+
+    def test_list_filtered_by_category(self):
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/templates', {'category': 'creative'})
+
+        self.assertEqual(response.json()['count'], 4)
+        for template in response.json()['results']:
+            self.assertEqual(template['category_slugs'], ['tech', 'business', 'creative'])
+
+    def test_retrieve(self):
+        template = self.templates[2]
+
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/templates/{template.id}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['category_slugs'], ['tech', 'business', 'creative'])
+        self.assertEqual(response.json()['template_html'], template.template_html)
+
+    def test_free(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/templates/free')
+
+        self.assertEqual(response.json()['count'], 6)
+
+    def test_premium(self):
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/templates/premium')
+
+        self.assertEqual(response.json()['count'], 6)
+        self.assertTrue(all(template['is_premium'] for template in response.json()['results']))
+
+    def test_categories(self):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/templates/categories')
+
+        counts = {category['slug']: category['count'] for category in response.json()['categories']}
+        self.assertEqual(counts, {'tech': 12, 'business': 8, 'creative': 4})
+
+    def test_catalog(self):
+        # categories with counts, templates, template categories
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/templates/catalog')
+
+        payload = response.json()
+        self.assertEqual((payload['count'], payload['free_count'], payload['premium_count']), (12, 6, 6))
+        self.assertEqual([category['count'] for category in payload['categories']], [12, 8, 4])
+        self.assertEqual(
+            set(payload['results'][0]),
+            {'id', 'name', 'description', 'thumbnail', 'category_slugs', 'is_premium'}
+        )
+
+    def test_list_payloads_do_not_load_template_sources(self):
+        with CaptureQueriesContext(connection) as queries:
+            for path in ('/api/templates', '/api/templates/free', '/api/templates/catalog'):
+                self.client.get(path)
+
+        for query in queries.captured_queries:
+            self.assertNotIn('template_html', query['sql'])
+            self.assertNotIn('template_css', query['sql'])
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class CatalogCacheTests(TemplateCatalogMixin, TestCase):
+    """Catalog responses are cached per catalog version and carry ETags"""
+
+    def test_cached_response_is_served_without_queries(self):
+        first = self.client.get('/api/templates', {'page': 2})
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/templates', {'page': 2})
+
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(self.client.get('/api/templates').json()['count'], 12)
+
+    @override_settings(ALLOWED_HOSTS=['api.example.com', 'preview.example.com'])
+    def test_cached_pages_keep_the_host_of_their_request(self):
+        api = self.client.get('/api/templates', HTTP_HOST='api.example.com')
+        preview = self.client.get('/api/templates', HTTP_HOST='preview.example.com')
+        secure = self.client.get('/api/templates', HTTP_HOST='api.example.com', secure=True)
+
+        self.assertEqual(api.json()['next'], 'http://api.example.com/api/templates?page=2')
+        self.assertEqual(preview.json()['next'], 'http://preview.example.com/api/templates?page=2')
+        self.assertEqual(secure.json()['next'], 'https://api.example.com/api/templates?page=2')
+
+    def test_if_none_match_returns_not_modified(self):
+        etag = self.client.get('/api/templates/free')['ETag']
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/templates/free', HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_template_change_invalidates_catalog(self):
+        before = self.client.get('/api/templates/premium')
+        template = self.templates[1]
+        template.name = 'Renamed'
+        template.save()
+
+        after = self.client.get('/api/templates/premium', HTTP_IF_NONE_MATCH=before['ETag'])
+
+        self.assertEqual(after.status_code, 200)
+        self.assertNotEqual(after['ETag'], before['ETag'])
+        self.assertIn('Renamed', [template['name'] for template in after.json()['results']])
+
+    def test_category_assignment_invalidates_catalog(self):
+        self.client.get('/api/templates/categories')
+        category = TemplateCategory.objects.create(slug='startup', name='Startup', order=9)
+        self.templates[0].categories.add(category)
+
+        response = self.client.get('/api/templates/categories')
+
+        slugs = [category['slug'] for category in response.json()['categories']]
+        self.assertEqual(slugs, ['tech', 'business', 'creative', 'startup'])
+
+    def test_cache_failure_falls_back_to_database(self):
+        with mock.patch('resumes.catalog_cache._cache', side_effect=ConnectionError('Redis is down')):
+            response = self.client.get('/api/templates/free')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 6)
+
+
+class ResumeDeltaTests(ResumeTestMixin, TestCase):
+    """PATCH /resumes/{id}/delta applies JSON-Patch operations"""
+
+    def setUp(self):
+        super().setUp()
+        self.resume.summary = 'Développeur passionné'
+        self.resume.experience_data = [
+            {'position': 'Developer', 'company': 'StartupCo', 'description': 'Backend'},
+            {'position': 'Lead Developer', 'company': 'TechCorp', 'description': 'Direction technique'},
+        ]
+        self.resume.skills_data = [{'name': 'Python'}]
+        self.resume.save()
+        self.path = f'/api/resumes/{self.resume.id}/delta'
+
+    def patch(self, operations, **kwargs):
+        return self.client.patch(self.path, operations, format='json', **kwargs)
+
+    def test_item_operations_write_only_changed_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch([
+                {'op': 'replace', 'path': '/experience_data/1/description', 'value': 'CTO'},
+                {'op': 'add', 'path': '/skills_data/-', 'value': {'name': 'Django'}},
+                {'op': 'move', 'from': '/experience_data/0', 'path': '/experience_data/-'},
+            ])
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()['updated_fields'], ['experience_data', 'skills_data'])
+        self.resume.refresh_from_db()
+        self.assertEqual(
+            [(item['company'], item['description']) for item in self.resume.experience_data],
+            [('TechCorp', 'CTO'), ('StartupCo', 'Backend')]
+        )
+        self.assertEqual(self.resume.skills_data, [{'name': 'Python'}, {'name': 'Django'}])
+
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"experience_data"', updates[0])
+        self.assertNotIn('"summary"', updates[0])
+        self.assertNotIn('"education_data"', updates[0])
+
+    def test_json_patch_content_type(self):
+        response = self.client.patch(
+            self.path,
+            json.dumps([{'op': 'replace', 'path': '/summary', 'value': 'Expert Python'}]),
+            content_type='application/json-patch+json',
+        )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.summary, 'Expert Python')
+
+    def test_failing_operation_rejects_the_patch(self):
+        response = self.patch({'operations': [
+            {'op': 'replace', 'path': '/summary', 'value': 'Changed'},
+            {'op': 'remove', 'path': '/experience_data/5'},
+        ]})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['operation'], 1)
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.summary, 'Développeur passionné')
+
+    def test_non_ascii_digit_index_is_rejected(self):
+        response = self.patch([{'op': 'remove', 'path': '/skills_data/²'}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['operation'], 0)
+
+    def test_values_are_validated(self):
+        response = self.patch([{'op': 'replace', 'path': '/website', 'value': 'not a url'}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('website', response.json())
+
+    def test_scalar_fields_are_replaced_as_a_whole(self):
+        response = self.patch([{'op': 'add', 'path': '/summary/0', 'value': 'x'}])
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_unchanged_values_are_not_written(self):
+        version = Resume.objects.get(pk=self.resume.pk).version
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch([
+                {'op': 'test', 'path': '/experience_data/0/company', 'value': 'StartupCo'},
+                {'op': 'replace', 'path': '/summary', 'value': 'Développeur passionné'},
+            ])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['updated_fields'], [])
+        updates = [query['sql'] for query in queries.captured_queries if query['sql'].startswith('UPDATE')]
+        # Only the access time is refreshed
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"last_accessed" =', updates[0])
+        self.assertNotIn('"summary" =', updates[0])
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.version, version)
+
+    def test_other_users_resume_is_not_found(self):
+        other = User.objects.create_user(email='marie@example.com', password='secret123')
+        self.client.force_authenticate(other)
+
+        response = self.patch([{'op': 'replace', 'path': '/summary', 'value': 'Hacked'}])
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ResumeWriteStatementTests(ResumeTestMixin, TestCase):
+    """Database statements issued by the ResumeViewSet write actions"""
+
+    def setUp(self):
+        super().setUp()
+        self.path = f'/api/resumes/{self.resume.id}'
+
+    def request(self, method, path, data=None, **kwargs):
+        """Run the request, return (response, [INSERT/UPDATE/DELETE statements])"""
+        kwargs.setdefault('format', 'json')
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(path, data, **kwargs)
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].split(' ', 1)[0] in ('INSERT', 'UPDATE', 'DELETE')
+        ]
+        return response, writes
+
+    def assertColumns(self, sql, written, not_written=()):
+        for column in written:
+            self.assertIn(f'"{column}" =', sql)
+        for column in not_written:
+            self.assertNotIn(f'"{column}" =', sql)
+
+    def test_create(self):
+        response, writes = self.request('post', '/api/resumes', {'full_name': 'Marie Curie'})
+
+        self.assertEqual(response.status_code, 201, response.content)
+        resume_writes = [sql for sql in writes if 'django_session' not in sql]
+        self.assertEqual(len(resume_writes), 1)
+        self.assertTrue(resume_writes[0].startswith('INSERT INTO "resumes"'))
+
+    def test_partial_update_is_a_single_update(self):
+        # SAVEPOINT, SELECT ... FOR UPDATE, UPDATE, RELEASE SAVEPOINT
+        with self.assertNumQueries(4):
+            response, writes = self.request('patch', self.path, {'summary': 'Expert Python'})
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(writes), 1)
+        self.assertColumns(
+            writes[0],
+            ['summary', 'updated_at', 'last_accessed'],
+            ['full_name', 'experience_data', 'template_id', 'created_at']
+        )
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.summary, 'Expert Python')
+
+    def test_unchanged_autosave_only_refreshes_last_accessed(self):
+        last_accessed = self.resume.last_accessed
+
+        response, writes = self.request('patch', self.path, {'full_name': 'Jean Dupont'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(writes), 1)
+        self.assertColumns(writes[0], ['last_accessed'], ['full_name', 'updated_at', 'version'])
+        self.resume.refresh_from_db()
+        self.assertGreater(self.resume.last_accessed, last_accessed)
+        self.assertEqual(self.resume.version, 1)
+
+    def test_update_writes_only_changed_columns(self):
+        response, writes = self.request('put', self.path, {
+            'template': str(self.template.id),
+            'full_name': 'Jean Dupont',
+            'title': 'Développeur Full Stack',
+        })
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(writes), 1)
+        self.assertColumns(writes[0], ['title', 'updated_at'], ['full_name', 'template_id'])
+
+    def test_delta(self):
+        response, writes = self.request(
+            'patch', f'{self.path}/delta', [{'op': 'replace', 'path': '/title', 'value': 'CTO'}]
+        )
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(writes), 1)
+        self.assertColumns(writes[0], ['title', 'last_accessed'], ['full_name'])
+
+    def test_upload_and_delete_photo(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        buffer = io.BytesIO()
+        Image.new('RGB', (16, 16), 'white').save(buffer, 'PNG')
+        photo = SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+        photo_columns = ['photo', 'photo_preview', 'photo_placeholder', 'updated_at']
+
+        with override_settings(MEDIA_ROOT=media_root):
+            response, writes = self.request(
+                'post', f'{self.path}/upload_photo', {'photo': photo}, format='multipart'
+            )
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(len(writes), 1)
+            self.assertColumns(writes[0], photo_columns, ['full_name'])
+
+            response, writes = self.request('delete', f'{self.path}/delete_photo')
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(len(writes), 1)
+            self.assertColumns(writes[0], photo_columns, ['full_name', 'user_id'])
+
+    def test_destroy(self):
+        response, writes = self.request('delete', self.path)
+
+        self.assertEqual(response.status_code, 204)
+        # Cascades: export jobs, payments. Experiences, education and skills
+        # have signal receivers, they are selected and deleted only if any
+        self.assertEqual(len(writes), 3)
+        self.assertTrue(writes[-1].startswith('DELETE FROM "resumes"'))
+
+
+class ResumeVersionTests(ResumeTestMixin, TestCase):
+    """Optimistic concurrency: version ETags, If-Match and If-None-Match"""
+
+    def setUp(self):
+        super().setUp()
+        self.path = f'/api/resumes/{self.resume.id}'
+
+    def test_every_save_bumps_the_version(self):
+        self.assertEqual(self.resume.version, 1)
+
+        self.resume.save(update_fields=['summary'])
+        self.resume.save()
+
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.version, 3)
+
+    def test_retrieve_returns_304_while_unchanged(self):
+        response = self.client.get(self.path)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"1-'))
+        self.assertEqual(response.json()['version'], 1)
+
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        self.client.patch(self.path, {'title': 'CTO'}, format='json')
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['ETag'].startswith('"2-'))
+
+    def test_premium_upgrade_changes_the_retrieve_etag(self):
+        self.template.is_premium = True
+        self.template.save()
+        response = self.client.get(self.path)
+        self.assertFalse(response.json()['can_export_without_watermark'])
+
+        # The payment webhook upgrades the user, the resume is not saved
+        User.objects.filter(pk=self.user.pk).update(is_premium=True)
+
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['can_export_without_watermark'])
+
+    def test_template_rename_changes_the_retrieve_etag(self):
+        etag = self.client.get(self.path)['ETag']
+        self.template.name = 'Classic 2'
+        self.template.save()
+
+        response = self.client.get(self.path, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['template_name'], 'Classic 2')
+
+    def test_if_match_accepts_the_retrieve_etag(self):
+        etag = self.client.get(self.path)['ETag']
+
+        response = self.client.patch(self.path, {'title': 'CTO'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 200, response.content)
+
+        response = self.client.patch(self.path, {'title': 'Lead'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 409)
+
+    def test_stale_if_match_is_rejected(self):
+        # Two tabs loaded version 1, the first one saves
+        response = self.client.patch(self.path, {'title': 'CTO'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response['ETag'], '"2"')
+        self.assertEqual(response.json()['version'], 2)
+
+        response = self.client.patch(self.path, {'title': 'Lead'}, format='json', HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['version'], 2)
+        self.assertEqual(response['ETag'], '"2"')
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.title, 'CTO')
+
+    def test_delta_checks_if_match(self):
+        operations = [{'op': 'replace', 'path': '/title', 'value': 'CTO'}]
+
+        response = self.client.patch(f'{self.path}/delta', operations, format='json', HTTP_IF_MATCH='"7"')
+        self.assertEqual(response.status_code, 409)
+
+        response = self.client.patch(f'{self.path}/delta', operations, format='json', HTTP_IF_MATCH='W/"1"')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response['ETag'], '"2"')
+
+    def test_version_cannot_be_written(self):
+        response = self.client.patch(
+            f'{self.path}/delta', [{'op': 'replace', 'path': '/version', 'value': 1}], format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+        self.client.patch(self.path, {'title': 'CTO', 'version': 1}, format='json')
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.version, 2)
+
+    def test_without_if_match_last_write_wins(self):
+        self.client.patch(self.path, {'title': 'CTO'}, format='json')
+        response = self.client.patch(self.path, {'title': 'Lead'}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.resume.refresh_from_db()
+        self.assertEqual((self.resume.title, self.resume.version), ('Lead', 3))
+
+    def test_nested_items_bump_the_version(self):
+        experience = self.resume.experiences.create(company='TechCorp', position='CTO', start_date='2020-01-01')
+        experience.delete()
+        self.resume.experiences.create(company='StartupCo', position='Developer', start_date='2018-01-01')
+
+        self.resume.refresh_from_db()
+        self.assertEqual(self.resume.version, 4)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.resume.delete()
+        self.assertFalse(any(query['sql'].startswith('UPDATE "resumes"') for query in queries.captured_queries))
+
+
+class ResumeViewSetQueryCountTests(ResumeTestMixin, TestCase):
+    """Resume reads use a constant number of queries"""
+
+    def setUp(self):
+        super().setUp()
+        for index in range(5):
+            resume = Resume.objects.create(
+                user=self.user,
+                template=self.template,
+                full_name=f'Resume {index}',
+                experience_data=[{'position': 'Developer', 'description': 'x' * 1000}],
+            )
+            resume.experiences.create(company='TechCorp', position='Developer', start_date='2020-01-01')
+            resume.education.create(institution='Université', degree='Master', start_date='2015-09-01')
+            resume.skills.create(name='Python')
+
+    def test_list(self):
+        # COUNT + resumes joined with their template
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/resumes')
+        self.assertEqual(len(queries), 2)
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 6)
+        self.assertEqual(results[0]['template_name'], 'Classic')
+        self.assertNotIn('experience_data', results[0])
+        self.assertNotIn('experiences', results[0])
+        self.assertNotIn('"experience_data"', queries[1]['sql'])
+
+    def test_retrieve(self):
+        resume = Resume.objects.filter(user=self.user).exclude(pk=self.resume.pk).first()
+
+        # Resume joined with template and user + experiences, education, skills
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/api/resumes/{resume.id}')
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(
+            (len(data['experiences']), len(data['education']), len(data['skills'])), (1, 1, 1)
+        )
+        self.assertEqual(data['template_name'], 'Classic')
+        self.assertTrue(data['can_export_without_watermark'])
+
+    def test_get_or_create_draft(self):
+        # EXISTS + same queries as retrieve
+        with self.assertNumQueries(5):
+            response = self.client.get('/api/resumes/get_or_create_draft')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.json()['is_new'])
+
+
+class EntitlementTests(ResumeTestMixin, TestCase):
+    """Export permission is resolved in one place, with the premium status cached"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.template.is_premium = True
+        self.template.save()
+
+    def fresh_resume(self):
+        """The resume without its relations loaded, as in the export views"""
+        return Resume.objects.get(pk=self.resume.pk)
+
+    def test_premium_template_needs_premium_or_payment(self):
+        self.assertFalse(resolve_entitlements(self.fresh_resume()).can_export)
+
+        Resume.objects.filter(pk=self.resume.pk).update(is_paid=True)
+        self.assertTrue(resolve_entitlements(self.fresh_resume()).can_export)
+
+        free = Template.objects.create(name='Free', template_html='<p></p>')
+        self.assertTrue(resolve_entitlements(self.resume, template=free).can_export)
+
+    def test_lifetime_and_running_subscriptions_are_premium(self):
+        User.objects.filter(pk=self.user.pk).update(is_premium=True)
+        self.assertTrue(resolve_entitlements(self.fresh_resume()).can_export)
+
+        invalidate_user_entitlements(self.user.pk)
+        User.objects.filter(pk=self.user.pk).update(subscription_end_date=timezone.now() - timedelta(days=1))
+        self.assertFalse(resolve_entitlements(self.fresh_resume()).can_export)
+
+    def test_missing_flags_are_read_in_one_query(self):
+        resume = self.fresh_resume()
+        with self.assertNumQueries(1):
+            resolve_entitlements(resume)
+
+        # The premium status is cached, the template is passed
+        resume = self.fresh_resume()
+        with self.assertNumQueries(0):
+            self.assertFalse(resolve_entitlements(resume, template=self.template).can_export)
+
+    def test_result_is_memoized_on_the_request(self):
+        request = mock.Mock(spec=[])
+        resume = self.fresh_resume()
+
+        with self.assertNumQueries(1):
+            first = resolve_entitlements(resume, request=request)
+            cache.clear()
+            self.assertIs(resolve_entitlements(resume, request=request), first)
+
+    @mock.patch('resumes.views.PDFGenerationService.generate_resume_pdf_sync', return_value=FAKE_PDF)
+    def test_export_and_serializer_agree(self, generate_resume_pdf_sync):
+        export_url = f'/api/resumes/{self.resume.id}/export_pdf'
+        self.assertFalse(self.client.get(f'/api/resumes/{self.resume.id}').json()['can_export_without_watermark'])
+        self.assertEqual(self.client.post(export_url).status_code, 402)
+
+        User.objects.filter(pk=self.user.pk).update(is_premium=True)
+        invalidate_user_entitlements(self.user.pk)
+
+        self.assertTrue(self.client.get(f'/api/resumes/{self.resume.id}').json()['can_export_without_watermark'])
+        self.assertEqual(self.client.post(export_url).status_code, 200)
+
+
+class PhotoPipelineTests(ResumeTestMixin, TestCase):
+    """Uploaded photos are stored as renditions without metadata, named after their content"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        media_override = override_settings(MEDIA_ROOT=media_root)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        photo_inliner.clear()
+        resume_contexts.clear()
+
+    def photo(self, color=(200, 30, 30), size=(3000, 2000), orientation=None):
+        """A camera JPEG with EXIF metadata"""
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        if orientation:
+            exif[0x0112] = orientation
+        buffer = io.BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def upload(self, photo, resume=None):
+        return self.client.post(
+            f'/api/resumes/{(resume or self.resume).id}/upload_photo', {'photo': photo}, format='multipart'
+        )
+
+    def test_upload_stores_upright_renditions_without_metadata(self):
+        # Orientation 6: shot with the camera turned, displayed in portrait
+        response = self.upload(self.photo(orientation=6))
+
+        self.assertEqual(response.status_code, 200, response.content)
+        self.resume.refresh_from_db()
+        with self.resume.photo.open('rb') as photo_file:
+            content = photo_file.read()
+        self.assertEqual(self.resume.photo.name, photo_name(content, 'jpg'))
+        with Image.open(io.BytesIO(content)) as image:
+            self.assertEqual((image.format, image.size), ('JPEG', (400, 600)))
+            self.assertFalse(image.getexif())
+        with Image.open(self.resume.photo_preview.path) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (213, 320)))
+            self.assertFalse(image.getexif())
+        self.assertTrue(self.resume.photo_placeholder.startswith('data:image/webp;base64,'))
+
+        photo_urls = response.json()['resume']['photo_urls']
+        self.assertEqual(photo_urls['print'], self.resume.photo.url)
+        self.assertEqual(photo_urls['preview'], self.resume.photo_preview.url)
+        self.assertEqual(photo_urls['placeholder'], self.resume.photo_placeholder)
+
+    def test_previews_use_the_preview_and_pdfs_embed_the_print_rendition(self):
+        self.upload(self.photo())
+        self.resume.refresh_from_db()
+
+        context = PDFGenerationService.build_pdf_context(self.resume)
+
+        with self.resume.photo.open('rb') as photo_file:
+            expected = base64.b64encode(photo_file.read()).decode()
+        self.assertEqual(context['photo'], f'data:image/jpeg;base64,{expected}')
+        self.assertEqual(
+            PDFGenerationService.build_resume_context(self.resume)['photo'], self.resume.photo_preview.url
+        )
+
+    def test_files_are_shared_and_deleted_once_unused(self):
+        other = Resume.objects.create(user=self.user, template=self.template)
+        self.upload(self.photo())
+        self.upload(self.photo(), resume=other)
+        self.resume.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(
+            (self.resume.photo.name, self.resume.photo_preview.name),
+            (other.photo.name, other.photo_preview.name)
+        )
+        shared = [self.resume.photo.path, self.resume.photo_preview.path]
+
+        # Still used by the other resume
+        self.upload(self.photo(color=(30, 30, 200)))
+        self.assertTrue(all(Path(path).exists() for path in shared))
+
+        self.client.delete(f'/api/resumes/{other.id}/delete_photo')
+        self.assertFalse(any(Path(path).exists() for path in shared))
+        self.resume.refresh_from_db()
+        self.assertTrue(Path(self.resume.photo.path).exists())
+
+    def test_invalid_images_are_rejected(self):
+        fake = SimpleUploadedFile('photo.png', b'not an image', content_type='image/png')
+        self.assertEqual(self.upload(fake).status_code, 400)
+
+        with self.settings(PHOTO_MAX_PIXELS=1000):
+            self.assertEqual(self.upload(self.photo()).status_code, 400)
+
+        self.resume.refresh_from_db()
+        self.assertFalse(self.resume.photo)
@@ -1,12 +1,15 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
+from . import async_views
 from .views import (
     TemplateViewSet,
     ResumeViewSet,
     ExperienceViewSet,
     EducationViewSet,
-    SkillViewSet
+    SkillViewSet,
+    RenderStatsView
 )
 
 app_name = 'resumes'
@@ -23,6 +26,15 @@ resumes_router.register(r'education', EducationViewSet, basename='resume-educati
 resumes_router.register(r'skills', SkillViewSet, basename='resume-skills')
 
 urlpatterns = [
+    path('render_stats', RenderStatsView.as_view(), name='render-stats'),
     path('', include(router.urls)),
     path('', include(resumes_router.urls)),
 ]
+
+if settings.ASYNC_RENDER_VIEWS:
+    # Native async render views (ASGI), listed first to take over the
+    # matching ResumeViewSet actions
+    urlpatterns = [
+        path('resumes/<uuid:pk>/export_pdf', async_views.export_pdf),
+        path('resumes/<uuid:pk>/render_html', async_views.render_html),
+    ] + urlpatterns
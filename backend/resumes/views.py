@@ -2,23 +2,60 @@ from rest_framework import viewsets, status, permissions, filters
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.views import APIView
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
 from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
 from django.template import Context, Template as DjangoTemplate
-from django.db import models
-from pybars import Compiler
-from .models import Template, Resume, Experience, Education, Skill, TemplateCategory
+from django.db import models, transaction
+from django.db.models import Count, Prefetch
+from .handlebars_helpers import HELPERS
+from .browser_pool import get_browser_pool
+from .catalog_cache import cached_catalog_response
+from .entitlements import resolve_entitlements
+from .pdf_cache import get_pdf_cache
+from .photo_pipeline import (
+    PHOTO_FIELDS,
+    PhotoError,
+    clear_resume_photo,
+    delete_unreferenced_photo_files,
+    photo_files,
+    process_photo,
+    set_resume_photo,
+)
+from .render_admission import RenderRejected, get_render_admission
+from .render_coalescing import get_render_coalescer
+from .render_context import resume_contexts
+from .resume_patch import PatchError, ResumePatch
+from .resume_version import is_version_conflict, representation_etag, resume_etag
+from .template_cache import compiled_templates
+from .models import Template, Resume, Experience, Education, Skill, TemplateCategory, PDFExportJob
+from .pdf_service import PDFGenerationService
 from .serializers import (
+    PDFExportJobSerializer,
+    TemplateCatalogSerializer,
+    TemplateCategoryCountSerializer,
     TemplateSerializer,
     TemplateDetailSerializer,
     ResumeSerializer,
+    ResumeListSerializer,
     ResumeCreateSerializer,
     ResumeUpdateSerializer,
     ExperienceSerializer,
     EducationSerializer,
     SkillSerializer
 )
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+
+class JSONPatchParser(JSONParser):
+    """Parses application/json-patch+json bodies (RFC 6902)"""
+
+    media_type = 'application/json-patch+json'
 
 
 class IsOwnerOrSessionUser(permissions.BasePermission):
@@ -37,6 +74,18 @@ class IsOwnerOrSessionUser(permissions.BasePermission):
         return False
 
 
+# Template sources are only returned by retrieve: list payloads skip them
+CATALOG_DEFERRED_FIELDS = ('template_html', 'template_css')
+CATEGORY_FIELDS = ('id', 'slug', 'name', 'description', 'order')
+
+# Resume sections are not part of the list payload (ResumeListSerializer)
+RESUME_LIST_DEFERRED_FIELDS = (
+    'summary', 'experience_data', 'education_data', 'skills_data',
+    'languages_data', 'certifications_data', 'projects_data', 'custom_sections',
+    'photo_placeholder',
+)
+
+
 class TemplateViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for viewing templates.
@@ -46,8 +95,14 @@ class TemplateViewSet(viewsets.ReadOnlyModelViewSet):
     free: List only free templates (without pagination)
     premium: List only premium templates (without pagination)
     categories: Get all available categories
+    catalog: Categories with counts and compact templates in one payload
+
+    Catalog actions are served from a versioned response cache with ETags
+    (see catalog_cache.py).
     """
-    queryset = Template.objects.filter(is_active=True).prefetch_related('categories')
+    queryset = Template.objects.filter(is_active=True).prefetch_related(
+        Prefetch('categories', queryset=TemplateCategory.objects.only(*CATEGORY_FIELDS))
+    )
     permission_classes = [permissions.AllowAny]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_fields = ['is_premium']
@@ -62,6 +117,9 @@ class TemplateViewSet(viewsets.ReadOnlyModelViewSet):
         """
         queryset = super().get_queryset()
 
+        if self.action != 'retrieve':
+            queryset = queryset.defer(*CATALOG_DEFERRED_FIELDS)
+
         # Filter by category if provided
         category_slug = self.request.query_params.get('category', None)
         if category_slug and category_slug != 'all':
@@ -72,9 +130,26 @@ class TemplateViewSet(viewsets.ReadOnlyModelViewSet):
     def get_serializer_class(self):
         if self.action == 'retrieve':
             return TemplateDetailSerializer
+        if self.action == 'catalog':
+            return TemplateCatalogSerializer
         return TemplateSerializer
 
+    @staticmethod
+    def get_categories_queryset():
+        """Categories having active templates, annotated with their count"""
+        return TemplateCategory.objects.only(*CATEGORY_FIELDS).annotate(
+            template_count=Count(
+                'templates',
+                filter=models.Q(templates__is_active=True)
+            )
+        ).filter(template_count__gt=0).order_by('order', 'name')
+
+    @cached_catalog_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
     @action(detail=False, methods=['get'])
+    @cached_catalog_response
     def free(self, request):
         """Get only free templates (without pagination)"""
         templates = self.get_queryset().filter(is_premium=False)
@@ -82,6 +157,7 @@ class TemplateViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({'count': len(templates), 'results': serializer.data})
 
     @action(detail=False, methods=['get'])
+    @cached_catalog_response
     def premium(self, request):
         """Get only premium templates (without pagination)"""
         templates = self.get_queryset().filter(is_premium=True)
@@ -89,47 +165,103 @@ class TemplateViewSet(viewsets.ReadOnlyModelViewSet):
         return Response({'count': len(templates), 'results': serializer.data})
 
     @action(detail=False, methods=['get'])
+    @cached_catalog_response
     def categories(self, request):
         """Get all available template categories with their counts"""
-        from django.db.models import Count
-        from .models import TemplateCategory
-        from .serializers import TemplateCategorySerializer
+        categories = TemplateCategoryCountSerializer(self.get_categories_queryset(), many=True).data
 
-        # Get all categories with their template counts
-        # Only include categories that have active templates
-        categories = TemplateCategory.objects.annotate(
-            template_count=Count(
-                'templates',
-                filter=models.Q(templates__is_active=True)
-            )
-        ).filter(template_count__gt=0).order_by('order', 'name')
-
-        # Serialize the categories
-        serializer = TemplateCategorySerializer(categories, many=True)
+        return Response({
+            'categories': categories,
+            'total_count': len(categories)
+        })
 
-        # Add template count to each category
-        result = []
-        for i, category in enumerate(categories):
-            cat_data = serializer.data[i].copy()
-            cat_data['count'] = category.template_count
-            result.append(cat_data)
+    @action(detail=False, methods=['get'])
+    @cached_catalog_response
+    def catalog(self, request):
+        """
+        Get the whole templates page in one request (without pagination):
+        categories with their counts, and every template with its category
+        slugs only. Supports the same filters as list.
+        """
+        categories = TemplateCategoryCountSerializer(self.get_categories_queryset(), many=True).data
+        templates = self.filter_queryset(self.get_queryset())
+        results = self.get_serializer(templates, many=True).data
+        premium_count = sum(1 for template in templates if template.is_premium)
 
         return Response({
-            'categories': result,
-            'total_count': len(result)
+            'categories': categories,
+            'count': len(templates),
+            'free_count': len(templates) - premium_count,
+            'premium_count': premium_count,
+            'results': results,
         })
 
 
+def owned_resumes(user, session_key):
+    """
+    Resumes visible to a request.
+
+    - Authenticated users: only resumes linked to their user account
+    - Anonymous users: only resumes linked to their session that have NO user
+    """
+    if user.is_authenticated:
+        return Resume.objects.filter(user=user)
+
+    if session_key:
+        return Resume.objects.filter(
+            session_id=session_key,
+            user__isnull=True  # Only resumes not yet linked to a user
+        )
+
+    return Resume.objects.none()
+
+
+def payment_required_payload(resume, template, request=None):
+    """
+    Check if a resume can be exported with a template without payment.
+
+    Free templates: always exportable
+    Premium templates: need to be premium user or have paid for this CV
+    (see entitlements.py)
+
+    Returns the body of the 402 response if payment is required, None otherwise.
+    """
+    if resolve_entitlements(resume, template, request).can_export:
+        return None
+
+    return {
+        'error': 'Payment required',
+        'message': 'Ce modèle est premium. Veuillez devenir membre Premium ou payer pour ce CV.',
+        'template_is_premium': True,
+        'requires_payment': True,
+        'payment_options': {
+            'per_cv': 2.40,
+            'premium_unlimited': 24.00
+        }
+    }
+
+
+def render_rejected_payload(exc):
+    """Body of the 429/503 response of an export refused by admission control"""
+    return {
+        'error': 'PDF export temporarily unavailable',
+        'detail': str(exc),
+        'retry_after': exc.retry_after,
+    }
+
+
 class ResumeViewSet(viewsets.ModelViewSet):
     """
     ViewSet for managing resumes.
 
-    list: Get all resumes for authenticated user or session
+    list: Get all resumes for authenticated user or session (without their sections)
     create: Create a new resume
-    retrieve: Get a specific resume
-    update/partial_update: Update a resume (auto-save)
+    retrieve: Get a specific resume (ETag, 304 with If-None-Match)
+    update/partial_update: Update a resume (auto-save, 409 if If-Match is stale)
+    delta: Apply JSON-Patch operations to a resume (incremental auto-save)
     destroy: Delete a resume
     export_pdf: Export resume as PDF
+    export_pdf_async: Enqueue a PDF export job (poll export_jobs/{job_id})
     upload_photo: Upload a photo for the resume
     delete_photo: Delete the resume photo
     """
@@ -141,6 +273,10 @@ class ResumeViewSet(viewsets.ModelViewSet):
     ordering_fields = ['created_at', 'updated_at', 'full_name']
     ordering = ['-updated_at']
 
+    AUTOSAVE_ACTIONS = ('update', 'partial_update', 'delta')
+    # Actions returning ResumeSerializer data (nested experiences, education, skills)
+    DETAIL_ACTIONS = ('retrieve', 'get_or_create_draft', 'upload_photo', 'delete_photo')
+
     def get_queryset(self):
         """
         Filter resumes by authenticated user or session ID.
@@ -156,24 +292,30 @@ class ResumeViewSet(viewsets.ModelViewSet):
         logger.info(f"ResumeViewSet.get_queryset() - user.is_authenticated: {is_authenticated}")
 
         if is_authenticated:
-            # Show only resumes linked to this user
             logger.info(f"ResumeViewSet.get_queryset() - Authenticated user: {self.request.user.id}")
-            return Resume.objects.filter(user=self.request.user)
-
-        # For anonymous users, filter by session AND ensure no user is linked
-        session_key = self.request.session.session_key
-        logger.info(f"ResumeViewSet.get_queryset() - Anonymous user with session_key: {session_key}")
-        if session_key:
-            return Resume.objects.filter(
-                session_id=session_key,
-                user__isnull=True  # Only resumes not yet linked to a user
+            queryset = owned_resumes(self.request.user, None)
+        else:
+            session_key = self.request.session.session_key
+            logger.info(f"ResumeViewSet.get_queryset() - Anonymous user with session_key: {session_key}")
+            queryset = owned_resumes(self.request.user, session_key)
+
+        if self.action in self.AUTOSAVE_ACTIONS:
+            # Auto-saves run in a transaction: lock the row so the If-Match
+            # check and the write see the same version
+            queryset = queryset.select_for_update()
+        elif self.action == 'list':
+            queryset = queryset.select_related('template').defer(*RESUME_LIST_DEFERRED_FIELDS)
+        elif self.action in self.DETAIL_ACTIONS:
+            queryset = queryset.select_related('template', 'user').prefetch_related(
+                'experiences', 'education', 'skills'
             )
-
-        return Resume.objects.none()
+        return queryset
 
     def get_serializer_class(self):
         if self.action == 'create':
             return ResumeCreateSerializer
+        elif self.action == 'list':
+            return ResumeListSerializer
         elif self.action in ['update', 'partial_update']:
             return ResumeUpdateSerializer
         return ResumeSerializer
@@ -188,14 +330,100 @@ class ResumeViewSet(viewsets.ModelViewSet):
 
         serializer.save()
 
+    def _version_conflict_response(self, request, resume):
+        """
+        Check the If-Match header against the resume version (see resume_version.py).
+
+        Returns a 409 response if the resume was saved since the client
+        loaded it, None otherwise.
+        """
+        if not is_version_conflict(request, resume):
+            return None
+        return Response({
+            'error': 'Version conflict',
+            'detail': 'The resume was modified since it was loaded, reload it before saving.',
+            'version': resume.version,
+        }, status=status.HTTP_409_CONFLICT, headers={'ETag': resume_etag(resume)})
+
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Get a resume. Polling with If-None-Match gets a 304 while it is
+        unchanged, entitlements and template name included.
+        """
+        resume = self.get_object()
+        etag = representation_etag(resume, request)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        serializer = self.get_serializer(resume)
+        return Response(serializer.data, headers={'ETag': etag})
+
+    def update(self, request, *args, **kwargs):
+        """
+        Auto-save. With If-Match, a stale version is rejected with 409.
+        """
+        partial = kwargs.pop('partial', False)
+        with transaction.atomic():
+            resume = self.get_object()
+            conflict = self._version_conflict_response(request, resume)
+            if conflict is not None:
+                return conflict
+
+            serializer = self.get_serializer(resume, data=request.data, partial=partial)
+            serializer.is_valid(raise_exception=True)
+            self.perform_update(serializer)
+
+        return Response(serializer.data, headers={'ETag': resume_etag(resume)})
+
     def perform_update(self, serializer):
         """
-        Update last_accessed timestamp on save (for auto-save).
+        Auto-save: one UPDATE of the changed columns, updated_at and
+        last_accessed included (see ResumeUpdateSerializer.update).
+        """
+        serializer.save()
+
+    @action(detail=True, methods=['patch'], parser_classes=[JSONPatchParser, JSONParser])
+    def delta(self, request, pk=None):
         """
-        from django.utils import timezone
-        resume = serializer.save()
-        resume.last_accessed = timezone.now()
-        resume.save(update_fields=['last_accessed'])
+        Incremental auto-save: apply JSON-Patch operations (see resume_patch.py).
+
+        Body: a list of operations, or {"operations": [...]}.
+        Only the columns whose value changed are written. With If-Match, a
+        stale version is rejected with 409.
+        """
+        operations = request.data
+        if isinstance(operations, dict):
+            operations = operations.get('operations')
+
+        with transaction.atomic():
+            # The row is locked (AUTOSAVE_ACTIONS): concurrent patches apply
+            # one after the other
+            resume = self.get_object()
+            conflict = self._version_conflict_response(request, resume)
+            if conflict is not None:
+                return conflict
+
+            current = ResumeUpdateSerializer(resume)
+            writable = [name for name, field in current.fields.items() if not field.read_only]
+            try:
+                values = ResumePatch(current.data, writable).apply(operations)
+            except PatchError as e:
+                return Response({
+                    'error': str(e),
+                    'operation': e.index,
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            serializer = ResumeUpdateSerializer(resume, data=values, partial=True)
+            serializer.is_valid(raise_exception=True)
+            serializer.save()
+
+        return Response({
+            'id': resume.id,
+            'updated_fields': serializer.updated_fields,
+            'updated_at': resume.updated_at,
+            'version': resume.version,
+        }, headers={'ETag': resume_etag(resume)})
 
     @action(detail=True, methods=['get'])
     def render_html(self, request, pk=None):
@@ -217,56 +445,12 @@ class ResumeViewSet(viewsets.ModelViewSet):
                         'error': 'No template available'
                     }, status=status.HTTP_404_NOT_FOUND)
 
-            # Prepare context data for template
-            context_data = {
-                'full_name': resume.full_name,
-                'email': resume.email,
-                'phone': resume.phone,
-                'address': resume.address,
-                'city': resume.city,
-                'postal_code': resume.postal_code,
-                'website': resume.website,
-                'linkedin_url': resume.linkedin_url,
-                'github_url': resume.github_url,
-                'photo': resume.photo.url if resume.photo else None,
-                'date_of_birth': resume.date_of_birth,
-                'nationality': resume.nationality,
-                'driving_license': resume.driving_license,
-                'title': resume.title,
-                'summary': resume.summary,
-                'experience_data': resume.experience_data or [],
-                'education_data': resume.education_data or [],
-                'skills_data': resume.skills_data or [],
-                'languages_data': resume.languages_data or [],
-                'certifications_data': resume.certifications_data or [],
-                'projects_data': resume.projects_data or [],
-                'custom_sections': resume.custom_sections or [],
-            }
+            # Same context as the PDF export, cached per resume version
+            context_data = resume_contexts.get(resume)
 
             # Render template with Handlebars (pybars)
-            compiler = Compiler()
-
-            # Register custom helpers for Handlebars
-            def first_helper(this, value, count):
-                """Helper to get first N characters of a string"""
-                if value:
-                    return str(value)[:int(count)]
-                return ''
-
-            def translate_work_mode_helper(this, value):
-                """Helper to translate work_mode to French"""
-                translations = {
-                    'remote': 'Télétravail',
-                    'onsite': 'Sur site',
-                    'hybrid': 'Hybride',
-                }
-                return translations.get(value, value)
-
-            handlebars_template = compiler.compile(template.template_html)
-            rendered_html = handlebars_template(context_data, helpers={
-                'first': first_helper,
-                'translate_work_mode': translate_work_mode_helper
-            })
+            handlebars_template = compiled_templates.get(template)
+            rendered_html = handlebars_template(context_data, helpers=HELPERS)
 
             return Response({
                 'html': rendered_html,
@@ -280,6 +464,33 @@ class ResumeViewSet(viewsets.ModelViewSet):
                 'detail': str(e)
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    def _get_export_template(self, resume):
+        """
+        Get the template to export a resume with (use default if none selected).
+
+        Returns None if no template is available.
+        """
+        template = resume.template
+        if not template:
+            logger.warning(f'No template set for resume {resume.id}, using default')
+            # Get first available free template
+            template = Template.objects.filter(is_active=True, is_premium=False).first()
+        return template
+
+    def _payment_required_response(self, request, resume, template):
+        """
+        Check if user can export without payment.
+
+        Free templates: always exportable
+        Premium templates: need to be premium user or have paid for this CV
+
+        Returns a 402 response if payment is required, None otherwise.
+        """
+        payload = payment_required_payload(resume, template, request)
+        if payload is None:
+            return None
+        return Response(payload, status=status.HTTP_402_PAYMENT_REQUIRED)
+
     @action(detail=True, methods=['post'])
     def export_pdf(self, request, pk=None):
         """
@@ -288,132 +499,36 @@ class ResumeViewSet(viewsets.ModelViewSet):
         Logic:
         1. Check if template is premium
         2. Check if user can export (is premium user OR has paid for this CV)
-        3. Generate PDF with WeasyPrint
-        4. Add watermark if not paid and template is premium
-        5. Return PDF file or payment required error
+        3. Generate PDF with Playwright
+        4. Return PDF file or payment required error
         """
         resume = self.get_object()
 
         try:
-            from datetime import datetime
-            from .pdf_service import PDFGenerationService
-            import logging
-
-            logger = logging.getLogger(__name__)
             logger.info(f'Starting PDF export for resume {resume.id}')
 
-            # Get template (use default if none selected)
-            template = resume.template
+            template = self._get_export_template(resume)
             if not template:
-                logger.warning(f'No template set for resume {resume.id}, using default')
-                # Get first available free template
-                template = Template.objects.filter(is_active=True, is_premium=False).first()
-                if not template:
-                    logger.error('No template available in database')
-                    return Response({
-                        'error': 'No template available'
-                    }, status=status.HTTP_404_NOT_FOUND)
+                logger.error('No template available in database')
+                return Response({
+                    'error': 'No template available'
+                }, status=status.HTTP_404_NOT_FOUND)
 
             logger.info(f'Using template {template.id} (premium: {template.is_premium})')
 
-            # Check if user can export without payment
-            # Free templates: always exportable
-            # Premium templates: need to be premium user or have paid for this CV
-            if template.is_premium:
-                # Check if user is premium
-                user_is_premium = False
-                if request.user.is_authenticated:
-                    user_is_premium = getattr(request.user, 'is_premium', False)
-
-                # Check if this specific CV has been paid for
-                cv_is_paid = resume.is_paid
-
-                if not user_is_premium and not cv_is_paid:
-                    return Response({
-                        'error': 'Payment required',
-                        'message': 'Ce modèle est premium. Veuillez devenir membre Premium ou payer pour ce CV.',
-                        'template_is_premium': True,
-                        'requires_payment': True,
-                        'payment_options': {
-                            'per_cv': 2.40,
-                            'premium_unlimited': 24.00
-                        }
-                    }, status=status.HTTP_402_PAYMENT_REQUIRED)
-
-            # Prepare context data for template
-            # Using flat structure to match Handlebars template expectations
-            import json
-
-            context_data = {
-                # Personal Information (flat structure for Handlebars)
-                'full_name': resume.full_name or '',
-                'first_name': resume.full_name.split()[0] if resume.full_name else '',
-                'last_name': ' '.join(resume.full_name.split()[1:]) if resume.full_name and len(resume.full_name.split()) > 1 else '',
-                'email': resume.email or '',
-                'phone': resume.phone or '',
-                'address': resume.address or '',
-                'city': resume.city or '',
-                'postal_code': resume.postal_code or '',
-                'website': resume.website or '',
-                'linkedin_url': resume.linkedin_url or '',
-                'github_url': resume.github_url or '',
-                'photo': resume.photo.url if resume.photo else None,
-                'title': resume.title or '',
-                'date_of_birth': str(resume.date_of_birth) if resume.date_of_birth else '',
-                'nationality': resume.nationality or '',
-                'driving_license': resume.driving_license or '',
-
-                # Professional content
-                'summary': resume.summary or '',
-
-                # Template naming conventions (matching the templates in backend/resumes/templates/)
-                'experience_data': resume.experience_data or [],
-                'education_data': resume.education_data or [],
-                'skills_data': resume.skills_data or [],
-                'languages_data': resume.languages_data or [],
-                'certifications_data': resume.certifications_data or [],
-                'projects_data': resume.projects_data or [],
-                'custom_sections': resume.custom_sections or [],
-
-                # Alternative naming conventions (for compatibility with other templates)
-                'experience': resume.experience_data or [],
-                'education': resume.education_data or [],
-                'skills': resume.skills_data or [],
-                'languages': resume.languages_data or [],
-                'certifications': resume.certifications_data or [],
-                'projects': resume.projects_data or [],
-                'hobbies': [],
-                'references': [],
-
-                # Short forms
-                'experiences': resume.experience_data or [],
-                'educations': resume.education_data or [],
-            }
+            payment_response = self._payment_required_response(request, resume, template)
+            if payment_response is not None:
+                return payment_response
 
             # Generate PDF with Playwright
             # This supports JavaScript templates (Handlebars, etc.)
             logger.info('Generating PDF with Playwright')
-
-            # Get HTML and CSS from template
-            html_content = template.template_html or ''
-            css_content = template.template_css or ''
-
-            # Generate PDF using Playwright service
-            pdf_content = PDFGenerationService.generate_pdf_sync(
-                html_content=html_content,
-                css_content=css_content,
-                cv_data=context_data,
-                filename=f"{resume.id}.pdf"
-            )
+            pdf_content = PDFGenerationService.generate_resume_pdf_sync(resume, template)
 
             logger.info(f'PDF generated successfully: {len(pdf_content)} bytes')
 
-            # Generate filename
-            safe_name = resume.full_name.replace(' ', '_') if resume.full_name else f'CV_{resume.id}'
-            timestamp = datetime.now().strftime('%Y%m%d')
-            filename = f'{safe_name}_{timestamp}.pdf'
-
             # Create response
+            filename = PDFGenerationService.export_filename(resume)
             response = HttpResponse(pdf_content, content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
             response['X-Resume-ID'] = str(resume.id)
@@ -426,6 +541,12 @@ class ResumeViewSet(viewsets.ModelViewSet):
                 'error': 'Template not found',
                 'detail': 'Le modèle sélectionné n\'existe pas'
             }, status=status.HTTP_404_NOT_FOUND)
+        except RenderRejected as e:
+            return Response(
+                render_rejected_payload(e),
+                status=e.status_code,
+                headers={'Retry-After': str(e.retry_after)}
+            )
         except Exception as e:
             import traceback
             return Response({
@@ -434,6 +555,82 @@ class ResumeViewSet(viewsets.ModelViewSet):
                 'traceback': traceback.format_exc()
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+    @action(detail=True, methods=['post'])
+    def export_pdf_async(self, request, pk=None):
+        """
+        Enqueue a PDF export job rendered by a Celery worker.
+
+        Performs the same template and payment checks as export_pdf, then
+        returns 202 with the job id. Poll export_jobs/{job_id} for the
+        status and fetch export_jobs/{job_id}/download once it succeeded.
+        """
+        resume = self.get_object()
+
+        template = self._get_export_template(resume)
+        if not template:
+            return Response({
+                'error': 'No template available'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        payment_response = self._payment_required_response(request, resume, template)
+        if payment_response is not None:
+            return payment_response
+
+        try:
+            from .tasks import render_pdf_export_job
+
+            job = PDFExportJob.objects.create(
+                resume=resume,
+                template=template,
+                filename=PDFGenerationService.export_filename(resume)
+            )
+            render_pdf_export_job.delay(str(job.id))
+            job.refresh_from_db(fields=['status', 'error_message', 'file', 'completed_at'])
+
+            logger.info(f'Enqueued PDF export job {job.id} for resume {resume.id}')
+
+            return Response(
+                PDFExportJobSerializer(job, context={'request': request}).data,
+                status=status.HTTP_202_ACCEPTED
+            )
+
+        except Exception as e:
+            return Response({
+                'error': 'Failed to enqueue PDF export',
+                'detail': str(e)
+            }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    def _get_export_job(self, resume, job_id):
+        return get_object_or_404(PDFExportJob, pk=job_id, resume=resume)
+
+    @action(detail=True, methods=['get'], url_path=r'export_jobs/(?P<job_id>[0-9a-f-]+)')
+    def export_job(self, request, pk=None, job_id=None):
+        """Get the status of a PDF export job"""
+        resume = self.get_object()
+        job = self._get_export_job(resume, job_id)
+        return Response(PDFExportJobSerializer(job, context={'request': request}).data)
+
+    @action(detail=True, methods=['get'], url_path=r'export_jobs/(?P<job_id>[0-9a-f-]+)/download')
+    def export_job_download(self, request, pk=None, job_id=None):
+        """Download the PDF produced by a finished export job"""
+        resume = self.get_object()
+        job = self._get_export_job(resume, job_id)
+
+        if job.status != PDFExportJob.STATUS_SUCCEEDED or not job.file:
+            return Response({
+                'error': 'Export not ready',
+                'status': job.status,
+                'detail': job.error_message,
+            }, status=status.HTTP_409_CONFLICT)
+
+        with job.file.open('rb') as pdf_file:
+            pdf_content = pdf_file.read()
+
+        response = HttpResponse(pdf_content, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{job.filename}"'
+        response['X-Resume-ID'] = str(resume.id)
+        return response
+
     @action(detail=False, methods=['get'])
     def get_or_create_draft(self, request):
         """
@@ -532,7 +729,8 @@ class ResumeViewSet(viewsets.ModelViewSet):
             # Link all session resumes to the authenticated user
             session_resumes.update(
                 user=request.user,
-                session_id=None  # Clear session_id after migration
+                session_id=None,  # Clear session_id after migration
+                version=models.F('version') + 1
             )
 
             # Get the IDs of migrated resumes
@@ -560,6 +758,9 @@ class ResumeViewSet(viewsets.ModelViewSet):
         Supported formats: JPG, JPEG, PNG, GIF
         Max file size: 5MB (enforced by Django settings)
 
+        The photo is stored as print, preview and placeholder renditions
+        (see photo_pipeline.py), without its metadata.
+
         Returns the updated resume with the photo URL.
         """
         resume = self.get_object()
@@ -590,13 +791,19 @@ class ResumeViewSet(viewsets.ModelViewSet):
                     'detail': f'Maximum file size is 5MB. Your file is {photo_file.size / 1024 / 1024:.2f}MB'
                 }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Delete old photo if exists
-            if resume.photo:
-                resume.photo.delete(save=False)
+            try:
+                renditions = process_photo(photo_file)
+            except PhotoError as e:
+                return Response({
+                    'error': 'Invalid image',
+                    'detail': str(e)
+                }, status=status.HTTP_400_BAD_REQUEST)
 
-            # Save new photo
-            resume.photo = photo_file
-            resume.save(update_fields=['photo'])
+            # Save new photo, then delete the old files unless still used
+            old_files = photo_files(resume)
+            set_resume_photo(resume, renditions)
+            resume.save(update_fields=PHOTO_FIELDS + ['updated_at'])
+            delete_unreferenced_photo_files(old_files)
 
             # Return updated resume
             serializer = ResumeSerializer(resume)
@@ -630,8 +837,11 @@ class ResumeViewSet(viewsets.ModelViewSet):
                     'message': 'No photo to delete',
                 }, status=status.HTTP_200_OK)
 
-            # Delete the photo file
-            resume.photo.delete(save=True)
+            # Delete the photo files unless another resume uses them
+            old_files = photo_files(resume)
+            clear_resume_photo(resume)
+            resume.save(update_fields=PHOTO_FIELDS + ['updated_at'])
+            delete_unreferenced_photo_files(old_files)
 
             # Return updated resume
             serializer = ResumeSerializer(resume)
@@ -784,3 +994,26 @@ class SkillViewSet(viewsets.ModelViewSet):
                 raise permissions.PermissionDenied()
 
         serializer.save(resume=resume)
+
+
+class RenderStatsView(APIView):
+    """
+    PDF rendering metrics of the worker process serving the request (staff only).
+
+    Queue depth and wait times of the render admission control, coalesced
+    renders, browser pool usage and cache hit rates, used to size worker
+    replicas.
+    """
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        pdf_cache = get_pdf_cache()
+        return Response({
+            'pid': os.getpid(),
+            'admission': get_render_admission().stats(),
+            'coalescing': get_render_coalescer().stats(),
+            'browser_pool': get_browser_pool().stats(),
+            'compiled_templates': compiled_templates.stats(),
+            'render_contexts': resume_contexts.stats(),
+            'pdf_cache': pdf_cache.stats() if pdf_cache is not None else None,
+        })
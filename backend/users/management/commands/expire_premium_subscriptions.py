@@ -0,0 +1,29 @@
+"""
+Management command to downgrade the users whose premium subscription has ended.
+
+The sweep normally runs periodically on Celery beat (users/premium_expiry.py).
+Use this command to run it without beat, or with --dry-run to count the users
+that would be downgraded.
+"""
+from django.core.management.base import BaseCommand
+
+from users.premium_expiry import sweep_expired_subscriptions
+
+
+class Command(BaseCommand):
+    help = 'Clear the premium status of users whose subscription has ended'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the users that would be downgraded',
+        )
+
+    def handle(self, *args, **options):
+        result = sweep_expired_subscriptions(dry_run=options['dry_run'])
+
+        verb = 'would expire' if options['dry_run'] else 'expired'
+        self.stdout.write(self.style.SUCCESS(
+            f'{result.expired} premium subscription(s) {verb}, {result.active} active'
+        ))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.16 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0010_alter_user_managers"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("is_premium", True)),
+                fields=["subscription_end_date"],
+                name="users_premium_end_date_idx",
+            ),
+        ),
+    ]
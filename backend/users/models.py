@@ -70,6 +70,14 @@ class User(AbstractUser):
     class Meta:
         db_table = 'users'
         ordering = ['-created_at']
+        indexes = [
+            # Premium expiry sweep (premium_expiry.py)
+            models.Index(
+                fields=['subscription_end_date'],
+                condition=models.Q(is_premium=True),
+                name='users_premium_end_date_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.email
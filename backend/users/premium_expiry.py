@@ -0,0 +1,89 @@
+"""
+Downgrade the users whose premium subscription has ended.
+
+A post_save signal used to re-check subscription_end_date on every User save
+and save the user a second time: expired users were only downgraded when
+something happened to save them, and every unrelated save (authentication
+included) paid for the check. The sweep now runs periodically (Celery beat,
+users.tasks.expire_premium_subscriptions, every SUBSCRIPTION_EXPIRY_SWEEP_INTERVAL
+seconds) or on demand (`python manage.py expire_premium_subscriptions`), as
+one set-based UPDATE.
+
+The sweep only downgrades. The signal also set is_premium when
+subscription_end_date was in the future; that activation is gone: premium is
+now granted only by the Stripe webhooks (payments/webhooks.py: checkout
+completed, subscription updated, invoice paid) or by setting is_premium
+directly (admin, scripts). Setting an end date alone no longer grants
+premium. The sweep does not activate either, because a cancelled
+subscription keeps its end date: re-activating every user with a future
+end date would undo the cancellation webhook.
+
+The UPDATE sends no post_save signal: the cached copies of the downgraded
+users (authentication cache, entitlements) are dropped explicitly after
+commit. Between two sweeps, exports already treat an ended subscription as
+not premium (resumes/entitlements.py).
+"""
+
+import logging
+from dataclasses import dataclass
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.utils import timezone
+
+from .user_cache import authenticated_users
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ExpiryResult:
+    # Users downgraded by the sweep
+    expired: int = 0
+    # Users still premium with a subscription end date
+    active: int = 0
+
+
+def expired_premium_users(now=None):
+    """Premium users whose subscription has ended"""
+    return get_user_model().objects.filter(
+        is_premium=True, subscription_end_date__lt=now or timezone.now()
+    )
+
+
+def invalidate_users(user_ids) -> None:
+    """Drop the cached copies of users updated without signals"""
+    from resumes.entitlements import invalidate_user_entitlements
+
+    for user_id in user_ids:
+        authenticated_users.invalidate(user_id)
+        invalidate_user_entitlements(user_id)
+
+
+def sweep_expired_subscriptions(now=None, dry_run=False) -> ExpiryResult:
+    """
+    Clear is_premium of the users whose subscription has ended, in one UPDATE.
+
+    Args:
+        now: Reference time (default: now)
+        dry_run: Only count the users that would be downgraded
+    """
+    now = now or timezone.now()
+    users = expired_premium_users(now)
+    result = ExpiryResult()
+    if dry_run:
+        result.expired = users.count()
+    else:
+        with transaction.atomic():
+            user_ids = list(users.values_list('pk', flat=True))
+            # The conditions are applied again: a subscription renewed
+            # meanwhile is not downgraded
+            result.expired = users.filter(pk__in=user_ids).update(is_premium=False, updated_at=now)
+            transaction.on_commit(lambda: invalidate_users(user_ids))
+    result.active = get_user_model().objects.filter(
+        is_premium=True, subscription_end_date__gte=now
+    ).count()
+
+    if result.expired and not dry_run:
+        logger.info(f"Premium expired for {result.expired} user(s), {result.active} subscription(s) active")
+    return result
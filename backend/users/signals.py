@@ -1,26 +1,22 @@
 from django.dispatch import receiver
-from django.db.models.signals import post_save
+from django.db.models.signals import post_save, post_delete
+
+from .user_cache import authenticated_users
 
 # Note: With Supabase authentication, user login/signup is handled on the frontend.
 # Anonymous resume linking is now done via the /api/resumes/migrate-anonymous/ endpoint
 # which is called from the frontend after successful authentication.
 
 
+# Ended subscriptions are downgraded by a periodic sweep (premium_expiry.py),
+# not on every User save. Premium is granted only by the Stripe webhooks or by
+# setting is_premium: a future subscription_end_date alone no longer grants it.
+
+
 @receiver(post_save, sender='users.User')
-def update_user_premium_status(sender, instance, created, **kwargs):
+@receiver(post_delete, sender='users.User')
+def invalidate_authenticated_user(sender, instance, **kwargs):
     """
-    Mettre à jour automatiquement le statut premium de l'utilisateur
-    en fonction de son abonnement actif
+    Drop the cached copy of a user used by the authentication backend
     """
-    if not created and instance.subscription_end_date:
-        from django.utils import timezone
-
-        # Vérifier si l'abonnement est toujours valide
-        is_active = timezone.now() < instance.subscription_end_date
-
-        if instance.is_premium != is_active:
-            instance.is_premium = is_active
-            instance.save(update_fields=['is_premium'])
-
-            status = "activé" if is_active else "expiré"
-            print(f"✅ Statut premium {status} pour {instance.email}")
+    authenticated_users.invalidate(instance.pk)
@@ -1,15 +1,177 @@
 """
 Supabase Authentication Service
 Handles all authentication operations through Supabase
+
+Access tokens are verified locally:
+- HS256 tokens with the project JWT secret (SUPABASE_JWT_SECRET)
+- asymmetric tokens (RS256, ES256) with the project signing keys, read from
+  the JWKS endpoint (SUPABASE_JWKS_URL) and refreshed periodically or when
+  a token is signed by an unknown key
+
+The frontend sends the same token with every request (autosave PATCHes every
+few seconds), so verified payloads are kept in a bounded LRU keyed by the
+token digest until the token expires.
+
+Only the admin operations (create_user, update_user_metadata, delete_user,
+get_user_by_id) need the Supabase client: it is imported and created on
+first use, so processes that only authenticate requests (and management
+commands) never pay for it.
 """
+import hashlib
+import json
+import logging
 import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
 import jwt
+import requests
 from typing import Optional, Dict, Any
 from django.conf import settings
-from supabase import create_client, Client
 from rest_framework.exceptions import AuthenticationFailed
 
 
+logger = logging.getLogger(__name__)
+
+ASYMMETRIC_ALGORITHMS = ('RS256', 'ES256')
+
+
+class VerifiedTokenCache:
+    """
+    Bounded, thread-safe LRU of verified token payloads.
+
+    Keys are SHA-256 digests of the tokens (tokens are not kept in memory)
+    and an entry is only returned until the `exp` of its token. Payloads are
+    shared between requests and must not be mutated.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                payload, expires_at = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return payload
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, token: str, payload: Dict[str, Any]) -> None:
+        """Cache a verified payload, tokens without `exp` are not cached"""
+        expires_at = payload.get('exp')
+        if self.max_size <= 0 or not isinstance(expires_at, (int, float)):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (payload, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+            }
+
+
+class JWKSKeySet:
+    """
+    Signing keys of the Supabase project, loaded from a JWKS document.
+
+    The key set is fetched lazily, refreshed every `refresh_interval`
+    seconds, and refetched when a token names an unknown key id (at most
+    once every `min_refresh_interval` seconds, so forged key ids cannot
+    hammer the endpoint). Concurrent callers wait for a single fetch.
+    `url` may also be a local file path (tests, air-gapped deployments).
+    """
+
+    def __init__(self, url: str, refresh_interval: float = 600, min_refresh_interval: float = 30):
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self._keys: Dict[str, Any] = {}
+        self._fetched_at = None
+        self._lock = threading.Lock()
+        # Held during a fetch, the other callers wait for its result
+        self._refresh_lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        if self.url.startswith(('http://', 'https://')):
+            response = requests.get(self.url, timeout=5)
+            response.raise_for_status()
+            document = response.json()
+        else:
+            document = json.loads(Path(self.url.removeprefix('file://')).read_text())
+        return {
+            key.key_id: key
+            for key in jwt.PyJWKSet.from_dict(document).keys
+            if key.key_id
+        }
+
+    def refresh(self) -> None:
+        """Fetch the key set, keeping the previous keys if it fails"""
+        try:
+            keys = self._load()
+        except Exception as e:
+            logger.warning(f"Could not refresh the Supabase JWKS from {self.url}: {str(e)}")
+            keys = None
+        with self._lock:
+            self._fetched_at = time.monotonic()
+            if keys is not None:
+                self._keys = keys
+
+    def _age(self) -> Optional[float]:
+        return None if self._fetched_at is None else time.monotonic() - self._fetched_at
+
+    def _needs_refresh(self, kid: Optional[str]) -> bool:
+        age = self._age()
+        if age is None or age >= self.refresh_interval:
+            return True
+        # The project may have rotated its keys
+        return kid not in self._keys and age >= self.min_refresh_interval
+
+    def get_signing_key(self, kid: Optional[str]):
+        """Return the PyJWK of `kid`, raising jwt.InvalidTokenError if unknown"""
+        if self._needs_refresh(kid):
+            with self._refresh_lock:
+                # Checked again: another caller may have refreshed meanwhile
+                if self._needs_refresh(kid):
+                    self.refresh()
+
+        key = self._keys.get(kid)
+        if key is None:
+            raise jwt.InvalidTokenError(f'Unknown signing key: {kid}')
+        return key
+
+
 class SupabaseAuthService:
     """Service for managing Supabase authentication"""
 
@@ -18,15 +180,33 @@ class SupabaseAuthService:
         self.supabase_key = os.getenv('SUPABASE_SERVICE_KEY')
         self.supabase_anon_key = os.getenv('SUPABASE_ANON_KEY')
         self.jwt_secret = os.getenv('SUPABASE_JWT_SECRET')
+        self.token_cache = VerifiedTokenCache(
+            max_size=getattr(settings, 'SUPABASE_TOKEN_CACHE_SIZE', 4096)
+        )
+        jwks_url = getattr(settings, 'SUPABASE_JWKS_URL', None)
+        self.jwks = JWKSKeySet(
+            jwks_url,
+            refresh_interval=getattr(settings, 'SUPABASE_JWKS_REFRESH_INTERVAL', 600),
+        ) if jwks_url else None
 
-        if not all([self.supabase_url, self.supabase_key, self.jwt_secret]):
-            raise ValueError(
-                "Missing required Supabase environment variables. "
-                "Please set SUPABASE_URL, SUPABASE_SERVICE_KEY, and SUPABASE_JWT_SECRET"
-            )
+        self._client = None
+        self._client_lock = threading.Lock()
 
-        # Client with service key for admin operations
-        self.client: Client = create_client(self.supabase_url, self.supabase_key)
+    @property
+    def client(self):
+        """Client with service key for admin operations, created on first use"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    if not all([self.supabase_url, self.supabase_key]):
+                        raise ValueError(
+                            "Missing required Supabase environment variables. "
+                            "Please set SUPABASE_URL and SUPABASE_SERVICE_KEY"
+                        )
+                    from supabase import create_client
+
+                    self._client = create_client(self.supabase_url, self.supabase_key)
+        return self._client
 
     def verify_token(self, token: str) -> Dict[str, Any]:
         """
@@ -36,25 +216,39 @@ class SupabaseAuthService:
             token: The JWT token to verify
 
         Returns:
-            Dict containing the decoded token payload
+            Dict containing the decoded token payload (cached, do not mutate)
 
         Raises:
             AuthenticationFailed: If token is invalid or expired
         """
+        payload = self.token_cache.get(token)
+        if payload is not None:
+            return payload
+
         try:
             # Decode and verify the JWT token
-            payload = jwt.decode(
-                token,
-                self.jwt_secret,
-                algorithms=['HS256'],
-                audience='authenticated'
-            )
-            return payload
+            header = jwt.get_unverified_header(token)
+            algorithm = header.get('alg')
+            if algorithm in ASYMMETRIC_ALGORITHMS and self.jwks is not None:
+                key = self.jwks.get_signing_key(header.get('kid'))
+                payload = jwt.decode(token, key, algorithms=[algorithm], audience='authenticated')
+            else:
+                if not self.jwt_secret:
+                    raise AuthenticationFailed('Token verification is not configured (SUPABASE_JWT_SECRET)')
+                payload = jwt.decode(
+                    token,
+                    self.jwt_secret,
+                    algorithms=['HS256'],
+                    audience='authenticated'
+                )
         except jwt.ExpiredSignatureError:
             raise AuthenticationFailed('Token has expired')
         except jwt.InvalidTokenError:
             raise AuthenticationFailed('Invalid token')
 
+        self.token_cache.set(token, payload)
+        return payload
+
     def get_user_from_token(self, token: str) -> Optional[Dict[str, Any]]:
         """
         Get user data from a Supabase access token
@@ -0,0 +1,17 @@
+"""
+Celery tasks for the users app.
+"""
+
+from celery import shared_task
+
+from .premium_expiry import sweep_expired_subscriptions
+
+
+@shared_task(ignore_result=True)
+def expire_premium_subscriptions():
+    """
+    Downgrade the users whose subscription has ended (see premium_expiry.py).
+
+    Scheduled by Celery beat (CELERY_BEAT_SCHEDULE).
+    """
+    sweep_expired_subscriptions()
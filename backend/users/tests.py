@@ -1,3 +1,313 @@
-from django.test import TestCase
+import json
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from cvbuilder_backend.authentication import SupabaseAuthentication
+from resumes.entitlements import user_cache_key
+from .models import User
+from .premium_expiry import sweep_expired_subscriptions
+from .supabase_auth import JWKSKeySet, SupabaseAuthService, VerifiedTokenCache, supabase_auth
+from .user_cache import authenticated_users
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# The suite runs against a local-memory cache, whatever CACHE_BACKEND and
+# REDIS_URL the environment sets
+_cache_override = override_settings(CACHES=LOCMEM_CACHES)
+
+
+def setUpModule():
+    _cache_override.enable()
+
+
+def tearDownModule():
+    _cache_override.disable()
+
+
+# Project JWT secret of the tests, patched on supabase_auth (see use_test_jwt_secret)
+JWT_SECRET = 'test-jwt-secret'
+
+
+def use_test_jwt_secret(test):
+    """Make supabase_auth verify HS256 tokens with JWT_SECRET, whatever the environment sets"""
+    patcher = mock.patch.object(supabase_auth, 'jwt_secret', JWT_SECRET)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+
+
+def supabase_token(sub, email, key=None, kid=None, expires_in=3600, **user_metadata):
+    """
+    A Supabase access token signed with JWT_SECRET, or with an EC private
+    key (ES256) when given.
+    """
+    payload = {
+        'sub': sub,
+        'email': email,
+        'aud': 'authenticated',
+        'exp': int(time.time()) + expires_in,
+        'user_metadata': user_metadata,
+    }
+    if key is not None:
+        return jwt.encode(payload, key, algorithm='ES256', headers={'kid': kid})
+    return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
+
+
+class SupabaseAuthenticationTests(TestCase):
+    """Authenticated requests only write the user row when its names change"""
+
+    def setUp(self):
+        use_test_jwt_secret(self)
+        authenticated_users.clear()
+        self.addCleanup(authenticated_users.clear)
+        self.sub = str(uuid.uuid4())
+        self.user = User.objects.create(email='jean@example.com', first_name='Jean', last_name='Dupont')
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/api/resumes', HTTP_AUTHORIZATION=f'Bearer {token}')
+        user, _ = SupabaseAuthentication().authenticate(request)
+        return user
+
+    def test_unchanged_profile_is_not_written(self):
+        token = supabase_token(self.sub, 'jean@example.com', first_name='Jean', last_name='Dupont')
+
+        with CaptureQueriesContext(connection) as queries:
+            user = self.authenticate(token)
+
+        self.assertEqual(user, self.user)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('SELECT'))
+
+    def test_changed_names_update_only_their_columns(self):
+        token = supabase_token(self.sub, 'jean@example.com', first_name='Jean-Pierre', last_name='Dupont')
+
+        with CaptureQueriesContext(connection) as queries:
+            user = self.authenticate(token)
+
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('"first_name"', updates[0])
+        self.assertNotIn('"last_name"', updates[0])
+        self.assertNotIn('"is_premium"', updates[0])
+        self.assertEqual(User.objects.get(pk=self.user.pk).first_name, 'Jean-Pierre')
+        self.assertEqual(user.first_name, 'Jean-Pierre')
+
+    def test_repeated_requests_make_no_query(self):
+        token = supabase_token(self.sub, 'jean@example.com', first_name='Jean')
+        self.authenticate(token)
+
+        with self.assertNumQueries(0):
+            first = self.authenticate(token)
+            second = self.authenticate(token)
+
+        self.assertEqual(first, self.user)
+        self.assertIsNot(first, second)
+
+    def test_new_user_is_created_and_cached(self):
+        token = supabase_token(self.sub, 'marie@example.com', first_name='Marie', last_name='Curie')
+
+        user = self.authenticate(token)
+
+        self.assertEqual((user.email, user.first_name, user.last_name), ('marie@example.com', 'Marie', 'Curie'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(token), user)
+
+    def test_saving_the_user_invalidates_the_cache(self):
+        token = supabase_token(self.sub, 'jean@example.com')
+        self.assertFalse(self.authenticate(token).is_premium)
+
+        self.user.is_premium = True
+        self.user.save()
+
+        self.assertTrue(self.authenticate(token).is_premium)
+
+
+class SupabaseTokenVerificationTests(TestCase):
+    """Verified tokens are cached until they expire, JWKS keys are refreshed"""
+
+    def setUp(self):
+        use_test_jwt_secret(self)
+        token_cache = VerifiedTokenCache(max_size=8)
+        patcher = mock.patch.object(supabase_auth, 'token_cache', token_cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.token_cache = token_cache
+
+        self.jwks_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.jwks_dir, ignore_errors=True)
+        self.jwks_path = Path(self.jwks_dir) / 'jwks.json'
+
+    def write_jwks(self, **keys):
+        """Publish the public keys of `keys` (kid -> EC private key) in the JWKS file"""
+        document = {'keys': []}
+        for kid, private_key in keys.items():
+            jwk = jwt.algorithms.ECAlgorithm.to_jwk(private_key.public_key(), as_dict=True)
+            document['keys'].append({**jwk, 'kid': kid, 'alg': 'ES256', 'use': 'sig'})
+        self.jwks_path.write_text(json.dumps(document))
+
+    def use_jwks(self, **kwargs):
+        patcher = mock.patch.object(supabase_auth, 'jwks', JWKSKeySet(str(self.jwks_path), **kwargs))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_verified_payload_is_cached(self):
+        token = supabase_token('sub-1', 'jean@example.com')
+
+        with mock.patch('users.supabase_auth.jwt.decode', wraps=jwt.decode) as decode:
+            first = supabase_auth.verify_token(token)
+            second = supabase_auth.verify_token(token)
+
+        self.assertEqual(decode.call_count, 1)
+        self.assertIs(first, second)
+        self.assertEqual(self.token_cache.stats()['hits'], 1)
+
+    def test_cached_payload_is_not_used_after_exp(self):
+        token = supabase_token('sub-1', 'jean@example.com', expires_in=60)
+        supabase_auth.verify_token(token)
+
+        with mock.patch('users.supabase_auth.time.time', return_value=time.time() + 120):
+            self.assertIsNone(self.token_cache.get(token))
+
+    def test_invalid_tokens_are_rejected_and_not_cached(self):
+        token = supabase_token('sub-1', 'jean@example.com') + 'x'
+
+        for _ in range(2):
+            self.assertIsNone(supabase_auth.get_user_from_token(token))
+        self.assertEqual(self.token_cache.stats()['size'], 0)
+
+    def test_asymmetric_token_is_verified_with_jwks(self):
+        key = ec.generate_private_key(ec.SECP256R1())
+        self.write_jwks(**{'key-1': key})
+        self.use_jwks()
+
+        user_data = supabase_auth.get_user_from_token(supabase_token('sub-1', 'jean@example.com', key, 'key-1'))
+
+        self.assertEqual(user_data['id'], 'sub-1')
+        forged = supabase_token('sub-1', 'jean@example.com', ec.generate_private_key(ec.SECP256R1()), 'key-1')
+        self.assertIsNone(supabase_auth.get_user_from_token(forged))
+
+    def test_admin_client_is_created_on_first_use(self):
+        with mock.patch.dict(
+            'os.environ', {'SUPABASE_URL': '', 'SUPABASE_SERVICE_KEY': '', 'SUPABASE_JWT_SECRET': JWT_SECRET}
+        ):
+            service = SupabaseAuthService()
+
+        # Token verification only needs the JWT secret
+        self.assertEqual(service.verify_token(supabase_token('sub-1', 'jean@example.com'))['sub'], 'sub-1')
+        self.assertIsNone(service._client)
+        with self.assertRaises(ValueError):
+            service.client
+
+    def test_unknown_key_id_refreshes_the_key_set(self):
+        old_key, new_key = ec.generate_private_key(ec.SECP256R1()), ec.generate_private_key(ec.SECP256R1())
+        self.write_jwks(**{'key-1': old_key})
+        self.use_jwks(min_refresh_interval=0)
+        supabase_auth.verify_token(supabase_token('sub-1', 'jean@example.com', old_key, 'key-1'))
+
+        # Key rotation
+        self.write_jwks(**{'key-1': old_key, 'key-2': new_key})
+
+        payload = supabase_auth.verify_token(supabase_token('sub-2', 'marie@example.com', new_key, 'key-2'))
+        self.assertEqual(payload['sub'], 'sub-2')
+
+
+    def test_concurrent_unknown_key_ids_fetch_the_key_set_once(self):
+        key = ec.generate_private_key(ec.SECP256R1())
+        self.write_jwks(**{'key-1': key})
+        key_set = JWKSKeySet(str(self.jwks_path), min_refresh_interval=30)
+        key_set.get_signing_key('key-1')
+        # The last fetch is older than min_refresh_interval
+        key_set._fetched_at -= 60
+        load = key_set._load
+
+        def slow_load():
+            time.sleep(0.05)
+            return load()
+
+        def get_rotated_key():
+            with self.assertRaises(jwt.InvalidTokenError):
+                key_set.get_signing_key('rotated-key')
+
+        with mock.patch.object(key_set, '_load', side_effect=slow_load) as fetch:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                for future in [executor.submit(get_rotated_key) for _ in range(8)]:
+                    future.result()
+            # Bogus key ids do not refetch before min_refresh_interval
+            with self.assertRaises(jwt.InvalidTokenError):
+                key_set.get_signing_key('bogus')
+
+        self.assertEqual(fetch.call_count, 1)
+
+
+class PremiumExpiryTests(TestCase):
+    """Ended subscriptions are downgraded by a set-based sweep, not on save"""
+
+    def setUp(self):
+        now = timezone.now()
+        self.expired = User.objects.create(
+            email='expired@example.com', is_premium=True, subscription_end_date=now - timedelta(days=1)
+        )
+        self.active = User.objects.create(
+            email='active@example.com', is_premium=True, subscription_end_date=now + timedelta(days=1)
+        )
+        self.lifetime = User.objects.create(email='lifetime@example.com', is_premium=True)
+
+    def premium_emails(self):
+        return set(User.objects.filter(is_premium=True).values_list('email', flat=True))
+
+    def test_sweep_downgrades_ended_subscriptions_in_one_update(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = sweep_expired_subscriptions()
+
+        self.assertEqual((result.expired, result.active), (1, 1))
+        self.assertEqual(self.premium_emails(), {'active@example.com', 'lifetime@example.com'})
+        writes = [query['sql'] for query in queries if query['sql'].startswith('UPDATE')]
+        self.assertEqual(len(writes), 1)
+
+    def test_sweep_drops_cached_copies_of_downgraded_users(self):
+        cache.set(user_cache_key(self.expired.pk), True)
+        self.addCleanup(cache.clear)
+        authenticated_users.set('sub-expired', ('expired@example.com', '', ''), self.expired)
+        self.addCleanup(authenticated_users.clear)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            sweep_expired_subscriptions()
+
+        self.assertIsNone(cache.get(user_cache_key(self.expired.pk)))
+        self.assertIsNone(authenticated_users.get('sub-expired', ('expired@example.com', '', '')))
+
+    def test_saving_a_user_makes_a_single_write(self):
+        self.expired.first_name = 'Jean'
+
+        with self.assertNumQueries(1):
+            self.expired.save(update_fields=['first_name'])
+
+        self.expired.refresh_from_db()
+        self.assertTrue(self.expired.is_premium)
+
+    def test_command_reports_counts(self):
+        out = StringIO()
+        call_command('expire_premium_subscriptions', '--dry-run', stdout=out)
+        self.assertIn('1 premium subscription(s) would expire, 1 active', out.getvalue())
+        self.assertIn('expired@example.com', self.premium_emails())
+
+        out = StringIO()
+        call_command('expire_premium_subscriptions', stdout=out)
+        self.assertIn('1 premium subscription(s) expired, 1 active', out.getvalue())
+        self.assertNotIn('expired@example.com', self.premium_emails())
@@ -0,0 +1,122 @@
+"""
+Per-process cache of the users authenticated by SupabaseAuthentication.
+
+Every authenticated API request used to look the user up by email (and
+rewrite the row). Resolved users are now kept for AUTH_USER_CACHE_TTL
+seconds, keyed by the Supabase user id (`sub`), so the hot path of an
+authenticated request makes no query.
+
+Entries are dropped when the user is saved or deleted in this process (see
+signals.py). Other processes see such changes after at most the TTL, keep it
+short. A TTL of 0 disables the cache.
+"""
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+
+
+class UserCache:
+    """Bounded, thread-safe TTL cache of User instances keyed by Supabase id"""
+
+    def __init__(self, ttl: float = 30, max_size: int = 1024):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, supabase_id: str, profile: tuple):
+        """
+        Return a copy of the cached user, or None.
+
+        `profile` is the (email, first_name, last_name) of the token: an entry
+        cached for another profile is a miss, so metadata changes are synced.
+        """
+        if self.ttl <= 0:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(supabase_id)
+            if entry is None or entry[1] != profile or entry[2] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(supabase_id)
+            self.hits += 1
+            user = entry[0]
+
+        # Requests may modify request.user, never hand out the shared instance
+        return copy.copy(user)
+
+    def set(self, supabase_id: str, profile: tuple, user) -> None:
+        if self.ttl <= 0:
+            return
+
+        with self._lock:
+            self._entries[supabase_id] = (copy.copy(user), profile, time.monotonic() + self.ttl)
+            self._entries.move_to_end(supabase_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id) -> None:
+        """Drop the cached entries of a Django user"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry[0].pk == user_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current size"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+            }
+
+
+# Singleton instance used by SupabaseAuthentication
+authenticated_users = UserCache(
+    ttl=getattr(settings, 'AUTH_USER_CACHE_TTL', 30),
+    max_size=getattr(settings, 'AUTH_USER_CACHE_SIZE', 1024),
+)
+
+
+def user_profile(supabase_user_data) -> tuple:
+    """The Supabase user fields synced to the Django user"""
+    user_metadata = supabase_user_data.get('user_metadata') or {}
+    return (
+        supabase_user_data['email'],
+        user_metadata.get('first_name') or '',
+        user_metadata.get('last_name') or '',
+    )
+
+
+def sync_user_profile(user, first_name: Optional[str], last_name: Optional[str]) -> list:
+    """
+    Copy the Supabase names to the user, saving only the changed columns.
+
+    Empty names are ignored, like before. Returns the updated fields.
+    """
+    changed = []
+    for field, value in (('first_name', first_name), ('last_name', last_name)):
+        if value and getattr(user, field) != value:
+            setattr(user, field, value)
+            changed.append(field)
+
+    if changed:
+        user.save(update_fields=changed + ['updated_at'])
+    return changed